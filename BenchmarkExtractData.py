@@ -0,0 +1,519 @@
+#!/usr/bin/env python3
+"""
+=============================================================================
+BENCHMARK FOR ExtractData.py AND ExtractDataPS.py
+=============================================================================
+
+DESCRIPTION:
+    Measures how fast the two extractors run on synthetic plots of known
+    size, so that performance regressions between versions can be found.
+
+HOW IT WORKS:
+    1. SYNTHETIC PLOTS:
+       Deterministic test files (fixed random seed) are written for every
+       requested size, in the styles the extractors meet in practice:
+       - gnuplot : EPS with a gnuplot prologue, curves drawn with relative
+                   'V' steps and 'R' moves, '%' comments in between.
+       - mpl     : PDF as written by Matplotlib, one FlateDecode content
+                   stream with absolute 'm' / 'l' operators.
+       - plain   : PS with one 'x y lineto' per line.
+       The points are spread over several curves, plus a frame and ticks
+       (short segments that the extractors filter out). Files are kept in
+       the work directory and reused by later runs.
+
+    2. PHASE TIMINGS:
+       Each phase of the pipeline is run and timed on its own:
+       read, decompress (PDF only), tokenize, parse, filter and write.
+       The intermediate results are held in memory between phases, so
+       this run says where the time goes, not how much memory is needed.
+       ExtractDataPS.py tokenizes and parses in one pass; its time is
+       reported under 'parse'.
+
+    3. END-TO-END RUN:
+       The extractor is run as a user would run it. Its wall time and the
+       peak resident set size (RSS) of the process are recorded.
+
+    Every run happens in a fresh process, so peak RSS belongs to one run
+    only. With --repeat N the fastest of N runs is kept.
+
+USAGE EXAMPLES:
+
+    1. Default Suite (10^3 to 10^6 points, all styles, both tools):
+       $ python BenchmarkExtractData.py
+
+    2. Large Files Only, Three Repetitions:
+       $ python BenchmarkExtractData.py --sizes 1e6,1e7 --repeat 3
+
+    3. Comparing Two Versions:
+       Benchmark an older checkout, then the current one, and compare.
+       $ python BenchmarkExtractData.py --scripts /path/to/old --output old.json
+       $ python BenchmarkExtractData.py --output new.json --compare old.json
+
+OUTPUT:
+    A JSON file (default: benchmark.json) with the environment (Python,
+    platform, git revision of the scripts) and one entry per case:
+      {"style": "mpl", "tool": "ExtractData", "points": 100000,
+       "file_bytes": ..., "phases": {"read": s, "decompress": s, ...},
+       "total": s, "peak_rss_kb": ..., "points_out": ...}
+    Missing phases are null. A summary table is printed as well.
+
+COPYRIGHT:
+
+ISC License
+
+Copyright 2026 Pau Amaro Seoane
+
+Permission to use, copy, modify, and/or distribute this software for any
+purpose with or without fee is hereby granted, provided that the above
+copyright notice and this permission notice appear in all copies.
+
+THE SOFTWARE IS PROVIDED "AS IS" AND THE AUTHOR DISCLAIMS ALL WARRANTIES WITH
+REGARD TO THIS SOFTWARE INCLUDING ALL IMPLIED WARRANTIES OF MERCHANTABILITY AND
+FITNESS. IN NO EVENT SHALL THE AUTHOR BE LIABLE FOR ANY SPECIAL, DIRECT,
+INDIRECT, OR CONSEQUENTIAL DAMAGES OR ANY DAMAGES WHATSOEVER RESULTING FROM
+LOSS OF USE, DATA OR PROFITS, WHETHER IN AN ACTION OF CONTRACT, NEGLIGENCE OR
+OTHER TORTIOUS ACTION, ARISING OUT OF OR IN CONNECTION WITH THE USE OR
+PERFORMANCE OF THIS SOFTWARE.
+
+=============================================================================
+"""
+import sys
+import os
+import argparse
+import contextlib
+import importlib.util
+import io
+import json
+import math
+import multiprocessing
+import platform
+import random
+import resource
+import subprocess
+import tempfile
+import time
+import zlib
+
+STYLES = ('gnuplot', 'mpl', 'plain')
+DEFAULT_SIZES = '1e3,1e4,1e5,1e6'
+SEED = 20260101
+
+# Lines are formatted and written in batches of this many points.
+WRITE_BATCH = 1 << 14
+
+# =============================================================================
+# SYNTHETIC PLOT GENERATOR
+# Page layout: the axes box spans [72, 432] x [72, 288] points, like a
+# default Matplotlib figure; gnuplot uses its own 10x scaled units.
+# =============================================================================
+def _curves(npoints, seed):
+    """
+    Splits `npoints` into curves and yields, per curve, a generator of
+    (x, y) page coordinates in [0, 1] x [0, 1]: noisy sine waves.
+    """
+    rng = random.Random(seed)
+    ncurves = max(1, min(8, npoints // 1000))
+    for c in range(ncurves):
+        n = npoints // ncurves + (1 if c < npoints % ncurves else 0)
+        phase = rng.random() * 2 * math.pi
+        freq = 1 + rng.random() * 6
+        noise = random.Random(rng.random())
+
+        def points(n=n, phase=phase, freq=freq, noise=noise, c=c):
+            for i in range(n):
+                t = i / max(1, n - 1)
+                yield t, 0.5 + 0.35 * math.sin(2 * math.pi * freq * t + phase) \
+                    + 0.02 * (noise.random() - 0.5) + 0.01 * c
+        yield points()
+
+def _batched(iterable, size=WRITE_BATCH):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def write_gnuplot_eps(path, npoints, seed=SEED):
+    """gnuplot-style EPS: 'x y M' then relative 'dx dy V' steps."""
+    with open(path, 'w') as f:
+        f.write("%!PS-Adobe-2.0 EPSF-2.0\n"
+                "%%Creator: gnuplot 5.4 patchlevel 2\n"
+                "%%BoundingBox: 50 50 410 302\n"
+                "%%EndComments\n"
+                "/gnudict 256 dict def\ngnudict begin\n"
+                "/M {moveto} bind def\n/L {lineto} bind def\n"
+                "/R {rmoveto} bind def\n/V {rlineto} bind def\n"
+                "/C {setrgbcolor} bind def\n"
+                "end\n%%EndProlog\ngnudict begin\ngsave\n"
+                "0.500 UL\nLTb\n")
+        # Frame and ticks
+        f.write("1014 640 M\n5120 0 V\n0 3952 V\n-5120 0 V\n0 -3952 V\nstroke\n")
+        for k in range(11):
+            f.write(f"{1014 + 512 * k} 640 M\n0 63 V\n0 3826 R\n0 63 V\nstroke\n")
+        for c, curve in enumerate(_curves(npoints, seed)):
+            f.write(f"{c % 2} 0 {(c + 1) % 2} C 1.000 UL\nLT{c}\n")
+            px = py = None
+            for batch in _batched(curve):
+                lines = []
+                for t, v in batch:
+                    x, y = 1014 + int(5120 * t), 640 + int(3952 * v)
+                    if px is None:
+                        lines.append(f"{x} {y} M")
+                    else:
+                        lines.append(f"{x - px} {y - py} V")
+                    px, py = x, y
+                lines.append("% gnuplot splits long paths into pieces")
+                f.write("\n".join(lines) + "\n")
+            f.write("stroke\n")
+        f.write("grestore\nend\nshowpage\n%%Trailer\n%%EOF\n")
+
+def write_plain_ps(path, npoints, seed=SEED):
+    """Plain PostScript: one 'x y lineto' per line."""
+    with open(path, 'w') as f:
+        f.write("%!PS-Adobe-3.0\n%%Creator: handwritten\n")
+        f.write("72 72 moveto\n432 72 lineto\n432 288 lineto\n72 288 lineto\n72 72 lineto\nstroke\n")
+        for curve in _curves(npoints, seed):
+            first = True
+            for batch in _batched(curve):
+                lines = []
+                for t, v in batch:
+                    op = "moveto" if first else "lineto"
+                    first = False
+                    lines.append(f"{72 + 360 * t:.3f} {72 + 216 * v:.3f} {op}")
+                f.write("\n".join(lines) + "\n")
+            f.write("stroke\n")
+        f.write("showpage\n")
+
+def write_mpl_pdf(path, npoints, seed=SEED):
+    """
+    Matplotlib-style PDF with a single FlateDecode content stream. The
+    stream is compressed while it is written; its /Length is an indirect
+    object that follows it.
+    """
+    with open(path, 'wb') as f:
+        offsets = {}
+
+        def obj(num, body):
+            offsets[num] = f.tell()
+            f.write(b"%d 0 obj\n" % num + body + b"\nendobj\n")
+
+        f.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        obj(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        obj(2, b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>")
+        obj(3, b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 460 345] /Contents 4 0 R"
+               b" /Resources << >> >>")
+
+        offsets[4] = f.tell()
+        f.write(b"4 0 obj\n<< /Length 5 0 R /Filter /FlateDecode >>\nstream\n")
+        z = zlib.compressobj()
+        length = 0
+
+        def put(text):
+            nonlocal length
+            data = z.compress(text.encode())
+            length += len(data)
+            f.write(data)
+
+        put("q 1 0 0 1 0 0 cm 0.8 w 0 0 0 RG\n72 72 360 216 re S\n")
+        for k in range(11):
+            put(f"{72 + 36 * k} 72 m {72 + 36 * k} 68.5 l S\n")
+        for c, curve in enumerate(_curves(npoints, seed)):
+            put("q 0.12 0.47 0.71 RG 1.5 w 1 J 1 j [] 0 d\n")
+            first = True
+            for batch in _batched(curve):
+                lines = []
+                for t, v in batch:
+                    op = "m" if first else "l"
+                    first = False
+                    lines.append(f"{72 + 360 * t:.6f} {72 + 216 * v:.6f} {op}")
+                put("\n".join(lines) + "\n")
+            put("S Q\n")
+        put("Q\n")
+        data = z.flush()
+        length += len(data)
+        f.write(data)
+        f.write(b"\nendstream\nendobj\n")
+        obj(5, b"%d" % length)
+        obj(6, b"<< /Producer (Matplotlib pdf backend v3.8.0) >>")
+
+        xref = f.tell()
+        f.write(b"xref\n0 7\n0000000000 65535 f \n")
+        for num in range(1, 7):
+            f.write(b"%010d 00000 n \n" % offsets[num])
+        f.write(b"trailer\n<< /Size 7 /Root 1 0 R /Info 6 0 R >>\nstartxref\n%d\n%%%%EOF\n" % xref)
+
+GENERATORS = {
+    'gnuplot': ('.eps', write_gnuplot_eps),
+    'mpl': ('.pdf', write_mpl_pdf),
+    'plain': ('.ps', write_plain_ps),
+}
+
+def synthetic_plot(workdir, style, npoints, seed=SEED):
+    """Returns the path of a synthetic plot, writing it if needed."""
+    ext, write = GENERATORS[style]
+    path = os.path.join(workdir, f"{style}_{npoints}_{seed}{ext}")
+    if not os.path.exists(path):
+        tmp = path + '.part'
+        write(tmp, npoints, seed)
+        os.replace(tmp, path)
+    return path
+
+# =============================================================================
+# MEASUREMENT (runs in a fresh process per case)
+# =============================================================================
+def _load(scripts, name):
+    """Imports ExtractData / ExtractDataPS from the scripts directory."""
+    spec = importlib.util.spec_from_file_location(name, os.path.join(scripts, name + '.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def _peak_rss_kb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak  # bytes on macOS
+
+class _Timer:
+    """Collects the duration of named phases."""
+
+    def __init__(self):
+        self.phases = {}
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        yield
+        self.phases[name] = time.perf_counter() - start
+
+def _phases_extract_data(ed, path, out):
+    timer = _Timer()
+    with timer.phase('read'):
+        if path.endswith('.pdf'):
+            buf, reader, streams = ed._open_pdf(path)
+        else:
+            chunks = list(ed.iter_file_chunks(open(path, 'rb')))
+    if path.endswith('.pdf'):
+        with timer.phase('decompress'):
+            chunks = []
+            for _, stream in streams:
+                chunks.append(b''.join(reader.decoded_chunks(stream)))
+                chunks.append(b'\n')
+        buf.close()
+    with timer.phase('tokenize'):
+        blocks = list(ed.iter_token_blocks(chunks))
+    del chunks
+    with timer.phase('parse'):
+        parser = ed.PathParser()
+        parser.feed_blocks(blocks)
+        store = parser.finish()
+    del blocks
+    with timer.phase('filter'):
+        data = store.filter(10)
+    with timer.phase('write'):
+        points = ed.write_output(data, out, 'txt', ["benchmark"])
+    return timer.phases, points
+
+def _phases_extract_ps(eps, path, out):
+    timer = _Timer()
+    with timer.phase('read'):
+        with open(path, 'r') as f:
+            content = f.read()
+    with timer.phase('parse'):
+        parser = eps.LineParser()
+        parser.feed(content)
+        store = parser.finish()
+    del content
+    with timer.phase('filter'):
+        data = store.filter(10)
+    with timer.phase('write'):
+        points = eps.write_output(data, out, 'txt', ["benchmark"])
+    return timer.phases, points
+
+def run_case(task):
+    """
+    Child process: runs one measurement ('phases' or 'total') of one tool
+    on one file and returns its results.
+    """
+    scripts, tool, path, out, kind = task
+    result = {'error': None}
+    try:
+        module = _load(scripts, tool)
+        with contextlib.redirect_stdout(io.StringIO()) as log:
+            if kind == 'phases':
+                measure = _phases_extract_data if tool == 'ExtractData' else _phases_extract_ps
+                result['phases'], result['points_out'] = measure(module, path, out)
+            else:
+                start = time.perf_counter()
+                if tool == 'ExtractData':
+                    module.extract_vector_data(path, None, out)
+                else:
+                    module.extract_ps_data(path, None, out)
+                result['total'] = time.perf_counter() - start
+        result['log'] = log.getvalue()[-2000:]
+    except SystemExit:
+        result['error'] = 'exited'
+    except Exception as e:  # e.g. an older version without this API
+        result['error'] = f"{type(e).__name__}: {e}"
+    result['peak_rss_kb'] = _peak_rss_kb()
+    return result
+
+def _in_fresh_process(task):
+    with multiprocessing.get_context('spawn').Pool(1) as pool:
+        return pool.apply(run_case, (task,))
+
+# =============================================================================
+# SUITE
+# =============================================================================
+def git_revision(directory):
+    """The git revision of the scripts (with '+' if modified), or None."""
+    try:
+        rev = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=directory,
+                             capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--', 'ExtractData.py',
+                                'ExtractDataPS.py'], cwd=directory,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return rev + ('+' if dirty else '')
+
+def run_suite(sizes, styles, tools, scripts, workdir, repeat=1):
+    """Runs every (style, size, tool) case and returns the result entries."""
+    results = []
+    outdir = tempfile.mkdtemp(prefix='bench-out-')
+    for style in styles:
+        for npoints in sizes:
+            path = synthetic_plot(workdir, style, npoints)
+            for tool in tools:
+                if tool == 'ExtractDataPS' and style == 'mpl':
+                    continue  # PostScript only
+                out = os.path.join(outdir, f"{tool}_{os.path.basename(path)}.txt")
+                entry = {'style': style, 'tool': tool, 'points': npoints,
+                         'file_bytes': os.path.getsize(path), 'phases': None, 'total': None,
+                         'peak_rss_kb': None, 'points_out': None, 'error': None}
+                for _ in range(repeat):
+                    timed = _in_fresh_process((scripts, tool, path, out, 'phases'))
+                    if timed['error'] is None:
+                        phases = entry['phases'] or {}
+                        for name, seconds in timed['phases'].items():
+                            phases[name] = min(seconds, phases.get(name, seconds))
+                        entry['phases'] = phases
+                        entry['points_out'] = timed['points_out']
+                    total = _in_fresh_process((scripts, tool, path, out, 'total'))
+                    if total['error'] is not None:
+                        entry['error'] = total['error']
+                        break
+                    if entry['total'] is None or total['total'] < entry['total']:
+                        entry['total'] = total['total']
+                    entry['peak_rss_kb'] = max(entry['peak_rss_kb'] or 0, total['peak_rss_kb'])
+                with contextlib.suppress(OSError):
+                    os.remove(out)
+                if entry['phases'] is not None:
+                    entry['phases'] = {name: round(entry['phases'].get(name), 6)
+                                       if name in entry['phases'] else None
+                                       for name in ('read', 'decompress', 'tokenize', 'parse',
+                                                    'filter', 'write')}
+                if entry['total'] is not None:
+                    entry['total'] = round(entry['total'], 6)
+                results.append(entry)
+                _print_entry(entry)
+    with contextlib.suppress(OSError):
+        os.rmdir(outdir)
+    return results
+
+def _fmt(seconds):
+    return '      -' if seconds is None else f"{seconds:7.3f}"
+
+def _print_entry(entry):
+    if entry['error']:
+        print(f"{entry['style']:8} {entry['points']:>9} {entry['tool']:14} FAILED: {entry['error']}")
+        return
+    phases = entry['phases'] or {}
+    print(f"{entry['style']:8} {entry['points']:>9} {entry['tool']:14} "
+          + " ".join(_fmt(phases.get(p)) for p in ('read', 'decompress', 'tokenize', 'parse',
+                                                     'filter', 'write'))
+          + f" | {_fmt(entry['total'])} {entry['peak_rss_kb'] / 1024:8.1f}")
+
+def compare(results, baseline):
+    """Prints the total time of each case against a previous result file."""
+    old = {(e['style'], e['tool'], e['points']): e for e in baseline['results']}
+    print(f"\nComparison with {baseline.get('revision') or 'baseline'} (speedup = old / new):")
+    for entry in results:
+        prev = old.get((entry['style'], entry['tool'], entry['points']))
+        if not prev or not prev['total'] or not entry['total']:
+            continue
+        rss = ''
+        if prev['peak_rss_kb'] and entry['peak_rss_kb']:
+            rss = f", peak RSS {prev['peak_rss_kb'] / 1024:.1f} -> {entry['peak_rss_kb'] / 1024:.1f} MiB"
+        print(f"  {entry['style']:8} {entry['points']:>9} {entry['tool']:14} "
+              f"{prev['total']:.3f}s -> {entry['total']:.3f}s  ({prev['total'] / entry['total']:.2f}x{rss})")
+
+def parse_sizes(text):
+    """Parses '1e3,1e4,250000' into a list of point counts."""
+    try:
+        sizes = [int(float(s)) for s in text.split(',') if s.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size list: '{text}'")
+    if not sizes or min(sizes) < 1:
+        raise argparse.ArgumentTypeError(f"invalid size list: '{text}'")
+    return sizes
+
+if __name__ == "__main__":
+    here = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(
+        description="Benchmark ExtractData.py and ExtractDataPS.py on synthetic plots.",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="Example:\n  python BenchmarkExtractData.py --sizes 1e3,1e5 --output bench.json")
+    parser.add_argument("--sizes", type=parse_sizes, default=parse_sizes(DEFAULT_SIZES),
+                        help=f"Comma separated point counts (default: {DEFAULT_SIZES})")
+    parser.add_argument("--styles", default=','.join(STYLES),
+                        help=f"Plot styles to generate (default: {','.join(STYLES)})")
+    parser.add_argument("--tools", default='ExtractData,ExtractDataPS',
+                        help="Extractors to run (default: ExtractData,ExtractDataPS)")
+    parser.add_argument("--scripts", default=here,
+                        help="Directory holding the extractor scripts to benchmark (default: next to this file)")
+    parser.add_argument("--workdir", default=os.path.join(tempfile.gettempdir(), 'ExtractDataBench'),
+                        help="Where the synthetic plots are kept between runs")
+    parser.add_argument("--repeat", type=int, default=1, metavar="N",
+                        help="Run each case N times and keep the fastest (default: 1)")
+    parser.add_argument("--output", default='benchmark.json', help="JSON result file (default: benchmark.json)")
+    parser.add_argument("--compare", metavar="FILE", help="Previous JSON result file to compare against")
+    args = parser.parse_args()
+
+    styles = [s for s in args.styles.split(',') if s]
+    tools = [t for t in args.tools.split(',') if t]
+    for style in styles:
+        if style not in GENERATORS:
+            print(f"Error: Unknown style '{style}' (choose from {', '.join(STYLES)}).")
+            sys.exit(1)
+    for tool in tools:
+        if not os.path.isfile(os.path.join(args.scripts, tool + '.py')):
+            print(f"Error: {tool}.py not found in {args.scripts}.")
+            sys.exit(1)
+    os.makedirs(args.workdir, exist_ok=True)
+
+    scripts = os.path.abspath(args.scripts)
+    print(f"Benchmarking {scripts} (revision {git_revision(scripts) or 'unknown'})")
+    print(f"{'style':8} {'points':>9} {'tool':14} {'read':>7} {'decomp':>7} {'token':>7} "
+          f"{'parse':>7} {'filter':>7} {'write':>7} | {'total':>7} {'RSS MiB':>8}")
+    results = run_suite(args.sizes, styles, tools, scripts, args.workdir, max(1, args.repeat))
+
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'scripts': scripts,
+        'revision': git_revision(scripts),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'seed': SEED,
+        'repeat': max(1, args.repeat),
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Done. Wrote {len(results)} results to '{args.output}'")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
@@ -10,14 +10,26 @@ DESCRIPTION:
     plots saved as PDF, EPS, or PostScript files. It is useful for recovering
     lost data from old publications or extracting data from generated charts.
 
-    It is completely standalone and requires NO external dependencies.
+    It is completely standalone and requires NO external dependencies
+    (NumPy is used to speed up calibration when it happens to be installed).
 
 HOW IT WORKS:
     1. FORMAT DETECTION:
-       - PostScript/EPS: Parsed as plain text.
-       - PDF: Parsed as a binary container. The script heuristically scans for
-         internal data streams (zlib compressed) and extracts the vector
-         drawing commands without needing a full PDF library.
+       - PostScript/EPS: Parsed as plain text. The file is memory-mapped and
+         tokenized in fixed-size chunks, so arbitrarily large inputs are
+         processed with bounded memory. gzip, bzip2 and xz compressed
+         files (plot.eps.gz, ...) are recognised by their first bytes and
+         decompressed on the fly, without temporary files.
+       - PDF: Parsed as a binary container. A small built-in reader follows
+         the cross-reference table to the page tree and decompresses only
+         the page content streams (images and fonts are skipped), without
+         needing a full PDF library. Objects packed into compressed object
+         streams are found as well. Damaged files fall back to a heuristic
+         scan of all internal streams. Streams are decoded incrementally
+         through their filter chain (FlateDecode, LZWDecode, ASCII85Decode,
+         ASCIIHexDecode, RunLengthDecode) and capped (--max-stream-mb,
+         --max-total-mb), so a small compressed file cannot expand into
+         gigabytes in memory.
 
     2. VECTOR PARSING:
        It interprets standard vector commands used by plotting libraries
@@ -25,6 +37,16 @@ HOW IT WORKS:
        - 'moveto' (m): Start a new line.
        - 'lineto' (l): Draw a line to a coordinate.
        - 'rlineto' (V): Draw a line relative to the last point.
+       The stroke colour (RG, G, K, setrgbcolor, ...), line width (w) and
+       dash pattern (d) are tracked through gsave/grestore (q/Q), and
+       every curve is tagged with its style.
+       The prologue of a PostScript file is scanned for procedures that
+       stand for one of these operators ('/V {rlineto} bind def',
+       '/m /moveto load def'), so producer-specific aliases are understood
+       without running the file through a PostScript interpreter.
+       Files of gnuplot, matplotlib and cairo (named in %%Creator or the
+       PDF /Producer) take a fast path: the long runs of their line
+       operator are cut out of the token stream and converted in bulk.
 
     3. HEURISTIC FILTERING:
        Scientific plots consist of data curves (long continuous lines) and
@@ -36,6 +58,10 @@ HOW IT WORKS:
        PostScript defines coordinates in "points" (1/72 inch). If you provide
        the physical axis limits (e.g., Time 0-100, Amp -1 to 1), the script
        will automatically scale the raw page coordinates to your data units.
+       The limits refer to the edges of all vectors on the page; with
+       --frame they refer to the axis frame instead, which is detected
+       from the segment bounding boxes (a stray caption or legend line
+       then no longer shifts the calibration).
 
 USAGE EXAMPLES:
 
@@ -51,9 +77,87 @@ USAGE EXAMPLES:
        Map X linearly [0, 50], Y logarithmically [1e-2, 1e2].
        $ python ExtractData.py myplot.eps --xmin 0 --xmax 50 --ymin 0.01 --ymax 100 --logy
 
+       Reading the limits off the axis frame:
+       $ python ExtractData.py myplot.pdf --frame --xmin 0 --xmax 100 --ymin -5 --ymax 5
+
+    4. Parallel Decoding of Large Files:
+       Decompress and parse the page content streams on 8 cores. A large
+       PostScript file (uncompressed) is cut at line ends into pieces that
+       are parsed side by side. The output is identical to the serial run.
+       $ python ExtractData.py thesis.pdf --jobs 8
+       $ python ExtractData.py simulation.ps --jobs 8
+
+    5. Batch Mode:
+       Process a whole archive in one run, using all cores. Each file is
+       handled independently; failures are listed in the JSON summary.
+       $ python ExtractData.py figures/ -r --outdir data/ --summary report.json
+       $ python ExtractData.py 'plots/*.eps' other.pdf
+
+    6. Tuning the Calibration:
+       With --cache the parsed segments are kept on disk (keyed by a hash
+       of the file), so later runs with other limits skip the parsing.
+       $ python ExtractData.py big.eps --cache --xmin 0 --xmax 10 --ymin 0 --ymax 1
+       $ python ExtractData.py big.eps --cache --xmin 0 --xmax 10 --ymin 1 --ymax 1e3 --logy
+
+    7. Selected Pages of a Long PDF:
+       Only the content streams of these pages are decoded. Each page is
+       calibrated on its own bounds and written to its own file
+       (thesis_p12.txt, thesis_p40.txt, ...).
+       $ python ExtractData.py thesis.pdf --pages 12,40-42
+
+    8. As a Library:
+       extract() returns the curves in-process, without subprocesses or
+       output files; it raises ExtractionError when a plot cannot be read.
+       >>> from ExtractData import extract
+       >>> result = extract('plot.pdf', {'xmin': 0, 'xmax': 50, 'ymin': 0.01, 'ymax': 100, 'logy': True})
+       >>> result.polylines()        # [[(x, y), ...], ...], one list per curve
+       >>> result.bounds, result.stats
+
+    9. Diagnostics:
+       --stats reports the time and data of every phase (read or decode,
+       tokenize, parse, filter, calibrate, write), the PDF streams found,
+       decoded and skipped, the operators seen and the segments and points
+       kept; '--stats json' prints it as JSON. --profile FILE runs the
+       extraction under cProfile.
+       $ python ExtractData.py slow.pdf --stats
+       $ python ExtractData.py slow.pdf --profile slow.prof
+
+    10. Server Mode:
+       A resident process takes jobs over a Unix socket, one JSON object
+       per line, and answers each with the curves (or writes the output
+       file the job names). Workers stay warm and repeated requests are
+       answered from memory, so small plots take milliseconds instead of
+       an interpreter start-up each. The protocol is described at the
+       SERVER MODE section below.
+       $ python ExtractData.py --serve /run/extract.sock --jobs 4 --cache
+       $ echo '{"id": 1, "path": "/data/plot.pdf"}' | socat - UNIX-CONNECT:/run/extract.sock
+
 OUTPUT:
     Creates 'filename.txt' with two columns (X Y).
 
+    --simplify TOL decimates each curve with the Ramer-Douglas-Peucker
+    algorithm: points are dropped as long as the curve stays within TOL of
+    the original (page units, or data units with --simplify-units data).
+    Dense Matplotlib curves typically shrink 10-100x.
+
+    --dedup drops curves that repeat an earlier one (same number of points,
+    coordinates equal within 0.01 page units), as when a producer strokes
+    a filled path once more for its outline.
+
+    Curves drawn with the same colour, line width and dash pattern form a
+    series. When a plot has several, they are listed with their numbers;
+    --series 1,3 keeps only those, and --split-series writes one file per
+    series (filename_s1.txt, filename_s2.txt, ...).
+
+    --format selects other layouts for downstream tools:
+      csv      : 'segment,x,y' rows (filename.csv).
+      npy      : (N, 2) float64 array (filename.npy) plus the segment
+                 offsets in filename.offsets.npy; load with numpy.load.
+      npz      : both arrays, 'points' and 'offsets', in filename.npz.
+      bin      : raw little-endian float64 x/y pairs (filename.bin) plus
+                 int64 offsets (filename.offsets.bin).
+    Segment k spans points offsets[k] to offsets[k+1].
+
 COPYRIGHT:
 
 Pau Amaro Seoane, Berlin, 26 December 2025
@@ -81,236 +185,3607 @@ PERFORMANCE OF THIS SOFTWARE.
 import sys
 import os
 import argparse
+import base64
+import bisect
+import contextlib
+import contextvars
+import cProfile
+import functools
+import glob
+import gzip
+import hashlib
+import io
+import itertools
+import json
 import math
+import mmap
+import pstats
 import re
+import signal
+import socket
+import socketserver
+import stat
+import struct
+import threading
+import time
+import zipfile
 import zlib
+from array import array
+from collections import Counter, OrderedDict, deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Python may be built without these; only compressed input needs them
+try:
+    import bz2
+except ImportError:
+    bz2 = None
+try:
+    import lzma
+except ImportError:
+    lzma = None
+
+# Size of the slices handed to the tokenizer. Only one slice (plus the
+# unfinished line at its end) is held in memory at any time.
+CHUNK_SIZE = 1 << 20
+
+_EOL = re.compile(rb'[\r\n]')
+
+# Where say() sends progress messages: a callable taking one message, or
+# None to print them. A context variable, so that concurrent extractions
+# in several threads each keep their own sink.
+_MESSAGES = contextvars.ContextVar('messages', default=None)
+
+def say(message):
+    """Reports a progress message to the current sink (see messages_to)."""
+    sink = _MESSAGES.get()
+    if sink is None:
+        print(message)
+    else:
+        sink(message)
+
+@contextlib.contextmanager
+def messages_to(sink):
+    """Sends the say() messages of the calling thread to `sink` in a block."""
+    token = _MESSAGES.set(sink)
+    try:
+        yield
+    finally:
+        _MESSAGES.reset(token)
 
 # =============================================================================
-# PDF STREAM EXTRACTOR (Heuristic)
+# PDF OBJECT READER
 # Replaces pypdf with standard library logic to keep script standalone.
+# The cross-reference table is used to locate objects lazily, the page tree
+# is walked from the trailer, and only the page content streams are decoded.
+# Embedded images and fonts are never touched.
 # =============================================================================
-def extract_pdf_content(filename):
+class PDFSyntaxError(Exception):
+    """Raised when the structure of a PDF file cannot be understood."""
+
+PDFRef = namedtuple('PDFRef', 'num gen')
+
+class PDFStream:
+    """A stream object: its dictionary and the extent of its raw data."""
+    __slots__ = ('dict', 'start', 'end')
+
+    def __init__(self, d, start, end):
+        self.dict = d
+        self.start = start
+        self.end = end
+
+_WS = re.compile(rb'(?:[\x00\t\n\x0c\r ]|%[^\r\n]*)*')
+_NUMBER = re.compile(rb'[+-]?(?:\d+\.?\d*|\.\d+)')
+_NAME = re.compile(rb'/([^\x00\t\n\x0c\r ()<>\[\]{}/%]*)')
+_NAME_ESCAPE = re.compile(rb'#([0-9A-Fa-f]{2})')
+_KEYWORD = re.compile(rb'[A-Za-z_\'"*]+')
+_REF = re.compile(rb'(\d+)[\x00\t\n\x0c\r ]+(\d+)[\x00\t\n\x0c\r ]+R(?![A-Za-z])')
+_HEX_STRING = re.compile(rb'<([0-9A-Fa-f\x00\t\n\x0c\r ]*)>')
+_OBJ_HEADER = re.compile(rb'(\d+)[\x00\t\n\x0c\r ]+(\d+)[\x00\t\n\x0c\r ]+obj(?![A-Za-z])')
+_XREF_ENTRY = re.compile(rb'(\d{10})[ ](\d{5})[ ]([nf])')
+_OBJSTM_TYPE = re.compile(rb'/Type[\x00\t\n\x0c\r ]*/ObjStm(?![A-Za-z])')
+_STRING_ESCAPE = re.compile(rb'\\([0-7]{1,3}|\r\n|.)', re.DOTALL)
+_ESCAPES = {b'n': b'\n', b'r': b'\r', b't': b'\t', b'b': b'\b', b'f': b'\f',
+            b'\r\n': b'', b'\r': b'', b'\n': b''}
+
+def _unescape(match):
+    esc = match.group(1)
+    if esc[:1].isdigit():
+        return bytes((int(esc, 8) & 0xFF,))
+    return _ESCAPES.get(esc, esc)
+
+# Compressed data is read in RAW_CHUNK slices, and a single inflate call
+# never produces more than DECODE_CHUNK bytes.
+RAW_CHUNK = 1 << 16
+DECODE_CHUNK = 1 << 20
+
+def _png_unpredict(chunks, columns, colors=1, bpc=8):
+    """Undoes the PNG row predictors (/Predictor >= 10), row by row."""
+    bpp = max(1, colors * bpc // 8)
+    rowlen = (columns * colors * bpc + 7) // 8
+    prev = bytearray(rowlen)
+    pending = b''
+    for chunk in itertools.chain(chunks, [None]):
+        if chunk is None:
+            if not pending:
+                return
+            pending = pending.ljust(rowlen + 1, b'\0')
+        else:
+            pending += chunk
+        out = bytearray()
+        while len(pending) > rowlen:
+            kind = pending[0]
+            row = bytearray(pending[1:rowlen + 1])
+            pending = pending[rowlen + 1:]
+            if kind == 1:
+                for i in range(bpp, rowlen):
+                    row[i] = (row[i] + row[i - bpp]) & 0xFF
+            elif kind == 2:
+                for i in range(rowlen):
+                    row[i] = (row[i] + prev[i]) & 0xFF
+            elif kind == 3:
+                for i in range(rowlen):
+                    left = row[i - bpp] if i >= bpp else 0
+                    row[i] = (row[i] + ((left + prev[i]) >> 1)) & 0xFF
+            elif kind == 4:
+                for i in range(rowlen):
+                    a = row[i - bpp] if i >= bpp else 0
+                    b = prev[i]
+                    c = prev[i - bpp] if i >= bpp else 0
+                    p = a + b - c
+                    pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+                    pred = a if pa <= pb and pa <= pc else (b if pb <= pc else c)
+                    row[i] = (row[i] + pred) & 0xFF
+            out += row
+            prev = row
+        if out:
+            yield bytes(out)
+
+def _inflate(chunks, parm):
+    """FlateDecode, incrementally, honouring the PNG predictors."""
+    def inflate():
+        d = zlib.decompressobj()
+        for chunk in chunks:
+            data = chunk
+            while data:
+                out = d.decompress(data, DECODE_CHUNK)
+                if out:
+                    yield out
+                data = d.unconsumed_tail
+            if d.eof:
+                return
+        out = d.flush()
+        if out:
+            yield out
+
+    if parm and parm.get('Predictor', 1) >= 10:
+        return _png_unpredict(inflate(), parm.get('Columns', 1), parm.get('Colors', 1),
+                              parm.get('BitsPerComponent', 8))
+    return inflate()
+
+_NOT_HEX = re.compile(rb'[^0-9A-Fa-f]')
+
+def _ascii_hex(chunks, parm):
+    """ASCIIHexDecode: pairs of hex digits up to '>', whitespace ignored."""
+    odd = b''
+    for chunk in chunks:
+        end = chunk.find(b'>')
+        if end >= 0:
+            chunk = chunk[:end]
+        digits = odd + _NOT_HEX.sub(b'', chunk)
+        odd = digits[len(digits) & ~1:]
+        if len(digits) > 1:
+            yield bytes.fromhex(digits[:len(digits) & ~1].decode())
+        if end >= 0:
+            break
+    if odd:
+        yield bytes.fromhex((odd + b'0').decode())
+
+_A85_SKIP = re.compile(rb'[\x00\t\n\x0c\r ]')
+
+def _a85_body(chunks):
+    """
+    The chunks of an ASCII85 stream without white space, and without the
+    optional leading '<~' even when a chunk boundary splits it.
+    """
+    chunks = iter(chunks)
+    head = b''
+    for chunk in chunks:
+        head += _A85_SKIP.sub(b'', chunk)
+        if len(head) >= 2:
+            break
+    yield head[2:] if head.startswith(b'<~') else head
+    for chunk in chunks:
+        yield _A85_SKIP.sub(b'', chunk)
+
+def _ascii85(chunks, parm):
+    """
+    ASCII85Decode: groups of 5 characters (or 'z' for 4 zero bytes) up to
+    '~>'. The incomplete group at the end of a chunk waits for the next.
     """
-    Scans a PDF file for internal streams, attempts to decompress them,
-    and returns a concatenated string of valid PostScript-like commands.
+    tail = b''
+    for chunk in _a85_body(chunks):
+        end = chunk.find(b'~')
+        if end >= 0:
+            chunk = chunk[:end]
+        data = tail + chunk
+        # 'z' only stands between groups, so the last 'z' closes a group
+        rest = len(data) - data.rfind(b'z') - 1
+        cut = len(data) - rest % 5
+        tail = data[cut:]
+        if cut:
+            yield base64.a85decode(data[:cut])
+        if end >= 0:
+            break
+    if tail:
+        yield base64.a85decode(tail)
+
+def _run_length(chunks, parm):
+    """RunLengthDecode: literal runs (length byte < 128) and repeats (> 128)."""
+    data = b''
+    for chunk in chunks:
+        data += chunk
+        out = bytearray()
+        pos = 0
+        while pos < len(data):
+            n = data[pos]
+            if n == 128:
+                yield bytes(out)
+                return
+            if n < 128:
+                if pos + n + 2 > len(data):
+                    break
+                out += data[pos + 1:pos + n + 2]
+                pos += n + 2
+            else:
+                if pos + 2 > len(data):
+                    break
+                out += data[pos + 1:pos + 2] * (257 - n)
+                pos += 2
+            if len(out) >= DECODE_CHUNK:
+                yield bytes(out)
+                out = bytearray()
+        data = data[pos:]
+        if out:
+            yield bytes(out)
+
+def _lzw(chunks, parm):
+    """LZWDecode: 9 to 12 bit codes, /EarlyChange, PNG predictors."""
+    early = parm.get('EarlyChange', 1) if parm else 1
+
+    def expand():
+        table = [bytes((i,)) for i in range(256)] + [b'', b'']
+        prev = None
+        width = 9
+        bits = nbits = 0
+        for chunk in chunks:
+            out = bytearray()
+            for byte in chunk:
+                bits = (bits << 8) | byte
+                nbits += 8
+                if nbits < width:
+                    continue
+                nbits -= width
+                code = bits >> nbits
+                bits &= (1 << nbits) - 1
+                if code == 256:  # Clear table
+                    del table[258:]
+                    prev = None
+                    width = 9
+                    continue
+                if code == 257:  # End of data
+                    yield bytes(out)
+                    return
+                if code < len(table):
+                    entry = table[code]
+                elif code == len(table) and prev is not None:
+                    entry = prev + prev[:1]
+                else:
+                    raise ValueError(f"bad LZW code {code}")
+                if prev is not None and len(table) < 4096:
+                    table.append(prev + entry[:1])
+                    if len(table) + early >= 1 << width and width < 12:
+                        width += 1
+                out += entry
+                prev = entry
+                if len(out) >= DECODE_CHUNK:
+                    yield bytes(out)
+                    out = bytearray()
+            if out:
+                yield bytes(out)
+
+    if parm and parm.get('Predictor', 1) >= 10:
+        return _png_unpredict(expand(), parm.get('Columns', 1), parm.get('Colors', 1),
+                              parm.get('BitsPerComponent', 8))
+    return expand()
+
+# /Filter names (and their abbreviations) -> incremental decoder(chunks, parm)
+_FILTERS = {
+    'FlateDecode': _inflate, 'Fl': _inflate,
+    'LZWDecode': _lzw, 'LZW': _lzw,
+    'ASCII85Decode': _ascii85, 'A85': _ascii85,
+    'ASCIIHexDecode': _ascii_hex, 'AHx': _ascii_hex,
+    'RunLengthDecode': _run_length, 'RL': _run_length,
+}
+
+# Raised by the decoders on damaged data (binascii.Error is a ValueError)
+DECODE_ERRORS = (zlib.error, ValueError)
+
+def decode_stream(chunks, filters, parms):
+    """
+    Chains the decoders of a stream's /Filter list over an iterator of raw
+    chunks and returns an iterator of decoded chunks, or None when one of
+    the filters is not supported. Nothing is decoded until it is consumed;
+    damaged data then raises one of DECODE_ERRORS.
+    """
+    for name, parm in zip(filters, parms):
+        stage = _FILTERS.get(name) if isinstance(name, str) else None
+        if stage is None:
+            return None
+        chunks = stage(chunks, parm)
+    return chunks
+
+class DecodeLimits:
     """
+    Caps on decompressed content, per stream and per file, in bytes (None
+    for no cap). They keep huge or hostile streams from exhausting memory.
+    `truncated` records whether any content was cut off.
+    """
+    __slots__ = ('stream', 'total', 'used', 'truncated')
+
+    def __init__(self, stream=512 << 20, total=2 << 30):
+        self.stream = stream
+        self.total = total
+        self.used = 0
+        self.truncated = False
+
+    def exhausted(self):
+        return self.total is not None and self.used >= self.total
+
+    def apply(self, chunks):
+        """Passes decoded chunks through, cutting them off at the caps."""
+        size = 0
+        for chunk in chunks:
+            room = len(chunk)
+            if self.stream is not None:
+                room = min(room, self.stream - size)
+            if self.total is not None:
+                room = min(room, self.total - self.used)
+            if room < len(chunk):
+                if self.total is not None and self.used + room >= self.total:
+                    say(f"  > Warning: File exceeds {self.total} decoded bytes; truncated.")
+                else:
+                    say(f"  > Warning: Content stream exceeds {self.stream} decoded bytes; truncated.")
+                self.truncated = True
+                self.used += room
+                if room:
+                    yield chunk[:room]
+                return
+            size += room
+            self.used += room
+            yield chunk
+
+def _guarded(chunks):
+    """Stops quietly at damaged data, keeping what was decoded before it."""
     try:
-        with open(filename, 'rb') as f:
-            data = f.read()
-    except FileNotFoundError:
-        return ""
+        yield from chunks
+    except DECODE_ERRORS as e:
+        say(f"  > Warning: Damaged content stream ({e}); using the part decoded so far.")
+
+class PDFReader:
+    """
+    Minimal random-access PDF reader working on a memory-mapped file.
 
+    Objects are parsed on demand through the cross-reference table (classic
+    tables and PDF 1.5 cross-reference streams, following /Prev chains).
+    Objects packed into compressed object streams (/Type /ObjStm) are read
+    from the decoded stream, which is kept for its other members. When the
+    table is missing or damaged, it is rebuilt by scanning the file for
+    "N G obj" headers and for object streams.
+
+    Malformed structure raises PDFSyntaxError, damaged stream data one of
+    DECODE_ERRORS; anything else is a bug and is not caught.
+    """
+
+    def __init__(self, buf):
+        self.buf = buf
+        self.xref = {}
+        self.cache = {}
+        self.objstms = {}
+        try:
+            self.trailer = self._read_xref()
+        except (PDFSyntaxError,) + DECODE_ERRORS:
+            self.trailer = None
+        if self.trailer is None or 'Root' not in self.trailer:
+            self.trailer = self._rebuild_xref()
+
+    # --- Lexical level -------------------------------------------------------
+    def parse(self, pos, buf=None):
+        """
+        Parses the object starting at `pos` of the file (or of `buf`, e.g.
+        a decoded object stream). Returns (value, end).
+        """
+        if buf is None:
+            buf = self.buf
+        pos = _WS.match(buf, pos).end()
+        c = buf[pos:pos + 1]
+        if not c:
+            raise PDFSyntaxError("unexpected end of file")
+
+        if c == b'/':
+            m = _NAME.match(buf, pos)
+            name = m.group(1)
+            if b'#' in name:
+                name = _NAME_ESCAPE.sub(lambda e: bytes.fromhex(e.group(1).decode()), name)
+            return name.decode('latin-1'), m.end()
+
+        if c == b'<':
+            if buf[pos + 1:pos + 2] == b'<':
+                d = {}
+                pos += 2
+                while True:
+                    pos = _WS.match(buf, pos).end()
+                    if buf[pos:pos + 2] == b'>>':
+                        return d, pos + 2
+                    key, pos = self.parse(pos, buf)
+                    if not isinstance(key, str):
+                        raise PDFSyntaxError(f"bad dictionary key at offset {pos}")
+                    d[key], pos = self.parse(pos, buf)
+            m = _HEX_STRING.match(buf, pos)
+            if m is None:
+                raise PDFSyntaxError(f"bad hex string at offset {pos}")
+            digits = re.sub(rb'[^0-9A-Fa-f]', b'', m.group(1))
+            if len(digits) % 2:
+                digits += b'0'
+            return bytes.fromhex(digits.decode()), m.end()
+
+        if c == b'[':
+            items = []
+            pos += 1
+            while True:
+                pos = _WS.match(buf, pos).end()
+                if buf[pos:pos + 1] == b']':
+                    return items, pos + 1
+                value, pos = self.parse(pos, buf)
+                items.append(value)
+
+        if c == b'(':
+            depth = 0
+            i = pos
+            while True:
+                ch = buf[i:i + 1]
+                if not ch:
+                    raise PDFSyntaxError("unterminated string")
+                if ch == b'\\':
+                    i += 2
+                    continue
+                if ch == b'(':
+                    depth += 1
+                elif ch == b')':
+                    depth -= 1
+                    if depth == 0:
+                        break
+                i += 1
+            return _STRING_ESCAPE.sub(_unescape, buf[pos + 1:i]), i + 1
+
+        if c in b'+-.0123456789':
+            m = _REF.match(buf, pos)
+            if m:
+                return PDFRef(int(m.group(1)), int(m.group(2))), m.end()
+            m = _NUMBER.match(buf, pos)
+            if m is None:
+                raise PDFSyntaxError(f"bad number at offset {pos}")
+            text = m.group(0)
+            return (float(text) if b'.' in text else int(text)), m.end()
+
+        m = _KEYWORD.match(buf, pos)
+        if m is None:
+            raise PDFSyntaxError(f"unexpected byte {c!r} at offset {pos}")
+        word = m.group(0)
+        if word == b'true':
+            return True, m.end()
+        if word == b'false':
+            return False, m.end()
+        if word == b'null':
+            return None, m.end()
+        raise PDFSyntaxError(f"unexpected keyword {word!r} at offset {pos}")
+
+    def parse_indirect(self, pos, num=None):
+        """Parses "N G obj ... endobj" at `pos`; streams become PDFStream."""
+        buf = self.buf
+        pos = _WS.match(buf, pos).end()
+        m = _OBJ_HEADER.match(buf, pos)
+        if m is None or (num is not None and int(m.group(1)) != num):
+            raise PDFSyntaxError(f"object {num} not found at offset {pos}")
+        value, pos = self.parse(m.end())
+        pos = _WS.match(buf, pos).end()
+        if isinstance(value, dict) and buf[pos:pos + 6] == b'stream':
+            start = pos + 6
+            if buf[start:start + 2] == b'\r\n':
+                start += 2
+            elif buf[start:start + 1] in (b'\n', b'\r'):
+                start += 1
+            return PDFStream(value, start, self._stream_end(value, start))
+        return value
+
+    def _stream_end(self, d, start):
+        """Honours /Length, falling back to a search for 'endstream'."""
+        buf = self.buf
+        try:
+            length = self.resolve(d.get('Length'))
+        except PDFSyntaxError:
+            length = None
+        if isinstance(length, int) and length >= 0:
+            end = start + length
+            after = _WS.match(buf, end).end()
+            if buf[after:after + 9] == b'endstream':
+                return end
+        end = buf.find(b'endstream', start)
+        if end < 0:
+            raise PDFSyntaxError("unterminated stream")
+        if buf[end - 2:end] == b'\r\n':
+            return end - 2
+        if buf[end - 1:end] in (b'\n', b'\r'):
+            return end - 1
+        return end
+
+    # --- Cross-reference table -----------------------------------------------
+    def _read_xref(self):
+        buf = self.buf
+        at = buf.rfind(b'startxref')
+        if at < 0:
+            raise PDFSyntaxError("no startxref")
+        offset, _ = self.parse(at + 9)
+
+        trailer = None
+        seen = set()
+        while isinstance(offset, int) and offset not in seen:
+            seen.add(offset)
+            pos = _WS.match(buf, offset).end()
+            if buf[pos:pos + 4] == b'xref':
+                section = self._read_xref_table(pos + 4)
+                if isinstance(section.get('XRefStm'), int):
+                    self._read_xref_stream(section['XRefStm'])
+            else:
+                section = self._read_xref_stream(pos)
+            if trailer is None:
+                trailer = section
+            offset = section.get('Prev')
+        return trailer
+
+    def _read_xref_table(self, pos):
+        buf = self.buf
+        xref = self.xref
+        while True:
+            pos = _WS.match(buf, pos).end()
+            if buf[pos:pos + 7] == b'trailer':
+                trailer, _ = self.parse(pos + 7)
+                if not isinstance(trailer, dict):
+                    raise PDFSyntaxError(f"bad trailer at offset {pos}")
+                return trailer
+            first, pos = self.parse(pos)
+            count, pos = self.parse(pos)
+            if not isinstance(first, int) or not isinstance(count, int):
+                raise PDFSyntaxError(f"bad xref subsection at offset {pos}")
+            for num in range(first, first + count):
+                pos = _WS.match(buf, pos).end()
+                m = _XREF_ENTRY.match(buf, pos)
+                if m is None:
+                    raise PDFSyntaxError(f"bad xref entry at offset {pos}")
+                xref.setdefault(num, int(m.group(1)) if m.group(3) == b'n' else None)
+                pos = m.end()
+
+    def _read_xref_stream(self, pos):
+        stream = self.parse_indirect(pos)
+        if not isinstance(stream, PDFStream) or stream.dict.get('Type') != 'XRef':
+            raise PDFSyntaxError(f"no cross-reference stream at offset {pos}")
+        d = stream.dict
+        data = self.decode(stream)
+        if data is None:
+            raise PDFSyntaxError("undecodable cross-reference stream")
+        widths = self.resolve(d.get('W'))
+        index = self.resolve(d.get('Index', [0, self.resolve(d.get('Size'))]))
+        if not isinstance(widths, list) or not isinstance(index, list):
+            raise PDFSyntaxError("cross-reference stream lacks /W or /Size")
+        widths = [self.resolve(w) for w in widths]
+        index = [self.resolve(i) for i in index]
+        if not all(isinstance(v, int) and v >= 0 for v in widths + index) or len(widths) < 3:
+            raise PDFSyntaxError("bad /W or /Index in cross-reference stream")
+        entry = sum(widths)
+        xref = self.xref
+        pos = 0
+        for first, count in zip(index[0::2], index[1::2]):
+            for num in range(first, first + count):
+                fields = []
+                for w in widths:
+                    fields.append(int.from_bytes(data[pos:pos + w], 'big') if w else None)
+                    pos += w
+                kind = 1 if fields[0] is None else fields[0]
+                if kind == 1:
+                    xref.setdefault(num, fields[1])
+                elif kind == 2:
+                    xref.setdefault(num, (fields[1], fields[2] or 0))
+                else:
+                    xref.setdefault(num, None)
+                if pos + entry > len(data):
+                    return d
+        return d
+
+    def _rebuild_xref(self):
+        """Recovers object offsets by scanning for "N G obj" headers."""
+        buf = self.buf
+        self.xref = {}
+        self.cache = {}
+        self.objstms = {}
+        trailer = {}
+        headers = []
+        for m in _OBJ_HEADER.finditer(buf):
+            self.xref[int(m.group(1))] = m.start()
+            headers.append((m.start(), int(m.group(1))))
+        starts = [start for start, _ in headers]
+        for m in _OBJSTM_TYPE.finditer(buf):
+            i = bisect.bisect_right(starts, m.start()) - 1
+            if i < 0:
+                continue
+            num = headers[i][1]
+            try:
+                members = self._objstm(num)[0]
+            except (PDFSyntaxError,) + DECODE_ERRORS:
+                continue
+            for index, member in enumerate(members):
+                self.xref.setdefault(member, (num, index))
+        at = buf.rfind(b'trailer')
+        if at >= 0:
+            try:
+                trailer, _ = self.parse(at + 7)
+            except PDFSyntaxError:
+                trailer = {}
+        if not isinstance(trailer, dict):
+            trailer = {}
+        if 'Root' not in trailer:
+            for num in sorted(self.xref):
+                obj = self.get(PDFRef(num, 0))
+                if isinstance(obj, dict) and obj.get('Type') == 'Catalog':
+                    trailer['Root'] = PDFRef(num, 0)
+                    break
+        if 'Root' not in trailer:
+            raise PDFSyntaxError("no document catalog")
+        return trailer
+
+    # --- Object access -------------------------------------------------------
+    def get(self, ref):
+        """Loads an indirect object (None when it does not exist)."""
+        if ref in self.cache:
+            return self.cache[ref]
+        where = self.xref.get(ref.num)
+        value = None
+        try:
+            if isinstance(where, int):
+                value = self.parse_indirect(where, ref.num)
+            elif isinstance(where, tuple):
+                value = self._get_compressed(ref.num, *where)
+        except (PDFSyntaxError,) + DECODE_ERRORS:
+            value = None
+        self.cache[ref] = value
+        return value
+
+    def _objstm(self, num):
+        """
+        Returns (member numbers, member offsets, data) of object stream
+        `num`, decoding it on first use. The header of N "number offset"
+        pairs precedes /First; offsets are relative to /First.
+        """
+        if num in self.objstms:
+            return self.objstms[num]
+        self.objstms[num] = ([], [], b'')    # guards against self-reference
+        where = self.xref.get(num)
+        if not isinstance(where, int):
+            raise PDFSyntaxError(f"object stream {num} not found")
+        stream = self.parse_indirect(where, num)
+        if not isinstance(stream, PDFStream) or stream.dict.get('Type') != 'ObjStm':
+            raise PDFSyntaxError(f"object {num} is not an object stream")
+        count = self.resolve(stream.dict.get('N'))
+        first = self.resolve(stream.dict.get('First'))
+        if not isinstance(count, int) or not isinstance(first, int):
+            raise PDFSyntaxError(f"object stream {num} lacks /N or /First")
+        data = self.decode(stream)
+        if data is None:
+            raise PDFSyntaxError(f"undecodable object stream {num}")
+        members, offsets = [], []
+        pos = 0
+        for _ in range(count):
+            member, pos = self.parse(pos, data)
+            offset, pos = self.parse(pos, data)
+            if not isinstance(member, int) or not isinstance(offset, int):
+                raise PDFSyntaxError(f"bad header in object stream {num}")
+            members.append(member)
+            offsets.append(first + offset)
+        self.objstms[num] = (members, offsets, data)
+        return self.objstms[num]
+
+    def _get_compressed(self, num, stm, index):
+        """Parses object `num`, stored as entry `index` of object stream `stm`."""
+        members, offsets, data = self._objstm(stm)
+        if index >= len(members) or members[index] != num:
+            if num not in members:
+                raise PDFSyntaxError(f"object {num} not in object stream {stm}")
+            index = members.index(num)
+        return self.parse(offsets[index], data)[0]
+
+    def resolve(self, value):
+        """Follows indirect references until a direct object is reached."""
+        seen = 0
+        while isinstance(value, PDFRef):
+            value = self.get(value)
+            seen += 1
+            if seen > 32:
+                raise PDFSyntaxError("reference loop")
+        return value
+
+    def filters(self, stream):
+        """Returns the (/Filter, /DecodeParms) lists of a stream, resolved."""
+        d = stream.dict
+        filters = self.resolve(d.get('Filter'))
+        parms = self.resolve(d.get('DecodeParms'))
+        if not isinstance(filters, list):
+            filters = [] if filters is None else [filters]
+        if not isinstance(parms, list):
+            parms = [parms] * len(filters)
+        filters = [self.resolve(f) for f in filters]
+        parms = [self.resolve(p) for p in parms]
+        parms = [{k: self.resolve(v) for k, v in p.items()} if isinstance(p, dict) else None
+                 for p in parms]
+        return filters, parms
+
+    def raw_chunks(self, stream):
+        """Yields the undecoded data of a stream in RAW_CHUNK slices."""
+        for pos in range(stream.start, stream.end, RAW_CHUNK):
+            yield self.buf[pos:min(pos + RAW_CHUNK, stream.end)]
+
+    def decoded_chunks(self, stream):
+        """Iterator over the decoded data of a stream (see decode_stream)."""
+        return decode_stream(self.raw_chunks(stream), *self.filters(stream))
+
+    def decode(self, stream):
+        """Returns the decoded data of a stream, or None if unsupported."""
+        chunks = self.decoded_chunks(stream)
+        return None if chunks is None else b''.join(chunks)
+
+    # --- Document structure --------------------------------------------------
+    def pages(self, wanted=None):
+        """
+        Yields (page number, page dictionary) in document order, numbering
+        from 1. With a set of `wanted` numbers, only those pages are loaded:
+        subtrees holding none of them are skipped using their /Count, and
+        the walk stops after the last wanted page.
+        """
+        root = self.resolve(self.trailer['Root'])
+        if not isinstance(root, dict):
+            raise PDFSyntaxError("the document catalog is not a dictionary")
+        stack = [root.get('Pages')]
+        seen = set()
+        number = 0
+        last = max(wanted) if wanted else None
+        while stack:
+            if last is not None and number >= last:
+                return
+            ref = stack.pop()
+            if isinstance(ref, PDFRef):
+                if ref in seen:
+                    continue
+                seen.add(ref)
+            node = self.resolve(ref)
+            if not isinstance(node, dict):
+                continue
+            kids = self.resolve(node.get('Kids'))
+            if node.get('Type') == 'Pages' or (kids is not None and node.get('Type') != 'Page'):
+                count = self.resolve(node.get('Count'))
+                if wanted and isinstance(count, int) and \
+                        not any(number < n <= number + count for n in wanted):
+                    number += count
+                    continue
+                if isinstance(kids, list):
+                    stack.extend(reversed(kids))
+            else:
+                number += 1
+                if not wanted or number in wanted:
+                    yield number, node
+
+    def contents(self, page):
+        """Returns the content streams of a page, in drawing order."""
+        contents = self.resolve(page.get('Contents'))
+        if isinstance(contents, PDFStream):
+            return [contents]
+        if isinstance(contents, list):
+            return [s for s in map(self.resolve, contents) if isinstance(s, PDFStream)]
+        return []
+
+# /Filter entry of a stream dictionary, for the heuristic scan: one name or
+# an array of names (with direct /DecodeParms only)
+_SCAN_FILTER = re.compile(rb'/Filter\s*(\[[^\]]*\]|/[^\s/\[\]<>()]+)')
+_SCAN_NAME = re.compile(rb'/([^\s/\[\]<>()]+)')
+_SCAN_HEADER = 4096
+
+def _scan_pdf_streams(data):
+    """
+    Heuristic fallback for files whose object structure cannot be read:
+    scans the raw bytes for stream blocks and keeps the ones that decode or
+    look like vector code. A stream is decoded with the /Filter names found
+    in the dictionary before it (parameters are not read, so e.g. PNG
+    predictors are not undone), else inflated if it can be. Yields an
+    iterator of data chunks per stream.
+    """
     # Regex to find stream blocks: stream\r\n ... \r\nendstream
     # We capture the content between the keywords.
     stream_pattern = re.compile(rb'stream[\r\n]+(.*?)[\r\n]+endstream', re.DOTALL)
 
-    extracted_text = []
-
     for match in stream_pattern.finditer(data):
         stream_bytes = match.group(1)
 
-        # Attempt 1: Try decompressing (FlateDecode is standard for plots)
-        try:
-            # zlib.decompress is strict; sometimes PDF streams have header issues.
-            # -15 allows raw decompression without zlib headers.
-            decompressed = zlib.decompress(stream_bytes)
-            text = decompressed.decode('latin-1', errors='ignore')
-            extracted_text.append(text)
-            continue
-        except zlib.error:
-            pass
+        # Attempt 1: the filters named in the stream dictionary, or
+        # FlateDecode (the standard for plots) when there is none
+        header = data[max(0, match.start() - _SCAN_HEADER):match.start()]
+        at = header.rfind(b'obj')
+        if at >= 0:
+            header = header[at:]
+        found = _SCAN_FILTER.search(header)
+        names = [n.decode('latin-1') for n in _SCAN_NAME.findall(found.group(1))] if found else []
+        chunks = decode_stream([stream_bytes], names or ['FlateDecode'], [None] * max(len(names), 1))
+        if chunks is not None:
+            try:
+                first = next(chunks, b'')
+            except DECODE_ERRORS:
+                pass
+            else:
+                yield itertools.chain([first], chunks)
+                continue
 
         # Attempt 2: Maybe it's not compressed? (Raw PostScript)
+        # Heuristic: does it look like vector code?
+        if b' m' in stream_bytes or b' l' in stream_bytes or b' re' in stream_bytes:
+            yield [stream_bytes]
+
+def _open_pdf(filename, pages=None):
+    """
+    Maps a PDF file and reads its structure.
+    Returns (buf, reader, [(page number, stream), ...]).
+    """
+    with open(filename, 'rb') as f:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        reader = PDFReader(buf)
+        streams = [(n, s) for n, page in reader.pages(pages) for s in reader.contents(page)]
+    except PDFSyntaxError:
+        return buf, None, None
+    return buf, reader, streams
+
+def extract_pdf_content(filename, pages=None, decode_limits=None, stats=None):
+    """
+    Walks the page tree of a PDF file and yields (page number, chunks) for
+    the content streams of every page, or only of the set of `pages`, where
+    `chunks` iterates over the stream's decoded data. Each stream must be
+    consumed before the next one is requested. Streams found by the
+    heuristic fallback scan have no page number (None); that scan is not
+    used when pages are selected. A RunStats in `stats` counts the streams.
+    """
+    if decode_limits is None:
+        decode_limits = DecodeLimits()
+    try:
+        buf, reader, streams = _open_pdf(filename, pages)
+    except FileNotFoundError:
+        return
+    except ValueError:
+        return  # Empty file
+
+    with buf:
+        if reader is None:
+            if pages:
+                say("  > Error: Unreadable PDF structure, pages cannot be selected.")
+                return
+            say("  > Warning: Unreadable PDF structure. Scanning raw streams (heuristic)...")
+            for chunks in _scan_pdf_streams(buf):
+                if stats is not None:
+                    stats.count('streams_found')
+                    stats.count('streams_decoded')
+                yield None, decode_limits.apply(_guarded(chunks))
+            return
+
+        if stats is not None:
+            stats.count('streams_found', len(streams))
+        for k, (number, stream) in enumerate(streams):
+            if decode_limits.exhausted():
+                say("  > Warning: Decoded data limit reached; remaining streams skipped.")
+                decode_limits.truncated = True
+                if stats is not None:
+                    stats.count('streams_skipped', len(streams) - k)
+                return
+            try:
+                chunks = reader.decoded_chunks(stream)
+            except PDFSyntaxError:
+                chunks = None
+            if chunks is None:
+                say("  > Warning: Skipping a content stream with unsupported or broken encoding.")
+                if stats is not None:
+                    stats.count('streams_skipped')
+                continue
+            if stats is not None:
+                stats.count('streams_decoded')
+            yield number, decode_limits.apply(_guarded(chunks))
+
+def pdf_page_numbers(filename, pages=None):
+    """
+    The numbers of the pages of a PDF that exist (of the set `pages` only,
+    if given); an empty set when the structure cannot be read.
+    """
+    try:
+        buf, reader, _ = _open_pdf(filename, pages)
+    except (FileNotFoundError, ValueError):
+        return set()
+    with buf:
+        if reader is None:
+            return set()
+        return {n for n, _ in reader.pages(pages)}
+
+def pdf_stream_jobs(filename, pages=None, stream_limit=None):
+    """
+    Describes the page content streams of a PDF as picklable jobs
+    (filename, start, end, filters, parms, stream limit) for the worker
+    processes.
+    Returns [(page number, job), ...], or None when the structure cannot
+    be read.
+    """
+    try:
+        buf, reader, streams = _open_pdf(filename, pages)
+    except (FileNotFoundError, ValueError):
+        return None
+    with buf:
+        if reader is None:
+            return None
+        return [(n, (filename, s.start, s.end) + reader.filters(s) + (stream_limit,))
+                for n, s in streams]
+
+def parse_page_spec(spec, what='page'):
+    """
+    Turns a page list like '12,40-42' into a set of page numbers (or of
+    other numbers counted from 1, named `what` in the errors).
+    """
+    pages = set()
+    for part in spec.split(','):
+        first, sep, last = part.strip().partition('-')
         try:
-            text = stream_bytes.decode('latin-1')
-            # Heuristic: does it look like vector code?
-            if ' m' in text or ' l' in text or ' re' in text:
-                extracted_text.append(text)
-        except UnicodeDecodeError:
-            pass
+            first = int(first)
+            last = int(last) if sep else first
+        except ValueError:
+            raise ValueError(f"bad {what} range '{part.strip()}'")
+        if first < 1 or last < first:
+            raise ValueError(f"bad {what} range '{part.strip()}'")
+        pages.update(range(first, last + 1))
+    return pages
 
-    return "\n".join(extracted_text)
+# =============================================================================
+# STREAMING TOKENIZER
+# The input is never held in memory as a whole: files are mapped and sliced
+# into CHUNK_SIZE pieces, PDF streams are handed over one by one, and the
+# tokens are produced lazily for the parser.
+# =============================================================================
+def iter_file_chunks(f, chunk_size=CHUNK_SIZE):
+    """Yields the contents of an open binary file in fixed-size slices."""
+    with f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            # Empty files and pipes cannot be mapped; read them instead.
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+        with mm:
+            for pos in range(0, len(mm), chunk_size):
+                yield mm[pos:pos + chunk_size]
+
+# Compressed PostScript is recognised by its magic bytes, whatever the
+# extension, and decompressed on the fly into the same chunks as above.
+COMPRESSIONS = (
+    (b'\x1f\x8b', 'gzip', gzip),
+    (b'BZh', 'bzip2', bz2),
+    (b'\xfd7zXZ\x00', 'xz', lzma),
+)
+COMPRESSED_EXTENSIONS = ('.gz', '.bz2', '.xz')
+_DECOMPRESS_ERRORS = (OSError, EOFError, zlib.error) + ((lzma.LZMAError,) if lzma else ())
+
+def strip_compression(path):
+    """The path without a compression extension ('plot.eps.gz' -> 'plot.eps')."""
+    base, ext = os.path.splitext(path)
+    return base if ext.lower() in COMPRESSED_EXTENSIONS else path
+
+def sniff_compression(f):
+    """
+    Returns (name, module) for an open binary file holding gzip, bzip2 or
+    xz data, or None. The file position is left unchanged.
+    """
+    head = f.peek(6)[:6]
+    for magic, name, module in COMPRESSIONS:
+        if head.startswith(magic):
+            if module is None:
+                raise ExtractionError(f"{name} compressed input needs Python's "
+                                      f"{'bz2' if name == 'bzip2' else 'lzma'} module.")
+            return name, module
+    return None
+
+def iter_compressed_chunks(f, module, chunk_size=CHUNK_SIZE):
+    """
+    Yields the decompressed contents of an open binary file in slices of
+    `chunk_size` bytes. Damaged or truncated data ends the input with a
+    warning, keeping what was decoded before it.
+    """
+    with f, module.open(f) as stream:
+        try:
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+        except _DECOMPRESS_ERRORS as e:
+            say(f"  > Warning: Damaged compressed input ({e}); using the part decoded so far.")
+
+_COMMENT = re.compile(rb'%[^\r\n]*')
+
+def _block_tokens(block):
+    """Splits complete lines into a token list, stripping '%' comments."""
+    if b'%' in block:
+        block = _COMMENT.sub(b'', block)
+    return block.split()
+
+def iter_token_blocks(chunks, max_line=CHUNK_SIZE):
+    """
+    Turns a sequence of byte chunks into lists of whitespace separated
+    tokens, one list per chunk, so that the splitting runs in C on whole
+    blocks of lines.
+
+    Lines may straddle chunk boundaries, so the unfinished line at the end
+    of each chunk is carried over to the next one. A line longer than
+    `max_line` is flushed up to its last complete token (or up to its
+    comment), which keeps memory bounded even for files without newlines.
+    """
+    tail = b''
+    in_comment = False
+    for chunk in chunks:
+        if in_comment:
+            eol = _EOL.search(chunk)
+            if eol is None:
+                continue
+            chunk = chunk[eol.start():]
+            in_comment = False
+
+        data = tail + chunk if tail else chunk
+        cut = max(data.rfind(b'\n'), data.rfind(b'\r'))
+        if cut >= 0:
+            block = _block_tokens(data[:cut + 1])
+            tail = data[cut + 1:]
+        else:
+            block = []
+            tail = data
+
+        if len(tail) > max_line:
+            pct = tail.find(b'%')
+            if pct >= 0:
+                block += tail[:pct].split()
+                tail = b''
+                in_comment = True
+            elif tail[-1:].isspace():
+                block += tail.split()
+                tail = b''
+            else:
+                parts = tail.split()
+                tail = parts.pop()
+                block += parts
+        if block:
+            yield block
+
+    if tail:
+        block = _block_tokens(tail)
+        if block:
+            yield block
+
+def iter_tokens(chunks, max_line=CHUNK_SIZE):
+    """Like iter_token_blocks, but yields the tokens one by one."""
+    return itertools.chain.from_iterable(iter_token_blocks(chunks, max_line))
 
 # =============================================================================
-# MAIN PARSING LOGIC
+# SEGMENT STORAGE
 # =============================================================================
-def get_plot_commands(filename):
-    """Dispatcher: Reads file based on extension."""
-    ext = os.path.splitext(filename)[1].lower()
+DEDUP_QUANTUM = 0.01     # page units (1/7200 inch) within which repeats match
 
-    if ext == '.pdf':
-        print("  > PDF detected. Scanning internal streams (heuristic)...")
-        content = extract_pdf_content(filename)
-        if not content:
-            print("  > Warning: No vector data streams found. File might be rasterized images.")
-        return content
-    else:
-        # PostScript / EPS (Text based)
+class SegmentStore:
+    """
+    Compact storage for polylines.
+
+    The coordinates of all points are kept interleaved (x0, y0, x1, y1, ...)
+    in a single array('d'), and segment k spans the points offsets[k] up to
+    offsets[k+1]. Points after the last offset form the open segment that is
+    still being drawn. This costs 16 bytes per point, where a tuple inside a
+    list costs more than 70.
+
+    boxes holds the bounding box (xmin, ymin, xmax, ymax) of the first
+    closed segments, four values each; update_boxes() completes it. The
+    parser calls it after every block, while the new points are still in
+    the cache, so the boxes cost no separate pass over the points.
+
+    styles holds the stroke style of the closed segments, as an index into
+    style_keys (see PathParser); the parser tags the segments when their
+    path is painted, so the last closed segments may wait untagged.
+    """
+    __slots__ = ('coords', 'offsets', 'boxes', 'styles', 'style_keys')
+
+    def __init__(self):
+        self.coords = array('d')
+        self.offsets = array('q', [0])
+        self.boxes = array('d')
+        self.styles = array('q')
+        self.style_keys = []
+
+    def __len__(self):
+        """Number of closed segments."""
+        return len(self.offsets) - 1
+
+    def __iter__(self):
+        """Yields each closed segment as an interleaved array('d')."""
+        coords, offsets = self.coords, self.offsets
+        for k in range(len(offsets) - 1):
+            yield coords[2 * offsets[k]:2 * offsets[k + 1]]
+
+    def open_points(self):
+        """Number of points in the open segment."""
+        return (len(self.coords) >> 1) - self.offsets[-1]
+
+    def total_points(self):
+        """Number of points in closed segments."""
+        return self.offsets[-1]
+
+    def close(self):
+        """Closes the open segment, if it has any points."""
+        n = len(self.coords) >> 1
+        if n > self.offsets[-1]:
+            self.offsets.append(n)
+
+    def update_boxes(self):
+        """Computes the bounding boxes of the segments closed since the last call."""
+        coords, offsets, boxes = self.coords, self.offsets, self.boxes
+        for k in range(len(boxes) >> 2, len(offsets) - 1):
+            start, end = 2 * offsets[k], 2 * offsets[k + 1]
+            xs, ys = coords[start:end:2], coords[start + 1:end:2]
+            boxes.extend((min(xs), min(ys), max(xs), max(ys)))
+
+    def style_id(self, key):
+        """Index of a style key in style_keys, adding it if new."""
         try:
-            with open(filename, 'r', errors='ignore') as f:
-                return f.read()
-        except FileNotFoundError:
-            print(f"Error: File {filename} not found.")
-            sys.exit(1)
+            return self.style_keys.index(key)
+        except ValueError:
+            self.style_keys.append(key)
+            return len(self.style_keys) - 1
+
+    def tag(self, style):
+        """Gives the untagged closed segments the style index `style`."""
+        self.styles.extend([style] * (len(self.offsets) - 1 - len(self.styles)))
+
+    def series_index(self):
+        """
+        {style index: array of segment numbers}, with the styles in the
+        order of their first segment.
+        """
+        index = {}
+        for k, style in enumerate(self.styles):
+            index.setdefault(style, array('q')).append(k)
+        return index
+
+    def extend(self, other, style_keys=None):
+        """
+        Appends the segments of `other`, including its open segment. The
+        segments of `other` keep their styles (given by `style_keys` in
+        place of other.style_keys, if set); if `other` has tagged segments,
+        those of this store must all be tagged.
+        """
+        base = len(self.coords) >> 1
+        # The boxes of `other` still fit if no open points merge into its first segment
+        del self.boxes[4 * (len(self.offsets) - 1):]
+        if base == self.offsets[-1]:
+            self.boxes.extend(other.boxes)
+        ids = [self.style_id(key) for key in (other.style_keys if style_keys is None else style_keys)]
+        self.styles.extend(ids[style] for style in other.styles)
+        self.coords.extend(other.coords)
+        self.offsets.extend(base + o for o in other.offsets[1:])
+
+    def dedup(self, quantum=DEDUP_QUANTUM):
+        """
+        Returns (new store, number of segments dropped) without the repeats
+        of earlier segments: same point count and same coordinates once
+        rounded to multiples of `quantum`. Each segment is fingerprinted
+        by a hash of its rounded coordinates, so this takes one pass.
+        Segments with non-finite coordinates are always kept.
+        """
+        kept = SegmentStore()
+        kept.style_keys = list(self.style_keys)
+        coords, offsets, styles = self.coords, self.offsets, self.styles
+        scale = 1.0 / quantum
+        seen = set()
+        for k in range(len(offsets) - 1):
+            start, end = 2 * offsets[k], 2 * offsets[k + 1]
+            segment = coords[start:end]
+            try:
+                if numpy is not None:
+                    values = numpy.rint(numpy.frombuffer(segment, dtype=numpy.float64) * scale)
+                    if not (numpy.abs(values) < 2.0 ** 63).all():
+                        raise ValueError
+                    rounded = values.astype(numpy.int64).tobytes()
+                else:
+                    rounded = array('q', [round(v * scale) for v in segment]).tobytes()
+            except (ValueError, OverflowError):
+                key = None
+            else:
+                key = (end - start, hashlib.blake2b(rounded, digest_size=16).digest())
+            if key is not None:
+                if key in seen:
+                    continue
+                seen.add(key)
+            kept.coords.extend(segment)
+            kept.offsets.append(len(kept.coords) >> 1)
+            kept.styles.append(styles[k])
+        return kept, len(self) - len(kept)
+
+    def filter(self, min_points, keep=None):
+        """
+        Returns a new store with the segments of more than `min_points`
+        (and, if `keep` is given, only the segment numbers in it).
+        """
+        kept = SegmentStore()
+        kept.style_keys = list(self.style_keys)
+        coords, offsets, styles = self.coords, self.offsets, self.styles
+        for k in range(len(offsets) - 1):
+            start, end = offsets[k], offsets[k + 1]
+            if end - start > min_points and (keep is None or k in keep):
+                kept.coords.extend(coords[2 * start:2 * end])
+                kept.offsets.append(len(kept.coords) >> 1)
+                kept.styles.append(styles[k])
+        return kept
 
-def extract_vector_data(input_file, user_limits=None, output_file=None):
-    # 1. Determine output filename
-    if output_file is None:
-        base, _ = os.path.splitext(input_file)
-        output_file = f"{base}.txt"
+# =============================================================================
+# VECTOR PATH PARSER
+# =============================================================================
+# Operator dispatch table: token -> opcode; every other token is an operand
+# (opcode 0). The opcodes of a token list form a bytes string, in which runs
+# of the same two-operand operator are found with a regular expression.
+# _PAINT stands for the operators that paint (stroke or fill) or discard
+# the current path; _CLOSE only ends a subpath.
+_MOVETO, _LINETO, _RLINETO, _RECT, _PAINT, _CLOSE = range(1, 7)
+_RGB, _GRAY, _CMYK, _WIDTH, _DASH, _SAVE, _RESTORE = range(7, 14)  # graphics state
+_OPERATORS = {
+    b'm': _MOVETO, b'M': _MOVETO, b'moveto': _MOVETO,
+    b'l': _LINETO, b'L': _LINETO, b'lineto': _LINETO,
+    b'V': _RLINETO, b'R': _RLINETO, b'rmoveto': _RLINETO, b'rlineto': _RLINETO,
+    b're': _RECT,
+    b'S': _PAINT, b's': _PAINT, b'stroke': _PAINT,
+    b'f': _PAINT, b'F': _PAINT, b'f*': _PAINT, b'B': _PAINT, b'B*': _PAINT,
+    b'b': _PAINT, b'b*': _PAINT, b'n': _PAINT, b'fill': _PAINT, b'eofill': _PAINT,
+    b'h': _CLOSE, b'closepath': _CLOSE,
+    b'RG': _RGB, b'setrgbcolor': _RGB,
+    b'G': _GRAY, b'setgray': _GRAY,
+    b'K': _CMYK, b'setcmykcolor': _CMYK,
+    b'w': _WIDTH, b'setlinewidth': _WIDTH,
+    b'd': _DASH, b'setdash': _DASH,
+    b'q': _SAVE, b'gsave': _SAVE,
+    b'Q': _RESTORE, b'grestore': _RESTORE,
+}
+_RUNS = re.compile(rb'(?:\x00\x00\x02){2,}|(?:\x00\x00\x03){2,}')
+
+# Tokens kept for the operators of the next block: up to 4 operands, or a
+# dash array ('[6 3 2 3] 0 d') of a few numbers
+MAX_OPERANDS = 16
+
+# Stroke style of a segment: ((r, g, b), line width, (dash array, phase)).
+# The defaults of PostScript and PDF: solid black lines 1 unit wide.
+DEFAULT_STYLE = ((0.0, 0.0, 0.0), 1.0, ((), 0.0))
+
+# A style component a detached parser could not know: the one the parser it
+# is adopted by has after `depth` restores, or, if that one has no state
+# saved that deep (a grestore without gsave changes nothing), the component
+# `before` the restore (see PathParser.adopt).
+_Inherited = namedtuple('_Inherited', 'depth before', defaults=(None,))
+
+def style_label(key):
+    """A style key as text: 'color #1f77b4, width 1.5, dash [6 3]'."""
+    color, width, (dash, phase) = key
+    if all(isinstance(c, float) for c in color):
+        color = '#' + ''.join(f"{min(255, max(0, round(c * 255))):02x}" for c in color)
+    text = f"color {color}, width {width:g}, "
+    if not dash:
+        return text + "solid"
+    return text + f"dash [{' '.join(f'{v:g}' for v in dash)}]" + (f" {phase:g}" if phase else "")
+
+def _opcodes(tokens, operators=_OPERATORS):
+    """The opcode of every token, as a bytes string."""
+    return bytes(map(operators.get, tokens, itertools.repeat(0)))
+
+# Procedure definitions in a PostScript prologue that may alias an operator:
+# '/V {rlineto} bind def', '/N {newpath moveto} def' or '/m /moveto load def'.
+# Only the first chunk of a file is scanned, where producers put them.
+_PS_NAME = rb'[^\s/{}()\[\]<>%]+'
+_PROCEDURE = re.compile(rb'/(' + _PS_NAME + rb')\s*(?:\{\s*(' + _PS_NAME + rb'(?:\s+' + _PS_NAME +
+                        rb')*)\s*\}\s*(?:bind\s+)?|/(' + _PS_NAME + rb')\s+load\s+)def(?!' + _PS_NAME + rb')')
+# Operators without operands that may precede the aliased one
+_NO_OPERANDS = frozenset((b'newpath',))
+
+def scan_procedures(head):
+    """
+    The procedure definitions found in `head` (bytes), as a tuple of
+    (name, body words) pairs in file order.
+    """
+    return tuple((m.group(1), tuple((m.group(2) or m.group(3)).split()))
+                 for m in _PROCEDURE.finditer(head))
 
-    print(f"Reading from: {input_file}")
+@functools.lru_cache(maxsize=64)
+def operator_table(definitions):
+    """
+    The operator table of a file: _OPERATORS plus every procedure of
+    `definitions` (see scan_procedures) whose body comes down to a single
+    known operator, so '/R {V} def' after '/V {rlineto} def' is resolved
+    too. Memoized: the files of one producer share a single table.
+    """
+    table = dict(_OPERATORS)
+    for name, body in definitions:
+        ops = [table.get(word, 0) for word in body if word not in _NO_OPERANDS]
+        if len(ops) == 1 and ops[0]:
+            table[name] = ops[0]
+    return table
+
+def read_prologue(chunks):
+    """
+    Builds the operator table from the first of the byte chunks of a
+    PostScript file and finds its producer (see detect_producer). Returns
+    (table, producer or None, chunks), the chunks including the first one
+    again.
+    """
+    chunks = iter(chunks)
+    head = next(chunks, b'')
+    return (operator_table(scan_procedures(head)), detect_producer(head),
+            itertools.chain((head,), chunks))
 
-    raw_content = get_plot_commands(input_file)
+def _lower(value, values):
+    """Running minimum as a sequential `if v < value` scan would find it."""
+    return min(values) if value is None else min(itertools.chain((value,), values))
 
-    # 2. Tokenize
-    clean_tokens = []
-    for line in raw_content.splitlines():
-        line = line.split('%')[0] # Strip comments
-        clean_tokens.extend(line.split())
+def _upper(value, values):
+    return max(values) if value is None else max(itertools.chain((value,), values))
 
-    # 3. Parse Vector Commands
-    all_segments = []
-    current_segment = []
+class PathParser:
+    """
+    Interprets path construction operators from a token stream.
+
+    The parser keeps its state (open segment, current point, bounds and the
+    operand window) between calls to feed(), so a document can be parsed
+    piecewise, e.g. one content stream at a time.
+
+    Tokens are classified with one lookup each in the operator table of
+    the file (`operators`, see operator_table; _OPERATORS by default). Runs of
+    'x y l' or 'dx dy V' are then converted and stored with a few calls per
+    run, and only the remaining operators are interpreted one at a time.
+    The results are identical to interpreting every operator in turn.
+
+    The stroke colour, line width and dash pattern are tracked, with the
+    gsave/grestore (q/Q) stack, and every segment is tagged with the style
+    in effect when its path is painted (store.styles), as PostScript and
+    PDF apply it: in '0 0 m 1 1 l 2 2 m 3 3 l 1 0 0 RG S' both subpaths
+    are red. Segments never painted get the style in effect at the end. A parser that starts in the
+    middle of a stream (`inherit`) does not know the state before it: the
+    components it has not set refer to the state of the parser that will
+    adopt it.
+    """
 
-    # Global Bounding Box (Page Coordinates)
-    ps_bounds = {'xmin': None, 'xmax': None, 'ymin': None, 'ymax': None}
+    def __init__(self, inherit=False, operators=None):
+        self.operators = _OPERATORS if operators is None else operators
+        self.store = SegmentStore()
+        # Global Bounding Box (Page Coordinates)
+        self.bounds = {'xmin': None, 'xmax': None, 'ymin': None, 'ymax': None}
+        self.x, self.y = 0.0, 0.0
+        # Rolling window holding the tokens preceding the current one,
+        # enough for the operands of any operator.
+        self.window = deque(maxlen=MAX_OPERANDS)
+        # Graphics state: current style, saved styles, and (with `inherit`)
+        # the number of restores past the start
+        self.inherit = inherit
+        self.style = (_Inherited(0),) * 3 if inherit else DEFAULT_STYLE
+        self.saved = []
+        self.underflow = 0
+        # Style of the first painting operator (it also paints the segments
+        # a detached parser's adopter has not painted yet)
+        self.first_paint = None
+
+    def feed_blocks(self, blocks):
+        """
+        Feeds token lists one after the other (see iter_token_blocks), and
+        the _Run items of iter_scanned_blocks.
+        """
+        for tokens in blocks:
+            if type(tokens) is _Run:
+                self.feed_run(tokens)
+            else:
+                self.feed(tokens)
+
+    def feed_run(self, run):
+        """
+        Parses a run of lineto or relative lineto operators cut out of the
+        input by a RunScanner, with the same result as feeding its tokens.
+        """
+        store = self.store
+        coords = store.coords
+        xs, ys = run.xs, run.ys
+        current_x, current_y = self.x, self.y
+        ps_bounds = self.bounds
+        xmin, xmax = ps_bounds['xmin'], ps_bounds['xmax']
+        ymin, ymax = ps_bounds['ymin'], ps_bounds['ymax']
+        if len(coords) >> 1 == store.offsets[-1]:
+            coords.append(current_x); coords.append(current_y)
+            if run.code == _RLINETO:
+                if xmin is None or current_x < xmin: xmin = current_x
+                if xmax is None or current_x > xmax: xmax = current_x
+                if ymin is None or current_y < ymin: ymin = current_y
+                if ymax is None or current_y > ymax: ymax = current_y
+        if run.code == _RLINETO:
+            xs = list(itertools.accumulate(xs, initial=current_x))[1:]
+            ys = list(itertools.accumulate(ys, initial=current_y))[1:]
+        points = xs + ys
+        points[0::2] = xs
+        points[1::2] = ys
+        coords.fromlist(points)
+        self.x, self.y = xs[-1], ys[-1]
+        ps_bounds.update(xmin=_lower(xmin, xs), xmax=_upper(xmax, xs),
+                         ymin=_lower(ymin, ys), ymax=_upper(ymax, ys))
+        self.window.extend(run.tail)
+
+    def feed(self, tokens):
+        """Parses a list of tokens continuing the ones fed before."""
+        window = self.window
+        carry = len(window)
+        head = list(window)
+        window.extend(tokens[-MAX_OPERANDS:])
+        if carry:
+            tokens = head + list(tokens)
+        codes = _opcodes(tokens, self.operators)
+
+        # Split the tokens into runs and the stretches between them. The
+        # carried tokens were interpreted before; runs may use them as
+        # operands only.
+        pieces = []
+        pos = carry
+        for m in _RUNS.finditer(codes, max(carry - 2, 0)):
+            pieces.append((pos, m.start(), 0))
+            pieces.append((m.start(), m.end(), codes[m.start() + 2]))
+            pos = m.end()
+        pieces.append((pos, len(tokens), 0))
+
+        store = self.store
+        offsets = store.offsets
+        coords = store.coords
+        push = coords.append
+        npoints = len(coords) >> 1         # points in the store
+        is_open = npoints > offsets[-1]    # the open segment has points
+        current_x, current_y = self.x, self.y
+        ps_bounds = self.bounds
+        xmin, xmax = ps_bounds['xmin'], ps_bounds['xmax']
+        ymin, ymax = ps_bounds['ymin'], ps_bounds['ymax']
+
+        for lo, hi, run in pieces:
+            if run:
+                # --- RUN OF LINETO / RELATIVE LINETO ---
+                try:
+                    xs = list(map(float, tokens[lo:hi:3]))
+                    ys = list(map(float, tokens[lo+1:hi:3]))
+                except ValueError:
+                    pass  # interpret the operators one by one below
+                else:
+                    if not is_open:
+                        push(current_x); push(current_y)
+                        npoints += 1
+                        is_open = True
+                        if run == _RLINETO:
+                            if xmin is None or current_x < xmin: xmin = current_x
+                            if xmax is None or current_x > xmax: xmax = current_x
+                            if ymin is None or current_y < ymin: ymin = current_y
+                            if ymax is None or current_y > ymax: ymax = current_y
+                    if run == _RLINETO:
+                        xs = list(itertools.accumulate(xs, initial=current_x))[1:]
+                        ys = list(itertools.accumulate(ys, initial=current_y))[1:]
+                    points = xs + ys
+                    points[0::2] = xs
+                    points[1::2] = ys
+                    coords.fromlist(points)
+                    npoints += len(xs)
+                    current_x, current_y = xs[-1], ys[-1]
+                    xmin, xmax = _lower(xmin, xs), _upper(xmax, xs)
+                    ymin, ymax = _lower(ymin, ys), _upper(ymax, ys)
+                    continue
+
+            for i in itertools.compress(range(lo, hi), codes[lo:hi]):
+                op = codes[i]
+                if op == _PAINT or op == _CLOSE:
+                    # --- STROKE/FILL/CLOSE ---
+                    if is_open:
+                        offsets.append(npoints)
+                        is_open = False
+                    if op == _PAINT:
+                        if self.first_paint is None:
+                            self.first_paint = self.style
+                        self._tag()
+                    continue
+
+                if op == _RECT:
+                    # --- RECTANGLE (x y w h re) --- (PDF specific)
+                    if i < 4:
+                        continue
+                    try:
+                        x = float(tokens[i-4])
+                        y = float(tokens[i-3])
+                        w = float(tokens[i-2])
+                        h = float(tokens[i-1])
+                    except ValueError:
+                        continue
+
+                    if is_open:
+                        offsets.append(npoints)
+                        is_open = False
+
+                    # Treat rectangle as a closed loop
+                    for px, py in ((x, y), (x+w, y), (x+w, y+h), (x, y+h), (x, y)):
+                        push(px); push(py)
+                    npoints += 5
+                    offsets.append(npoints)
+                    for px, py in ((x, y), (x+w, y+h)):
+                        if xmin is None or px < xmin: xmin = px
+                        if xmax is None or px > xmax: xmax = px
+                        if ymin is None or py < ymin: ymin = py
+                        if ymax is None or py > ymax: ymax = py
+                    continue
+
+                if op >= _RGB:
+                    # --- GRAPHICS STATE (colour, width, dash, save/restore) ---
+                    self._set_state(op, tokens, i)
+                    continue
+
+                if i < 2:
+                    continue
+                try:
+                    x = float(tokens[i-2])
+                    y = float(tokens[i-1])
+                except ValueError:
+                    continue
+
+                if op == _MOVETO:
+                    # --- MOVETO (x y m) ---
+                    if is_open:
+                        offsets.append(npoints)
+                        is_open = False
+                    current_x, current_y = x, y
+                    if xmin is None or x < xmin: xmin = x
+                    if xmax is None or x > xmax: xmax = x
+                    if ymin is None or y < ymin: ymin = y
+                    if ymax is None or y > ymax: ymax = y
+                    continue
+
+                if op == _LINETO:
+                    # --- LINETO (x y l) ---
+                    if not is_open:
+                        push(current_x); push(current_y)
+                        npoints += 1
+                        is_open = True
+                else:
+                    # --- RELATIVE LINETO (dx dy V) ---
+                    x = current_x + x
+                    y = current_y + y
+                    if not is_open:
+                        push(current_x); push(current_y)
+                        npoints += 1
+                        is_open = True
+                        if xmin is None or current_x < xmin: xmin = current_x
+                        if xmax is None or current_x > xmax: xmax = current_x
+                        if ymin is None or current_y < ymin: ymin = current_y
+                        if ymax is None or current_y > ymax: ymax = current_y
+
+                push(x); push(y)
+                npoints += 1
+                current_x, current_y = x, y
+                if xmin is None or x < xmin: xmin = x
+                if xmax is None or x > xmax: xmax = x
+                if ymin is None or y < ymin: ymin = y
+                if ymax is None or y > ymax: ymax = y
+
+        self.x, self.y = current_x, current_y
+        ps_bounds.update(xmin=xmin, xmax=xmax, ymin=ymin, ymax=ymax)
+        store.update_boxes()
+
+    def finish(self):
+        """Closes the open segment and returns the SegmentStore."""
+        self.store.close()
+        self.store.update_boxes()
+        self._tag()
+        return self.store
+
+    # --- Graphics state ------------------------------------------------------
+    def _tag(self, style=None):
+        """Tags the segments closed so far with `style` (the current one by default)."""
+        store = self.store
+        if len(store.styles) < len(store.offsets) - 1:
+            store.tag(store.style_id(self.style if style is None else style))
+
+    def _set_state(self, op, tokens, i):
+        """Interprets the graphics state operator at tokens[i]."""
+        color, width, dash = style = self.style
+        try:
+            if op == _RGB:
+                if i < 3:
+                    return
+                color = (float(tokens[i-3]), float(tokens[i-2]), float(tokens[i-1]))
+            elif op == _GRAY:
+                if i < 1:
+                    return
+                color = (float(tokens[i-1]),) * 3
+            elif op == _CMYK:
+                if i < 4:
+                    return
+                c, m, y, k = (float(t) for t in tokens[i-4:i])
+                color = ((1 - c) * (1 - k), (1 - m) * (1 - k), (1 - y) * (1 - k))
+            elif op == _WIDTH:
+                if i < 1:
+                    return
+                width = float(tokens[i-1])
+            elif op == _DASH:
+                # '[a b ...] phase': the array may be split into several tokens
+                if i < 2 or not tokens[i-2].endswith(b']'):
+                    return
+                for j in range(i - 2, max(i - MAX_OPERANDS, 0) - 1, -1):
+                    if tokens[j].startswith(b'['):
+                        break
+                else:
+                    return
+                values = b' '.join(tokens[j:i-1])[1:-1].split()
+                dash = (tuple(float(v) for v in values), float(tokens[i-1]))
+            elif op == _SAVE:
+                self.saved.append(style)
+                return
+            elif self.saved:
+                color, width, dash = self.saved.pop()
+            elif self.inherit:
+                self.underflow += 1
+                color, width, dash = (_Inherited(self.underflow, c) for c in style)
+            else:
+                return  # grestore without gsave
+        except ValueError:
+            return
+        self.style = (color, width, dash)
+
+    def _component(self, c, n):
+        """Component `n` of a style of a parser adopted by this one, in this one's terms."""
+        if not isinstance(c, _Inherited):
+            return c
+        if c.depth == 0:
+            return self.style[n]
+        if c.depth <= len(self.saved):
+            return self.saved[-c.depth][n]
+        before = self._component(c.before, n)
+        if self.inherit:
+            return _Inherited(self.underflow + c.depth - len(self.saved), before)
+        return before  # grestore without gsave
+
+    def _resolve(self, key):
+        """A style key of a parser adopted by this one, in terms of this one's state."""
+        return tuple(self._component(c, n) for n, c in enumerate(key))
+
+    def adopt(self, other):
+        """
+        Continues with the state of a parser that started at a moveto of
+        the same token stream (see parse_detached). The moveto closes the
+        open segment, and from there on `other` holds the exact result. The
+        first painting operator of `other` paints the segments still
+        waiting here.
+        """
+        self.store.close()
+        if other.first_paint is not None:
+            paint = self._resolve(other.first_paint)
+            self._tag(paint)
+            if self.first_paint is None:
+                self.first_paint = paint
+        self.store.extend(other.store, [self._resolve(key) for key in other.store.style_keys])
+        self.x, self.y = other.x, other.y
+        self.window = other.window
+        style = self._resolve(other.style)
+        saved = [self._resolve(key) for key in other.saved]
+        for _ in range(other.underflow):
+            if self.saved:
+                self.saved.pop()
+            elif self.inherit:
+                self.underflow += 1
+        self.saved += saved
+        self.style = style
+        for key, pick in (('xmin', min), ('xmax', max), ('ymin', min), ('ymax', max)):
+            values = [v for v in (self.bounds[key], other.bounds[key]) if v is not None]
+            self.bounds[key] = pick(values) if values else None
+
+def _is_number(token):
+    try:
+        float(token)
+        return True
+    except ValueError:
+        return False
 
-    def update_bounds(x, y):
-        if ps_bounds['xmin'] is None or x < ps_bounds['xmin']: ps_bounds['xmin'] = x
-        if ps_bounds['xmax'] is None or x > ps_bounds['xmax']: ps_bounds['xmax'] = x
-        if ps_bounds['ymin'] is None or y < ps_bounds['ymin']: ps_bounds['ymin'] = y
-        if ps_bounds['ymax'] is None or y > ps_bounds['ymax']: ps_bounds['ymax'] = y
+def parse_detached(tokens, operators=None):
+    """
+    Parses a piece of a token stream without knowing the state left behind
+    by the previous pieces.
+
+    Everything before the operands of the first moveto that lies wholly
+    inside the piece depends on that state and is returned untouched as
+    `prefix`. From the
+    moveto on, the current point is fully determined, so the rest is parsed
+    by a fresh PathParser using the table `operators`. Returns (prefix,
+    parser or None).
+    """
+    codes = _opcodes(tokens, _OPERATORS if operators is None else operators)
+    i = codes.find(_MOVETO, 2)
+    while i >= 0:
+        if _is_number(tokens[i-2]) and _is_number(tokens[i-1]):
+            parser = PathParser(inherit=True, operators=operators)
+            parser.feed(tokens[i-2:])
+            return tokens[:i-2], parser
+        i = codes.find(_MOVETO, i + 1)
+    return tokens, None
+
+def _parse_pdf_stream(job):
+    """
+    Worker: decodes one content stream and parses it detached.
+    Returns (decoded bytes, truncated, messages, prefix, parser or None),
+    or None if the stream cannot be decoded.
+    """
+    filename, start, end, filters, parms, stream_limit = job
+    with open(filename, 'rb') as f:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    log = []
+    with buf, messages_to(log.append):
+        raw = (buf[pos:min(pos + RAW_CHUNK, end)] for pos in range(start, end, RAW_CHUNK))
+        chunks = decode_stream(raw, filters, parms)
+        if chunks is None:
+            return None
+        limits = DecodeLimits(stream_limit, None)
+        tokens = list(iter_tokens(limits.apply(_guarded(chunks))))
+    return (limits.used, limits.truncated, log) + parse_detached(tokens)
+
+def _parse_pdf_stream_capped(parser, job, decode_limits):
+    """
+    Feeds the content stream of a worker job to `parser` in this process,
+    cut off at the caps of `decode_limits` like in a serial run.
+    """
+    filename, start, end, filters, parms, _ = job
+    with open(filename, 'rb') as f:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    with buf:
+        raw = (buf[pos:min(pos + RAW_CHUNK, end)] for pos in range(start, end, RAW_CHUNK))
+        parser.feed_blocks(iter_token_blocks(decode_limits.apply(
+            _guarded(decode_stream(raw, filters, parms)))))
+
+def parse_pdf_parallel(filename, jobs, pages=None, decode_limits=None, stats=None):
+    """
+    Decodes and parses the content streams of a PDF in a process pool and
+    merges the pieces in document order. The result is identical to a
+    serial run: a single PathParser for the whole document, or, when a set
+    of `pages` is given, a {page number: PathParser} dict with one parser
+    per page. Workers enforce the per-stream cap of `decode_limits`, the
+    merge the per-file one. Returns None, with a warning and a
+    'parallel_fallbacks' count, when the PDF structure cannot be read. A
+    RunStats in `stats` gets the streams and the time of the pool
+    (decoding, tokenizing and parsing are not told apart there).
+    """
+    if decode_limits is None:
+        decode_limits = DecodeLimits()
+    stream_jobs = pdf_stream_jobs(filename, pages, decode_limits.stream)
+    if stream_jobs is None:
+        say(f"  > Warning: Unreadable PDF structure; parsing serially instead of with {jobs} workers.")
+        if stats is not None:
+            stats.count('parallel_fallbacks')
+        return None
+
+    say(f"  > PDF detected. Parsing page content streams with {jobs} workers...")
+    parsers = {}
+    parser = PathParser()
+    if stats is not None:
+        stats.count('streams_found', len(stream_jobs))
+        entry = stats.phases.setdefault('workers', {'seconds': 0.0, 'bytes': 0})
+        start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        results = pool.map(_parse_pdf_stream, [job for _, job in stream_jobs])
+        for k, ((number, job), result) in enumerate(zip(stream_jobs, results)):
+            if pages:
+                parser = parsers.setdefault(number, PathParser())
+            if result is None:
+                say("  > Warning: Skipping a content stream with unsupported or broken encoding.")
+                if stats is not None:
+                    stats.count('streams_skipped')
+                continue
+            size, truncated, log, prefix, detached = result
+            if decode_limits.total is not None and decode_limits.used + size > decode_limits.total:
+                # Cut this stream where the serial run does: parse it again
+                # here, up to the remaining budget
+                pool.shutdown(cancel_futures=True)
+                _parse_pdf_stream_capped(parser, job, decode_limits)
+                if stats is not None:
+                    stats.count('streams_decoded')
+                    stats.count('streams_skipped', len(stream_jobs) - k - 1)
+                if k + 1 < len(stream_jobs):
+                    say("  > Warning: Decoded data limit reached; remaining streams skipped.")
+                break
+            for message in log:
+                say(message)
+            decode_limits.truncated |= truncated
+            decode_limits.used += size
+            if stats is not None:
+                stats.count('streams_decoded')
+                entry['bytes'] += size
+            parser.feed(prefix)
+            if detached is not None:
+                parser.adopt(detached)
+    if stats is not None:
+        entry['seconds'] += time.perf_counter() - start
+    if not stream_jobs:
+        say("  > Warning: No vector data streams found. File might be rasterized images.")
+    return parsers if pages else parser
+
+# A PostScript file is cut into pieces at line ends, about PS_PIECES_PER_JOB
+# per worker (so a slow piece does not hold up the others) and at least
+# PS_PIECE_MIN bytes long.
+PS_PIECE_MIN = 8 << 20
+PS_PIECES_PER_JOB = 4
+
+def ps_pieces(filename, jobs):
+    """
+    Returns the (start, end) byte ranges of the pieces of a PostScript
+    file for `jobs` workers, each ending at a line end (or at the end of
+    the file). Returns None for files that cannot be opened or mapped,
+    such as compressed ones; the serial path reports those.
+    """
+    try:
+        with open(filename, 'rb') as f:
+            if sniff_compression(f) is not None:
+                return None
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (ValueError, OSError):
+        return None
+    with buf:
+        size = len(buf)
+        target = max(PS_PIECE_MIN, -(-size // (PS_PIECES_PER_JOB * jobs)))
+        pieces = []
+        start = 0
+        while start < size:
+            m = _EOL.search(buf, start + target) if start + target < size else None
+            end = m.end() if m else size
+            pieces.append((start, end))
+            start = end
+    return pieces
+
+def _parse_ps_piece(job):
+    """
+    Worker: tokenizes one piece of a PostScript file and parses it
+    detached. Returns (prefix, parser or None), see parse_detached.
+    """
+    filename, start, end, operators = job
+    with open(filename, 'rb') as f:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    with buf:
+        chunks = (buf[pos:min(pos + CHUNK_SIZE, end)] for pos in range(start, end, CHUNK_SIZE))
+        prefix, parser = [], None
+        for block in iter_token_blocks(chunks):
+            if parser is not None:
+                parser.feed(block)
+                continue
+            prefix += block
+            if _MOVETO in _opcodes(block, operators):
+                prefix, parser = parse_detached(prefix, operators)
+    return prefix, parser
+
+def parse_ps_parallel(filename, jobs, stats=None):
+    """
+    Parses a PostScript file in pieces with a process pool and merges them
+    in file order; the result is identical to a serial run. Every piece is
+    parsed from its first moveto on, where the current point stops
+    depending on the pieces before; the tokens before it are parsed in
+    the merge. Returns the PathParser, or None when the file is too small
+    to split or cannot be split (compressed input).
+    """
+    pieces = ps_pieces(filename, jobs)
+    if pieces is None or len(pieces) < 2:
+        return None
+
+    with open(filename, 'rb') as f:
+        operators = operator_table(scan_procedures(f.read(CHUNK_SIZE)))
+    say(f"  > Parsing {len(pieces)} pieces of the file with {jobs} workers...")
+    parser = PathParser(operators=operators)
+    if stats is not None:
+        stats.count('pieces', len(pieces))
+        entry = stats.phases.setdefault('workers', {'seconds': 0.0, 'bytes': 0})
+        start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        results = pool.map(_parse_ps_piece, [(filename, s, e, operators) for s, e in pieces])
+        for prefix, detached in results:
+            parser.feed(prefix)
+            if detached is not None:
+                parser.adopt(detached)
+    if stats is not None:
+        entry['seconds'] += time.perf_counter() - start
+        entry['bytes'] += pieces[-1][1]
+    return parser
 
-    current_x, current_y = 0.0, 0.0
+# =============================================================================
+# PRODUCER FAST PATHS
+# Most plots come from a few producers with a very regular layout: gnuplot
+# draws a curve as a long run of 'dx dy V', matplotlib and cairo as a run
+# of 'x y l'. The producer is named in the header (%%Creator, or /Producer
+# in a PDF). The runs of its line operator are then located in each token
+# list by searching for that one operator and measuring the run with
+# strided slices, and converted directly, without classifying every token
+# through the operator table. Everything else (and a run with a malformed
+# number) goes the generic way, and the result is the same as that of a
+# generic parse.
+# =============================================================================
+_Producer = namedtuple('_Producer', 'name operator')
+PRODUCERS = {
+    'gnuplot': _Producer('gnuplot', b'V'),
+    'matplotlib': _Producer('matplotlib', b'l'),
+    'cairo': _Producer('cairo', b'l'),
+}
+_CREATOR = re.compile(rb'(?:%%Creator:|/Producer\s*\()\s*(' +
+                      b'|'.join(name.encode() for name in PRODUCERS) + rb')', re.I)
+
+def detect_producer(head):
+    """The PRODUCERS entry named in the header bytes `head`, or None."""
+    m = _CREATOR.search(head)
+    return PRODUCERS[m.group(1).decode().lower()] if m else None
+
+def pdf_producer(filename):
+    """
+    The producer of a PDF, from the /Producer of the document information,
+    which is looked for in the first and last CHUNK_SIZE bytes of the file.
+    """
+    try:
+        with open(filename, 'rb') as f:
+            head = f.read(CHUNK_SIZE)
+            f.seek(max(f.seek(0, os.SEEK_END) - CHUNK_SIZE, len(head)))
+            return detect_producer(head + b'\n' + f.read())
+    except OSError:
+        return None
 
-    i = 0
-    while i < len(clean_tokens):
-        token = clean_tokens[i]
+class _Run:
+    """A run of one line operator: its target points and last tokens."""
+    __slots__ = ('name', 'code', 'xs', 'ys', 'tail')
 
-        try:
-            # --- MOVETO (x y m) ---
-            if token in ['m', 'M', 'moveto'] and i >= 2:
-                x = float(clean_tokens[i-2])
-                y = float(clean_tokens[i-1])
+    def __init__(self, name, code, xs, ys, tail):
+        self.name, self.code, self.xs, self.ys, self.tail = name, code, xs, ys, tail
 
-                if current_segment:
-                    all_segments.append(current_segment)
-                    current_segment = []
+    def __len__(self):
+        """Number of tokens the run stands for."""
+        return 3 * len(self.xs)
 
-                current_x, current_y = x, y
-                update_bounds(x, y)
+class RunScanner:
+    """
+    Cuts the runs of a producer's line operator (two operands, then the
+    operator, repeated) out of token lists.
+    """
 
-            # --- LINETO (x y l) ---
-            elif token in ['l', 'L', 'lineto'] and i >= 2:
-                x = float(clean_tokens[i-2])
-                y = float(clean_tokens[i-1])
+    def __init__(self, producer, code):
+        self.operator = producer.operator
+        self.code = code
+
+    @classmethod
+    def for_file(cls, producer, operators):
+        """
+        The scanner for a producer, or None when there is none or the file
+        uses the producer's operator name for something else.
+        """
+        if producer is None:
+            return None
+        code = operators.get(producer.operator)
+        return cls(producer, code) if code in (_LINETO, _RLINETO) else None
+
+    def _run_length(self, tokens, i):
+        """The number of operators in the run whose first operator is tokens[i]."""
+        op = self.operator
+        good, step = 1, 16
+        while True:
+            bad = good + step
+            ops = tokens[i + 3 * good:i + 3 * bad:3]
+            if ops.count(op) < len(ops):
+                break
+            if len(ops) < step:
+                return good + len(ops)
+            good, step = bad, step * 2
+        while bad - good > 1:
+            mid = (good + bad) // 2
+            ops = tokens[i + 3 * good:i + 3 * mid:3]
+            if ops.count(op) < len(ops):
+                bad = mid
+            else:
+                good = mid
+        return good
+
+    def split(self, tokens):
+        """Yields the token lists and _Run items a token list consists of."""
+        op = self.operator
+        pos, i = 0, 2
+        while True:
+            try:
+                i = tokens.index(op, i)
+            except ValueError:
+                break
+            count = self._run_length(tokens, i)
+            start, end = i - 2, i + 3 * count - 2
+            if count < 2 or start < pos:
+                i += 1
+                continue
+            try:
+                xs = list(map(float, tokens[start:end:3]))
+                ys = list(map(float, tokens[start + 1:end:3]))
+            except ValueError:
+                i = end + 2  # left to the parser, which skips those operators
+                continue
+            if start > pos:
+                yield tokens[pos:start]
+            yield _Run(op, self.code, xs, ys, tokens[max(start, end - MAX_OPERANDS):end])
+            pos, i = end, end + 2
+        if pos == 0:
+            yield tokens
+        elif pos < len(tokens):
+            yield tokens[pos:]
+
+def iter_scanned_blocks(chunks, scanner, max_line=CHUNK_SIZE):
+    """
+    Like iter_token_blocks, but the runs that `scanner` finds come as
+    _Run items between the token lists.
+    """
+    for tokens in iter_token_blocks(chunks, max_line):
+        yield from scanner.split(tokens)
 
-                if not current_segment:
-                    current_segment.append((current_x, current_y))
+def select_tokenizer(producer, operators):
+    """
+    The tokenizer for a file: iter_scanned_blocks with the producer's
+    RunScanner when there is one, otherwise iter_token_blocks.
+    """
+    scanner = RunScanner.for_file(producer, operators)
+    if scanner is None:
+        return iter_token_blocks
+    say(f"  > {producer.name} output. Using its fast path...")
+    return functools.partial(iter_scanned_blocks, scanner=scanner)
 
-                current_segment.append((x, y))
-                current_x, current_y = x, y
-                update_bounds(x, y)
-
-            # --- RELATIVE LINETO (dx dy V) ---
-            elif token in ['V', 'R', 'rmoveto', 'rlineto'] and i >= 2:
-                dx = float(clean_tokens[i-2])
-                dy = float(clean_tokens[i-1])
-
-                dest_x = current_x + dx
-                dest_y = current_y + dy
-
-                if not current_segment:
-                    current_segment.append((current_x, current_y))
-                    update_bounds(current_x, current_y)
-
-                current_segment.append((dest_x, dest_y))
-                current_x, current_y = dest_x, dest_y
-                update_bounds(dest_x, dest_y)
-
-            # --- RECTANGLE (x y w h re) --- (PDF specific)
-            elif token == 're' and i >= 4:
-                x = float(clean_tokens[i-4])
-                y = float(clean_tokens[i-3])
-                w = float(clean_tokens[i-2])
-                h = float(clean_tokens[i-1])
-
-                if current_segment:
-                    all_segments.append(current_segment)
-
-                # Treat rectangle as a closed loop
-                rect_seg = [(x, y), (x+w, y), (x+w, y+h), (x, y+h), (x, y)]
-                all_segments.append(rect_seg)
-                current_segment = []
-                update_bounds(x, y)
-                update_bounds(x+w, y+h)
-
-            # --- STROKE/CLOSE ---
-            elif token in ['S', 's', 'stroke', 'h', 'closepath']:
-                if current_segment:
-                    all_segments.append(current_segment)
-                    current_segment = []
+# =============================================================================
+# SPATIAL INDEX AND PLOT FRAME
+# The segment boxes from the parse go into a uniform grid, so the axis frame
+# (a rectangle, or the spines meeting at a corner) and the curves inside it
+# are found by queries instead of scans over the points.
+# =============================================================================
+GRID_CELLS = 64          # cells per side at most
+FRAME_MIN_EDGE = 0.2     # frame edges span at least this share of the page
+FRAME_MIN_AREA = 0.05    # frames cover at least this share of the page
+FRAME_MIN_SHARE = 0.5    # and hold at least this share of the best frame's data
+
+class SegmentGrid:
+    """
+    Uniform grid over the page bounds. Each cell lists the segments whose
+    bounding box overlaps it. Segments covering more than a quarter of the
+    cells of a side (typically the data curves) are kept in one list that
+    every query checks, so they do not fill the grid.
+    """
+    __slots__ = ('boxes', 'x0', 'y0', 'sx', 'sy', 'n', 'cells', 'large')
+
+    def __init__(self, store, bounds):
+        store.update_boxes()
+        self.boxes = boxes = store.boxes
+        count = len(boxes) >> 2
+        self.n = n = max(1, min(GRID_CELLS, math.isqrt(count)))
+        self.x0 = bounds['xmin'] or 0.0
+        self.y0 = bounds['ymin'] or 0.0
+        self.sx = n / ((bounds['xmax'] or 0.0) - self.x0 or 1.0)
+        self.sy = n / ((bounds['ymax'] or 0.0) - self.y0 or 1.0)
+        self.cells = {}
+        self.large = []
+        for k in range(count):
+            x0, y0, x1, y1 = boxes[4 * k:4 * k + 4]
+            if not math.isfinite(x0 + y0 + x1 + y1):
+                continue
+            i0, i1 = self._span(x0, x1, self.x0, self.sx)
+            j0, j1 = self._span(y0, y1, self.y0, self.sy)
+            if 4 * (i1 - i0) >= n or 4 * (j1 - j0) >= n:
+                self.large.append(k)
+                continue
+            for i in range(i0, i1 + 1):
+                for j in range(j0, j1 + 1):
+                    self.cells.setdefault((i, j), []).append(k)
+
+    def _span(self, lo, hi, origin, scale):
+        """Cell range covering [lo, hi] on one axis, clamped to the grid."""
+        last = self.n - 1
+        return (min(max(int((lo - origin) * scale), 0), last),
+                min(max(int((hi - origin) * scale), 0), last))
+
+    def query(self, xmin, ymin, xmax, ymax):
+        """Returns the set of segments whose box intersects the rectangle."""
+        boxes = self.boxes
+        candidates = set(self.large)
+        i0, i1 = self._span(xmin, xmax, self.x0, self.sx)
+        j0, j1 = self._span(ymin, ymax, self.y0, self.sy)
+        for i in range(i0, i1 + 1):
+            for j in range(j0, j1 + 1):
+                candidates.update(self.cells.get((i, j), ()))
+        return {k for k in candidates
+                if boxes[4 * k] <= xmax and boxes[4 * k + 2] >= xmin
+                and boxes[4 * k + 1] <= ymax and boxes[4 * k + 3] >= ymin}
+
+def _overlap(lo, hi, rlo, rhi):
+    """Share of [lo, hi] inside [rlo, rhi]."""
+    if hi == lo:
+        return 1.0 if rlo <= lo <= rhi else 0.0
+    return max(0.0, min(hi, rhi) - max(lo, rlo)) / (hi - lo)
+
+def find_frame(store, bounds, grid=None, min_points=10):
+    """
+    Finds the axis frame of a plot: the rectangle, among the closed
+    rectangles of at most 5 points and the corners where a horizontal and
+    a vertical line meet, that holds the data curves (segments of more
+    than `min_points`). Of the candidates holding at least half as much
+    data as the best one, the smallest wins: the page background holds
+    the stray curves too, but it is larger, and legend boxes hold little
+    data. Returns {'xmin', 'xmax', 'ymin', 'ymax'} or None.
+    """
+    if bounds['xmin'] is None:
+        return None
+    if grid is None:
+        grid = SegmentGrid(store, bounds)
+    boxes, offsets, coords = grid.boxes, store.offsets, store.coords
+    width, height = bounds['xmax'] - bounds['xmin'], bounds['ymax'] - bounds['ymin']
+    tol = 1e-3 * max(width, height)
+
+    rects, hlines, vlines = set(), [], set()
+    for k in range(len(boxes) >> 2):
+        start, end = offsets[k], offsets[k + 1]
+        if end - start > 5:
+            continue
+        x0, y0, x1, y1 = box = tuple(boxes[4 * k:4 * k + 4])
+        if end - start == 2:
+            if y0 == y1 and x1 - x0 >= FRAME_MIN_EDGE * width:
+                hlines.append(box)
+            elif x0 == x1 and y1 - y0 >= FRAME_MIN_EDGE * height:
+                vlines.add(k)
+        elif end - start >= 4 and x0 < x1 and y0 < y1:
+            corners = set(zip(coords[2 * start:2 * end:2], coords[2 * start + 1:2 * end:2]))
+            if corners == {(x0, y0), (x1, y0), (x1, y1), (x0, y1)}:
+                rects.add(box)
+
+    # Spines: a vertical line with an end at an end of a horizontal one
+    for hx0, hy, hx1, _ in hlines:
+        for px in (hx0, hx1):
+            for k in grid.query(px - tol, hy - tol, px + tol, hy + tol) & vlines:
+                vx, vy0, _, vy1 = boxes[4 * k:4 * k + 4]
+                if abs(vx - px) <= tol and min(abs(vy0 - hy), abs(vy1 - hy)) <= tol:
+                    rects.add((hx0, min(hy, vy0), hx1, max(hy, vy1)))
+
+    scored = []
+    for rect in rects:
+        area = (rect[2] - rect[0]) * (rect[3] - rect[1])
+        if area < FRAME_MIN_AREA * width * height:
+            continue
+        score = 0.0
+        for k in grid.query(*rect):
+            points = offsets[k + 1] - offsets[k]
+            if points > min_points:
+                x0, y0, x1, y1 = boxes[4 * k:4 * k + 4]
+                score += points * _overlap(x0, x1, rect[0], rect[2]) * _overlap(y0, y1, rect[1], rect[3])
+        scored.append((score, area, rect))
+    if not scored:
+        return None
+    best = max(score for score, _, _ in scored)
+    if best <= 0:
+        return None
+    _, rect = min((area, rect) for score, area, rect in scored if score >= FRAME_MIN_SHARE * best)
+    return dict(zip(('xmin', 'ymin', 'xmax', 'ymax'), rect))
+
+# =============================================================================
+# CALIBRATION
+# The mapping of each axis is built once from the page bounds and the user
+# limits, then applied to whole coordinate arrays: with NumPy if it is
+# installed, otherwise in batches of plain Python floats.
+# =============================================================================
+CALIBRATION_BATCH = 1 << 16
+
+def axis_transform(ps_min, ps_max, user_min, user_max, is_log):
+    """
+    Returns a function that maps a sequence of page coordinates of one axis
+    to data units (linear, or logarithmic interpolation when `is_log`).
+    """
+    if ps_max == ps_min:
+        return lambda values: [user_min] * len(values)
 
+    span = ps_max - ps_min
+    if is_log:
+        try:
+            log_min = math.log10(user_min)
+            log_max = math.log10(user_max)
         except ValueError:
-            pass
-        i += 1
+            raise ExtractionError("User limits must be positive for log scale.")
+        log_range = log_max - log_min
+        if numpy is not None:
+            return lambda values: numpy.power(10.0, (values - ps_min) / span * log_range + log_min)
+        return lambda values: [10 ** ((v - ps_min) / span * log_range + log_min) for v in values]
+
+    user_range = user_max - user_min
+    if numpy is not None:
+        return lambda values: (values - ps_min) / span * user_range + user_min
+    return lambda values: [(v - ps_min) / span * user_range + user_min for v in values]
+
+def calibrate(store, ps_bounds, user_limits):
+    """Maps all points of a SegmentStore from page to data units, in place."""
+    coords = store.coords
+    if not coords:
+        return
+    to_x = axis_transform(ps_bounds['xmin'], ps_bounds['xmax'],
+                          user_limits['xmin'], user_limits['xmax'], user_limits['logx'])
+    to_y = axis_transform(ps_bounds['ymin'], ps_bounds['ymax'],
+                          user_limits['ymin'], user_limits['ymax'], user_limits['logy'])
+
+    if numpy is not None:
+        points = numpy.frombuffer(coords, dtype=numpy.float64).reshape(-1, 2)
+        points[:, 0] = to_x(points[:, 0])
+        points[:, 1] = to_y(points[:, 1])
+        del points  # Release the buffer export of the array
+        return
+
+    step = 2 * CALIBRATION_BATCH
+    for start in range(0, len(coords), step):
+        end = min(start + step, len(coords))
+        coords[start:end:2] = array('d', to_x(coords[start:end:2]))
+        coords[start + 1:end:2] = array('d', to_y(coords[start + 1:end:2]))
 
-    if current_segment:
-        all_segments.append(current_segment)
+# =============================================================================
+# CURVE SIMPLIFICATION
+# Dense curves (e.g. Matplotlib paths with hundreds of thousands of nearly
+# collinear points) are decimated within a tolerance, in page units before
+# the calibration or in data units after it.
+# =============================================================================
+SIMPLIFY_NUMPY_MIN = 256  # ranges at least this long are measured with NumPy
+SIMPLIFY_WINDOW = 1024    # points per independently simplified window
+SIMPLIFY_UNITS = ('page', 'data')
 
-    # 4. Filter Data (Heuristic: length > 10)
-    # This removes axes, ticks, and small symbols, keeping the main data curves.
-    data_segments = [seg for seg in all_segments if len(seg) > 10]
+def _rdp_keep(xs, ys, tolerance):
+    """
+    Ramer-Douglas-Peucker on one segment: returns the indices of the points
+    to keep. Ranges wait on an explicit stack, so a segment of any length
+    needs no recursion; each range keeps its farthest point from the chord
+    if that lies more than `tolerance` away, and is split there.
+
+    The segment starts out cut into windows of SIMPLIFY_WINDOW points whose
+    ends are kept. On noisy curves the splits are very uneven, and whole
+    segments would take time quadratic in their length; the windows bound
+    that at the cost of about one extra point per window.
+    """
+    n = len(xs)
+    if n < 3:
+        return range(n)
+    keep = bytearray(n)
+    keep[0:n:SIMPLIFY_WINDOW] = b'\x01' * len(range(0, n, SIMPLIFY_WINDOW))
+    keep[n - 1] = 1
+    if numpy is not None and n >= SIMPLIFY_NUMPY_MIN:
+        xa = numpy.frombuffer(xs, dtype=numpy.float64)
+        ya = numpy.frombuffer(ys, dtype=numpy.float64)
+    stack = [(first, min(first + SIMPLIFY_WINDOW, n - 1))
+             for first in range(0, n - 1, SIMPLIFY_WINDOW)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        x0, y0 = xs[first], ys[first]
+        dx, dy = xs[last] - x0, ys[last] - y0
+        chord = math.hypot(dx, dy)
+        if chord == 0:
+            # Closed loop: distance to the end point
+            chord = 1.0
+            if numpy is not None and last - first >= SIMPLIFY_NUMPY_MIN:
+                dists = numpy.hypot(xa[first + 1:last] - x0, ya[first + 1:last] - y0)
+                i = int(dists.argmax())
+            else:
+                dists = [math.hypot(x - x0, y - y0)
+                         for x, y in zip(xs[first + 1:last], ys[first + 1:last])]
+                i = max(range(len(dists)), key=dists.__getitem__)
+        else:
+            # |cross product| = distance to the chord line * chord length
+            c = dy * x0 - dx * y0
+            if numpy is not None and last - first >= SIMPLIFY_NUMPY_MIN:
+                dists = numpy.abs(dy * xa[first + 1:last] - dx * ya[first + 1:last] - c)
+                i = int(dists.argmax())
+            else:
+                dists = [abs(dy * x - dx * y - c)
+                         for x, y in zip(xs[first + 1:last], ys[first + 1:last])]
+                i = max(range(len(dists)), key=dists.__getitem__)
+        if dists[i] > tolerance * chord:
+            split = first + 1 + i
+            keep[split] = 1
+            stack.append((split, last))
+            stack.append((first, split))
+    return list(itertools.compress(range(n), keep))
+
+def simplify(store, tolerance):
+    """
+    Returns a new SegmentStore with every segment decimated to the points
+    that keep it within `tolerance` (in the units of the store) of the
+    original polyline. The end points of each segment are always kept.
+    """
+    kept = SegmentStore()
+    kept.styles = array('q', store.styles)
+    kept.style_keys = list(store.style_keys)
+    coords, offsets = store.coords, store.offsets
+    out = kept.coords
+    for k in range(len(offsets) - 1):
+        start, end = 2 * offsets[k], 2 * offsets[k + 1]
+        xs, ys = coords[start:end:2], coords[start + 1:end:2]
+        for i in _rdp_keep(xs, ys, tolerance):
+            out.append(xs[i]); out.append(ys[i])
+        kept.offsets.append(len(out) >> 1)
+    return kept
+
+# =============================================================================
+# OUTPUT
+# Every format is written straight from the SegmentStore buffers. Text is
+# produced in blocks of TEXT_BATCH points per write; the binary formats
+# dump the float64 coordinates as they are and keep the segment offsets in
+# a companion array.
+# =============================================================================
+OUTPUT_FORMATS = ('txt', 'csv', 'npy', 'npz', 'bin')
+
+TEXT_BATCH = 4096
 
-    print(f"Detected Page Bounds: X[{ps_bounds['xmin']:.1f}:{ps_bounds['xmax']:.1f}] Y[{ps_bounds['ymin']:.1f}:{ps_bounds['ymax']:.1f}]")
-    print(f"Filtered out {len(all_segments) - len(data_segments)} short segments (grid/axes).")
+def output_name(input_file, fmt='txt'):
+    """
+    Default output file: the input name with the format's extension (in
+    place of a compression extension too: 'plot.eps.gz' -> 'plot.txt').
+    """
+    base, _ = os.path.splitext(strip_compression(input_file))
+    return f"{base}.{fmt}"
+
+def _little_endian(arr):
+    if sys.byteorder == 'little':
+        return arr
+    swapped = array(arr.typecode, arr)
+    swapped.byteswap()
+    return swapped
+
+def _npy_header(descr, shape):
+    """Header of a version 1.0 .npy file holding a C-ordered array."""
+    header = "{'descr': '%s', 'fortran_order': False, 'shape': %r, }" % (descr, shape)
+    pad = -(10 + len(header) + 1) % 64
+    header = (header + ' ' * pad + '\n').encode('latin-1')
+    return b'\x93NUMPY\x01\x00' + len(header).to_bytes(2, 'little') + header
+
+def _write_npy(f, arr, descr, shape):
+    f.write(_npy_header(descr, shape))
+    f.write(memoryview(_little_endian(arr)).cast('B'))
+
+def _write_text(store, out, fmt, sep):
+    coords, offsets = store.coords, store.offsets
+    for k in range(len(offsets) - 1):
+        prefix = f"{k}," if fmt == 'csv' else ""
+        line = prefix + "%.6f" + sep + "%.6f\n"
+        for start in range(offsets[k], offsets[k + 1], TEXT_BATCH):
+            end = min(start + TEXT_BATCH, offsets[k + 1])
+            out.write((line * (end - start)) % tuple(coords[2 * start:2 * end]))
+        if fmt == 'txt':
+            out.write("\n")
+
+def write_output(store, output_file, fmt='txt', header=()):
+    """
+    Writes the segments of a SegmentStore in one of OUTPUT_FORMATS and
+    returns the number of points written.
+
+      txt : "X Y" lines, a blank line after each segment, '#' header lines.
+      csv : "segment,x,y" rows.
+      npy : (N, 2) float64 points, offsets in '<name>.offsets.npy'.
+      npz : 'points' (N, 2) and 'offsets' arrays in one archive.
+      bin : raw little-endian float64 x/y pairs, int64 offsets in
+            '<name>.offsets.bin'.
+
+    Segment k spans points offsets[k] to offsets[k+1].
+    """
+    points = store.total_points()
+    coords = store.coords[:2 * points]
+    offsets = store.offsets
+    base, _ = os.path.splitext(output_file)
+
+    if fmt in ('txt', 'csv'):
+        with open(output_file, 'w', buffering=1 << 20) as out:
+            if fmt == 'txt':
+                for line in header:
+                    out.write(f"# {line}\n")
+                _write_text(store, out, fmt, " ")
+            else:
+                out.write("segment,x,y\n")
+                _write_text(store, out, fmt, ",")
+    elif fmt == 'npy':
+        with open(output_file, 'wb') as f:
+            _write_npy(f, coords, '<f8', (points, 2))
+        with open(f"{base}.offsets.npy", 'wb') as f:
+            _write_npy(f, offsets, '<i8', (len(offsets),))
+    elif fmt == 'npz':
+        with zipfile.ZipFile(output_file, 'w', zipfile.ZIP_STORED, allowZip64=True) as z:
+            with z.open('points.npy', 'w', force_zip64=True) as f:
+                _write_npy(f, coords, '<f8', (points, 2))
+            with z.open('offsets.npy', 'w', force_zip64=True) as f:
+                _write_npy(f, offsets, '<i8', (len(offsets),))
+    elif fmt == 'bin':
+        with open(output_file, 'wb') as f:
+            f.write(memoryview(_little_endian(coords)).cast('B'))
+        with open(f"{base}.offsets.bin", 'wb') as f:
+            f.write(memoryview(_little_endian(offsets)).cast('B'))
+    else:
+        raise ValueError(f"unknown output format '{fmt}'")
+    return points
 
-    # 5. Conversion Logic
-    def convert_value(val, ps_min, ps_max, user_min, user_max, is_log):
-        if ps_max == ps_min: return user_min
-        # Normalize to 0..1
-        norm = (val - ps_min) / (ps_max - ps_min)
+# =============================================================================
+# PARSE CACHE
+# Parsing is by far the most expensive step, and its result only depends on
+# the file contents. With --cache the raw segments and page bounds are
+# stored on disk under a hash of the file, so re-running with different
+# calibration limits or output formats skips straight to those steps.
+# =============================================================================
+# Bump whenever a change to the parser alters the segments it produces.
+PARSER_VERSION = 4
+
+_CACHE_MAGIC = b'EXDC'
+_CACHE_HEADER = struct.Struct('<4sI4dQQQQ')
 
-        if is_log:
+def default_cache_dir():
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'ExtractData')
+
+class ParseCache:
+    """
+    Directory of parsed files, one '<key>.seg' file per entry, holding the
+    bounds and the SegmentStore arrays in binary form, followed by the
+    style keys as JSON. The total size is
+    kept under `max_bytes` by evicting the least recently used entries
+    (hits refresh the modification time).
+    """
+    __slots__ = ('directory', 'max_bytes')
+
+    def __init__(self, directory=None, max_bytes=512 << 20):
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+
+    def key(self, input_file, options=''):
+        """Hash of the file contents, the parser version and `options`."""
+        digest = hashlib.sha256(f"{PARSER_VERSION}\0{options}\0".encode())
+        with open(input_file, 'rb') as f:
+            for chunk in iter_file_chunks(f):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.seg')
+
+    def load(self, key):
+        """Returns (store, bounds) for `key`, or None on a miss."""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            return None
+        if len(data) < _CACHE_HEADER.size:
+            return None
+        (magic, version, xmin, xmax, ymin, ymax,
+         ncoords, noffsets, nstyles, nkeys) = _CACHE_HEADER.unpack_from(data)
+        if magic != _CACHE_MAGIC or version != PARSER_VERSION:
+            return None
+        if len(data) != _CACHE_HEADER.size + 8 * (ncoords + noffsets + nstyles) + nkeys:
+            return None
+
+        store = SegmentStore()
+        pos = _CACHE_HEADER.size
+        for name, count in (('coords', ncoords), ('offsets', noffsets), ('styles', nstyles)):
+            values = getattr(store, name)
+            del values[:]
+            values.frombytes(data[pos:pos + 8 * count])
+            if sys.byteorder != 'little':
+                values.byteswap()
+            pos += 8 * count
+        try:
+            store.style_keys = [(tuple(color), width, (tuple(dash), phase))
+                                for color, width, (dash, phase) in json.loads(data[pos:])]
+        except (ValueError, TypeError):
+            return None
+
+        bounds = {}
+        for name, value in zip(('xmin', 'xmax', 'ymin', 'ymax'), (xmin, xmax, ymin, ymax)):
+            bounds[name] = None if math.isnan(value) else value
+        return store, bounds
+
+    def save(self, key, store, bounds):
+        """Stores an entry (atomically) and evicts old ones if needed."""
+        os.makedirs(self.directory, exist_ok=True)
+        values = [math.nan if bounds[k] is None else bounds[k] for k in ('xmin', 'xmax', 'ymin', 'ymax')]
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            keys = json.dumps(store.style_keys).encode()
+            f.write(_CACHE_HEADER.pack(_CACHE_MAGIC, PARSER_VERSION, *values,
+                                       len(store.coords), len(store.offsets),
+                                       len(store.styles), len(keys)))
+            f.write(memoryview(_little_endian(store.coords)).cast('B'))
+            f.write(memoryview(_little_endian(store.offsets)).cast('B'))
+            f.write(memoryview(_little_endian(store.styles)).cast('B'))
+            f.write(keys)
+        os.replace(tmp, path)
+        self.evict()
+
+    def evict(self):
+        """Removes least recently used entries until under max_bytes."""
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith('.seg'):
+                continue
             try:
-                log_min = math.log10(user_min)
-                log_max = math.log10(user_max)
-                return 10 ** (norm * (log_max - log_min) + log_min)
-            except ValueError:
-                print("Error: User limits must be positive for log scale.")
-                sys.exit(1)
+                st = os.stat(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                continue  # Removed by a concurrent run
+            entries.append((st.st_mtime, st.st_size, name))
+            total += st.st_size
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+            total -= size
+
+# =============================================================================
+# RUN STATISTICS
+# With --stats every phase books its time and the amount of data it handled,
+# and the PDF streams, tokens, operators and segments are counted. The
+# streaming phases (read or decode, then tokenize) run interleaved, pulled
+# by the parser: each is booked the time spent producing its own items, and
+# the phases around them their time less that of the inner ones. Nothing is
+# measured unless a RunStats is passed in.
+# =============================================================================
+class RunStats:
+    """
+    Diagnostics of one extraction.
+
+    phases    : {name: {'seconds': ..., 'bytes' or 'tokens': ...}} in
+                pipeline order
+    counts    : {name: number} (streams_found, tokens, segments_kept, ...)
+    operators : Counter of the path operators that were recognised
+    words     : Counter of the other operator-like tokens (words starting
+                with a letter), e.g. to spot unsupported drawing commands
+    """
+    __slots__ = ('phases', 'counts', 'operators', 'words')
+
+    def __init__(self):
+        self.phases = {}
+        self.counts = {}
+        self.operators = Counter()
+        self.words = Counter()
+
+    def count(self, key, n=1):
+        self.counts[key] = self.counts.get(key, 0) + n
+
+    def _booked(self, names):
+        return sum(self.phases[n]['seconds'] for n in names if n in self.phases)
+
+    @contextlib.contextmanager
+    def phase(self, name, inner=()):
+        """Books the time of a block to `name`, less that of the `inner` phases."""
+        entry = self.phases.setdefault(name, {'seconds': 0.0})
+        start, before = time.perf_counter(), self._booked(inner)
+        try:
+            yield entry
+        finally:
+            entry['seconds'] += time.perf_counter() - start - (self._booked(inner) - before)
+
+    def timed(self, name, items, unit=None, inner=()):
+        """
+        Passes `items` through, booking the time spent producing them (less
+        that of the `inner` phases) and their total length in `unit` to
+        `name`.
+        """
+        entry = self.phases.setdefault(name, {'seconds': 0.0})
+        if unit:
+            entry.setdefault(unit, 0)
+        return self._timed(entry, iter(items), unit, inner)
+
+    def _timed(self, entry, items, unit, inner):
+        clock = time.perf_counter
+        while True:
+            start, before = clock(), self._booked(inner)
+            item = next(items, None)
+            entry['seconds'] += clock() - start - (self._booked(inner) - before)
+            if item is None:
+                return
+            if unit:
+                entry[unit] += len(item)
+            yield item
+
+    def _histogram(self, blocks, operators):
+        for tokens in blocks:
+            if type(tokens) is _Run:
+                self.operators[tokens.name] += len(tokens.xs)
+                self.count('tokens', len(tokens))
+                yield tokens
+                continue
+            words = [t for t in tokens if t[:1].isalpha()]
+            self.operators.update(w for w in words if w in operators)
+            self.words.update(w for w in words if w not in operators)
+            self.count('tokens', len(tokens))
+            yield tokens
+
+    def parse(self, parser, chunks, source, tokenize=iter_token_blocks):
+        """Feeds byte chunks to a PathParser through timed tokenizer stages;
+        `source` names the phase producing the chunks ('read' or 'decode'),
+        `tokenize` turns them into blocks (iter_token_blocks by default)."""
+        chunks = self.timed(source, chunks, 'bytes')
+        blocks = self.timed('tokenize', tokenize(chunks), 'tokens', (source,))
+        blocks = self.timed('histogram', self._histogram(blocks, parser.operators), None,
+                            (source, 'tokenize'))
+        with self.phase('parse', (source, 'tokenize', 'histogram')):
+            parser.feed_blocks(blocks)
+
+    def as_dict(self):
+        phases = {name: dict(entry, seconds=round(entry['seconds'], 6))
+                  for name, entry in self.phases.items()}
+        return {'phases': phases, 'counts': dict(self.counts),
+                'operators': {op.decode('latin-1'): n for op, n in self.operators.most_common()},
+                'other_words': {w.decode('latin-1'): n for w, n in self.words.most_common(20)}}
+
+    def report(self):
+        """The statistics as lines of text."""
+        lines = ["Run statistics:"]
+        for name, entry in self.phases.items():
+            sizes = ', '.join(f"{entry[unit]} {unit}" for unit in ('bytes', 'tokens') if unit in entry)
+            lines.append(f"  {name:<10} {entry['seconds']:9.4f} s  {sizes}".rstrip())
+        lines.append(f"  {'total':<10} {sum(e['seconds'] for e in self.phases.values()):9.4f} s")
+        for key, value in self.counts.items():
+            lines.append(f"  {key}: {value}")
+        if self.operators:
+            lines.append("  operators: " + ', '.join(f"{op.decode('latin-1')} {n}"
+                                                     for op, n in self.operators.most_common()))
+        if self.words:
+            lines.append("  other words: " + ', '.join(f"{w.decode('latin-1')} {n}"
+                                                       for w, n in self.words.most_common(10)))
+        return lines
+
+def _phase(stats, name):
+    """stats.phase(name), or nothing when no statistics are collected."""
+    return contextlib.nullcontext() if stats is None else stats.phase(name)
+
+def save_profile(profiler, path, top=15):
+    """Writes a cProfile result to `path` and prints its costliest functions."""
+    profiler.dump_stats(path)
+    print(f"Profile written to '{path}' (inspect with: python -m pstats {path})")
+    pstats.Stats(profiler, stream=sys.stdout).sort_stats('cumulative').print_stats(top)
+
+# =============================================================================
+# MAIN PARSING LOGIC
+# =============================================================================
+def _pdf_chunks(streams):
+    """
+    Concatenates the chunk iterators of PDF streams, separating streams by
+    a newline, and warns when none was found.
+    """
+    found = False
+    for chunks in streams:
+        if found:
+            yield b'\n'
+        found = True
+        yield from chunks
+    if not found:
+        say("  > Warning: No vector data streams found. File might be rasterized images.")
+
+def get_plot_commands(filename, decode_limits=None, stats=None):
+    """Dispatcher: Returns the byte chunks of a file based on its extension."""
+    ext = os.path.splitext(filename)[1].lower()
+
+    if ext == '.pdf':
+        say("  > PDF detected. Reading page content streams...")
+        return _pdf_chunks(chunks for _, chunks in
+                           extract_pdf_content(filename, None, decode_limits, stats))
+    else:
+        # PostScript / EPS (Text based), possibly compressed
+        try:
+            f = open(filename, 'rb')
+        except FileNotFoundError:
+            raise ExtractionError(f"File {filename} not found.")
+        try:
+            compression = sniff_compression(f)
+            if compression is not None and \
+                    os.path.splitext(strip_compression(filename))[1].lower() == '.pdf':
+                raise ExtractionError("Compressed PDF files are not supported; "
+                                      "decompress them first.")
+        except ExtractionError:
+            f.close()
+            raise
+        if compression is None:
+            return iter_file_chunks(f)
+        say(f"  > {compression[0]} compressed input. Decompressing on the fly...")
+        return iter_compressed_chunks(f, compression[1])
+
+def parse_file(input_file, jobs=1, cache=None, decode_limits=None, stats=None):
+    """
+    Tokenizes and parses a whole file, or takes the result from the
+    ParseCache. Returns (SegmentStore, page bounds).
+    """
+    cached = key = None
+    if cache is not None:
+        with _phase(stats, 'cache'):
+            key = cache.key(input_file)
+            cached = cache.load(key)
+    if cached is not None:
+        say("  > Using cached segments (parsing skipped).")
+        if stats is not None:
+            stats.count('cache_hits')
+        return cached
+
+    is_pdf = os.path.splitext(input_file)[1].lower() == '.pdf'
+    parser = None
+    if jobs > 1 and is_pdf:
+        parser = parse_pdf_parallel(input_file, jobs, None, decode_limits, stats)
+    elif jobs > 1:
+        parser = parse_ps_parallel(input_file, jobs, stats)
+    if parser is None:
+        chunks = get_plot_commands(input_file, decode_limits, stats)
+        with _phase(stats, 'prologue'):
+            if is_pdf:
+                operators, producer = _OPERATORS, pdf_producer(input_file)
+            else:
+                operators, producer, chunks = read_prologue(chunks)
+        parser = PathParser(operators=operators)
+        tokenize = select_tokenizer(producer, operators)
+        if stats is None:
+            parser.feed_blocks(tokenize(chunks))
         else:
-            return norm * (user_max - user_min) + user_min
+            stats.parse(parser, chunks, 'decode' if is_pdf else 'read', tokenize)
 
-    # 6. Write Output
-    with open(output_file, 'w') as out:
-        out.write(f"# Data extracted from {os.path.basename(input_file)}\n")
-
-        if user_limits:
-            out.write(f"# Calibrated using: X[{user_limits['xmin']}:{user_limits['xmax']}] Y[{user_limits['ymin']}:{user_limits['ymax']}]\n")
-            if user_limits['logx']: out.write("# X-Axis: Logarithmic\n")
-            if user_limits['logy']: out.write("# Y-Axis: Logarithmic\n")
-            out.write("# Column 1: X (calibrated) Column 2: Y (calibrated)\n")
+    all_segments = parser.finish()
+    if key is not None and not decode_limits.truncated:
+        try:
+            cache.save(key, all_segments, parser.bounds)
+        except OSError as e:
+            say(f"  > Warning: Could not write the parse cache: {e}")
+    return all_segments, parser.bounds
+
+def parse_pages(input_file, pages, jobs=1, cache=None, decode_limits=None, stats=None):
+    """
+    Parses selected pages of a PDF. Only the content streams of those
+    pages are decoded. Returns {page number: (SegmentStore, page bounds)}
+    for the pages that were found, pages without content included.
+    """
+    # Parsed pages, from the cache where possible: {page: (store, bounds)}
+    parsed = {}
+    keys = {}
+    if cache is not None:
+        base_key = cache.key(input_file, 'pages')
+        with _phase(stats, 'cache'):
+            for n in pages:
+                keys[n] = f"{base_key}-p{n}"
+                hit = cache.load(keys[n])
+                if hit is not None:
+                    parsed[n] = hit
+        if parsed:
+            say(f"  > Using cached segments for {len(parsed)} page(s).")
+            if stats is not None:
+                stats.count('cache_hits', len(parsed))
+
+    missing = set(pages) - set(parsed)
+    if missing:
+        parsers = None
+        if jobs > 1:
+            parsers = parse_pdf_parallel(input_file, jobs, missing, decode_limits, stats)
+        if parsers is None:
+            say("  > PDF detected. Reading the content streams of the selected pages...")
+            parsers = {}
+            tokenize = select_tokenizer(pdf_producer(input_file), _OPERATORS)
+            streams = extract_pdf_content(input_file, missing, decode_limits, stats)
+            for number, group in itertools.groupby(streams, key=lambda item: item[0]):
+                parsers[number] = PathParser()
+                chunks = _pdf_chunks(chunks for _, chunks in group)
+                if stats is None:
+                    parsers[number].feed_blocks(tokenize(chunks))
+                else:
+                    stats.parse(parsers[number], chunks, 'decode', tokenize)
+        for number, parser in parsers.items():
+            parsed[number] = (parser.finish(), parser.bounds)
+            if cache is not None and not decode_limits.truncated:
+                try:
+                    cache.save(keys[number], *parsed[number])
+                except OSError as e:
+                    say(f"  > Warning: Could not write the parse cache: {e}")
+
+    # Pages without (readable) content streams are present, and empty
+    missing = set(pages) - set(parsed)
+    if missing and not decode_limits.truncated:
+        for n in pdf_page_numbers(input_file, missing):
+            parsed[n] = (SegmentStore(), {'xmin': None, 'xmax': None, 'ymin': None, 'ymax': None})
+    for n in sorted(set(pages) - set(parsed)):
+        if decode_limits.truncated:
+            say(f"  > Warning: Page {n} skipped (decoded data limit reached).")
         else:
-            out.write("# Column 1: X (raw coord) Column 2: Y (raw coord)\n")
-
-        total_points = 0
-        for segment in data_segments:
-            for x_raw, y_raw in segment:
-                if user_limits:
-                    x_out = convert_value(x_raw, ps_bounds['xmin'], ps_bounds['xmax'],
-                                        user_limits['xmin'], user_limits['xmax'], user_limits['logx'])
-                    y_out = convert_value(y_raw, ps_bounds['ymin'], ps_bounds['ymax'],
-                                        user_limits['ymin'], user_limits['ymax'], user_limits['logy'])
+            say(f"  > Warning: Page {n} not found.")
+    return parsed
+
+# =============================================================================
+# LIBRARY API
+# extract() runs the whole pipeline in-process and returns the segments,
+# without writing files; the command line below is a thin wrapper that
+# writes the results. In a long-running program:
+#
+#     from ExtractData import extract, ExtractionError
+#     result = extract('plot.pdf', {'xmin': 0, 'xmax': 10, 'ymin': 1, 'ymax': 1e3,
+#                                   'logy': True})
+#     for line in result.polylines():
+#         ...
+# =============================================================================
+class ExtractionError(Exception):
+    """The plot cannot be extracted (missing file, no vector data, ...)."""
+
+class ExtractionResult:
+    """
+    The data curves of one plot (one page of a PDF with `pages`).
+
+    segments : SegmentStore with the curves that passed the filter, in data
+               units when calibrated (page units otherwise)
+    bounds   : page bounds {'xmin', 'xmax', 'ymin', 'ymax'} of all vectors
+    frame    : page bounds of the axis frame the calibration used, or None
+    limits   : the calibration limits used, or None
+    stats    : {'points', 'segments', 'filtered'[, 'outside', 'other_series',
+               'duplicates', 'simplified']}
+    series   : {series number: style key} of the curves, see split()
+    source   : the input file; page: the page number or None
+    messages : the progress messages and warnings of the run
+    """
+    __slots__ = ('source', 'page', 'segments', 'bounds', 'frame', 'limits', 'stats', 'series',
+                 'messages')
+
+    def __init__(self, source, page, segments, bounds, limits, stats, messages='', frame=None,
+                 series=None):
+        self.source = source
+        self.page = page
+        self.segments = segments
+        self.bounds = bounds
+        self.frame = frame
+        self.limits = limits
+        self.stats = stats
+        self.series = series or {}
+        self.messages = messages
+
+    def __len__(self):
+        """Number of curves."""
+        return len(self.segments)
+
+    def __repr__(self):
+        page = '' if self.page is None else f", page {self.page}"
+        return (f"<ExtractionResult {os.path.basename(self.source)}{page}: "
+                f"{self.stats['segments']} curves, {self.stats['points']} points>")
+
+    def polylines(self):
+        """Returns the curves as lists of (x, y) tuples."""
+        return [list(zip(seg[0::2], seg[1::2])) for seg in self.segments]
+
+    def numpy(self):
+        """Returns (points, offsets): an (N, 2) float64 array and the
+        segment offsets (curve k spans points[offsets[k]:offsets[k+1]])."""
+        if numpy is None:
+            raise ImportError("numpy is not installed")
+        points = numpy.array(self.segments.coords, dtype=numpy.float64).reshape(-1, 2)
+        return points, numpy.array(self.segments.offsets, dtype=numpy.int64)
+
+    def split(self):
+        """
+        Returns the curves of each series (same stroke colour, width and
+        dash pattern) as {series number: SegmentStore}.
+        """
+        segments = self.segments
+        numbers = {key: n for n, key in self.series.items()}
+        parts = {}
+        for style, ks in segments.series_index().items():
+            parts[numbers[segments.style_keys[style]]] = segments.filter(0, set(ks))
+        return dict(sorted(parts.items()))
+
+_LIMIT_KEYS = ('xmin', 'xmax', 'ymin', 'ymax')
+
+def _check_limits(user_limits):
+    """Completes calibration limits (logx / logy default to linear)."""
+    if not user_limits:
+        return None
+    if any(user_limits.get(k) is None for k in _LIMIT_KEYS):
+        raise ExtractionError("For calibration, all bounds are needed: xmin, xmax, ymin, ymax")
+    limits = {'logx': False, 'logy': False}
+    limits.update(user_limits)
+    for axis in ('x', 'y'):
+        if limits['log' + axis] and (limits[axis + 'min'] <= 0 or limits[axis + 'max'] <= 0):
+            raise ExtractionError("User limits must be positive for log scale.")
+    return limits
+
+def _make_result(all_segments, ps_bounds, user_limits, source, page=None, use_frame=False,
+                 tolerance=None, units='page', quantum=None, series=None, run_stats=None):
+    """
+    Filters and calibrates parsed segments into an ExtractionResult. With
+    `use_frame`, the curves are calibrated to the detected axis frame and
+    the ones lying wholly outside it are dropped. The styles of the curves
+    that pass the filter are numbered as series in order of appearance;
+    with a set of `series` numbers, only their curves are kept. With a
+    `quantum`, curves repeating an earlier one are dropped. With a
+    `tolerance`, the curves are simplified in page or data `units`.
+    """
+    if run_stats is not None:
+        run_stats.count('segments_parsed', len(all_segments))
+        run_stats.count('points_parsed', all_segments.total_points())
+    frame = inside = None
+    if use_frame:
+        with _phase(run_stats, 'frame'):
+            grid = SegmentGrid(all_segments, ps_bounds)
+            frame = find_frame(all_segments, ps_bounds, grid)
+        if frame is None:
+            say("  > Warning: No plot frame found; calibrating to the page bounds.")
+        else:
+            inside = grid.query(frame['xmin'], frame['ymin'], frame['xmax'], frame['ymax'])
+
+    # 4. Filter Data (Heuristic: length > 10)
+    # This removes axes, ticks, and small symbols, keeping the main data curves.
+    with _phase(run_stats, 'filter'):
+        data_segments = all_segments.filter(10)
+        stats = {'filtered': len(all_segments) - len(data_segments)}
+        if inside is not None:
+            data_segments = all_segments.filter(10, inside)
+            stats['outside'] = len(all_segments) - len(data_segments) - stats['filtered']
+
+    styles = data_segments.series_index()
+    numbers = {data_segments.style_keys[style]: n for n, style in enumerate(styles, 1)}
+    if series:
+        keep = set()
+        for style, ks in styles.items():
+            if numbers[data_segments.style_keys[style]] in series:
+                keep.update(ks)
+        stats['other_series'] = len(data_segments) - len(keep)
+        data_segments = data_segments.filter(0, keep)
+
+    if quantum:
+        with _phase(run_stats, 'dedup'):
+            data_segments, stats['duplicates'] = data_segments.dedup(quantum)
+
+    points = data_segments.total_points()
+    if tolerance is not None and units == 'page':
+        with _phase(run_stats, 'simplify'):
+            data_segments = simplify(data_segments, tolerance)
+
+    # 5. Calibration (one transform per axis, applied to all points at once)
+    if user_limits:
+        with _phase(run_stats, 'calibrate'):
+            calibrate(data_segments, frame or ps_bounds, user_limits)
+
+    if tolerance is not None and units == 'data':
+        with _phase(run_stats, 'simplify'):
+            data_segments = simplify(data_segments, tolerance)
+    if tolerance is not None:
+        stats['simplified'] = points - data_segments.total_points()
+
+    stats.update(points=data_segments.total_points(), segments=len(data_segments))
+    if run_stats is not None:
+        run_stats.count('segments_kept', stats['segments'])
+        run_stats.count('points_kept', stats['points'])
+    present = {data_segments.style_keys[style] for style in set(data_segments.styles)}
+    return ExtractionResult(source, page, data_segments, dict(ps_bounds), user_limits, stats,
+                            frame=frame, series={n: key for key, n in numbers.items()
+                                                 if key in present})
+
+def extract(path, limits=None, jobs=1, cache=None, pages=None, decode_limits=None,
+            verbose=False, frame=False, simplify=None, simplify_units='page', dedup=None,
+            series=None, run_stats=None, messages=None):
+    """
+    Extracts the data curves of a PDF, EPS or PS plot in-process.
+
+    limits       : calibration {'xmin', 'xmax', 'ymin', 'ymax'[, 'logx', 'logy']},
+                   or None for page coordinates
+    jobs         : worker processes for the PDF content streams or the
+                   pieces of a large PostScript file
+    cache        : a ParseCache, or None
+    pages        : set of PDF page numbers; a list of results is returned,
+                   one per page found (a page without vectors gives an
+                   empty result, a selection without any page an error)
+    decode_limits: DecodeLimits with the caps to apply (default caps if None)
+    verbose      : print progress messages (see say()) instead of collecting
+                   them in ExtractionResult.messages
+    frame        : calibrate to the detected axis frame instead of the
+                   bounds of all vectors, and drop the curves outside it
+    simplify     : tolerance for decimating the curves (see simplify()),
+                   in 'page' or 'data' units (simplify_units), or None
+    dedup        : drop curves repeating an earlier one within this many
+                   page units (e.g. DEDUP_QUANTUM), or None to keep all
+    series       : set of series numbers (curves of one stroke style, see
+                   ExtractionResult.split) to keep, or None to keep all
+    run_stats    : a RunStats that collects timings and counts, or None
+    messages     : a callable also given every collected message as it is
+                   reported (e.g. logging.getLogger('plots').info), or None
+
+    Returns an ExtractionResult, or a list of them with `pages`. Raises
+    ExtractionError when the plot cannot be extracted. Messages are kept
+    per thread, so concurrent calls from several threads do not mix them.
+    """
+    limits = _check_limits(limits)
+    if simplify is not None and simplify < 0:
+        raise ExtractionError("The simplification tolerance must not be negative.")
+    if simplify_units not in SIMPLIFY_UNITS:
+        raise ExtractionError(f"Unknown simplification units: {simplify_units}")
+    if dedup is not None and dedup <= 0:
+        raise ExtractionError("The deduplication quantum must be positive.")
+    if not os.path.isfile(path):
+        raise ExtractionError(f"File {path} not found.")
+    if pages and os.path.splitext(path)[1].lower() != '.pdf':
+        raise ExtractionError("Pages can only be selected in a PDF input.")
+    # Fresh counters: the caps of one object can serve many calls.
+    caps = decode_limits or DecodeLimits()
+    decode_limits = DecodeLimits(caps.stream, caps.total)
+
+    log = []
+
+    def collect(message):
+        log.append(message)
+        if messages is not None:
+            messages(message)
+
+    with contextlib.nullcontext() if verbose else messages_to(collect):
+        # 2. Tokenize and parse vector commands (unless a ParseCache has them)
+        if pages:
+            parsed = parse_pages(path, pages, jobs, cache, decode_limits, run_stats)
+            if not parsed:
+                raise ExtractionError("None of the selected pages was found.")
+            results = []
+            for n, (all_segments, ps_bounds) in sorted(parsed.items()):
+                if all_segments.total_points() == 0:
+                    stats = {'points': 0, 'segments': 0, 'filtered': len(all_segments)}
+                    results.append(ExtractionResult(path, n, all_segments, dict(ps_bounds),
+                                                    limits, stats))
                 else:
-                    x_out, y_out = x_raw, y_raw
+                    results.append(_make_result(all_segments, ps_bounds, limits, path, n, frame,
+                                                simplify, simplify_units, dedup, series,
+                                                run_stats))
+        else:
+            all_segments, ps_bounds = parse_file(path, jobs, cache, decode_limits, run_stats)
+            if all_segments.total_points() == 0:
+                raise ExtractionError("No vector data found.")
+            results = [_make_result(all_segments, ps_bounds, limits, path, None, frame,
+                                    simplify, simplify_units, dedup, series, run_stats)]
 
-                out.write(f"{x_out:.6f} {y_out:.6f}\n")
-                total_points += 1
-            out.write("\n")
+    if log:
+        for result in results:
+            result.messages = "".join(message + "\n" for message in log)
+    return results if pages else results[0]
+
+# =============================================================================
+# COMMAND LINE OUTPUT
+# =============================================================================
+def _output_header(source, user_limits, frame=None):
+    header = [f"Data extracted from {source}"]
+    if user_limits:
+        header.append(f"Calibrated using: X[{user_limits['xmin']}:{user_limits['xmax']}] Y[{user_limits['ymin']}:{user_limits['ymax']}]")
+        if frame:
+            header.append(f"Calibrated to the plot frame: X[{frame['xmin']:g}:{frame['xmax']:g}] Y[{frame['ymin']:g}:{frame['ymax']:g}] (page units)")
+        if user_limits['logx']: header.append("X-Axis: Logarithmic")
+        if user_limits['logy']: header.append("Y-Axis: Logarithmic")
+        header.append("Column 1: X (calibrated) Column 2: Y (calibrated)")
+    else:
+        header.append("Column 1: X (raw coord) Column 2: Y (raw coord)")
+    return header
+
+def write_result(result, output_file, fmt='txt', run_stats=None, split_series=False):
+    """
+    Reports an ExtractionResult and writes its curves to `output_file`, or
+    with `split_series` one file per series (see series_output_name).
+    Returns the statistics of the written output.
+    """
+    ps_bounds = result.bounds
+    say(f"Detected Page Bounds: X[{ps_bounds['xmin']:.1f}:{ps_bounds['xmax']:.1f}] Y[{ps_bounds['ymin']:.1f}:{ps_bounds['ymax']:.1f}]")
+    if result.frame:
+        frame = result.frame
+        say(f"Detected Plot Frame: X[{frame['xmin']:.1f}:{frame['xmax']:.1f}] Y[{frame['ymin']:.1f}:{frame['ymax']:.1f}]")
+    say(f"Filtered out {result.stats['filtered']} short segments (grid/axes).")
+    if result.stats.get('outside'):
+        say(f"Dropped {result.stats['outside']} curves outside the plot frame.")
+    if 'other_series' in result.stats:
+        say(f"Dropped {result.stats['other_series']} curves of other series.")
+    if 'duplicates' in result.stats:
+        say(f"Dropped {result.stats['duplicates']} repeated curves.")
+    if 'simplified' in result.stats:
+        after = result.stats['points']
+        before = after + result.stats['simplified']
+        say(f"Simplified the curves: {before} -> {after} points "
+              f"({100.0 * result.stats['simplified'] / (before or 1):.1f}% fewer).")
+
+    series = []
+    parts = result.split() if len(result.series) > 1 or split_series else {}
+    if parts:
+        say(f"Found {len(parts)} curve series (stroke styles):")
+    for n, part in parts.items():
+        label = style_label(result.series[n])
+        say(f"  Series {n}: {label} ({len(part)} curves, {part.total_points()} points)")
+        series.append({'number': n, 'style': label, 'curves': len(part),
+                       'points': part.total_points()})
+
+    # 6. Write Output
+    source = os.path.basename(result.source)
+    if result.page is not None:
+        source = f"{source}, page {result.page}"
+    header = _output_header(source, result.limits, result.frame)
+    if split_series:
+        outputs = [(series_output_name(output_file, n), part, header + [f"Series {n}: {label}"])
+                   for (n, part), label in zip(parts.items(), (e['style'] for e in series))]
+    else:
+        outputs = [(output_file, result.segments, header)]
+    total_points = 0
+    for name, segments, lines in outputs:
+        with _phase(run_stats, 'write') as entry:
+            total_points += write_output(segments, name, fmt, lines)
+        if run_stats is not None:
+            entry['bytes'] = entry.get('bytes', 0) + os.path.getsize(name)
+    if run_stats is not None:
+        run_stats.count('points_written', total_points)
+
+    if split_series:
+        for entry, (name, _, _) in zip(series, outputs):
+            entry['output'] = name
+        say(f"Done. Wrote {total_points} points to {len(outputs)} files "
+              f"('{series_output_name(output_file, '*')}')")
+    else:
+        say(f"Done. Wrote {total_points} points to '{output_file}'")
+
+    stats = {'output': [name for name, _, _ in outputs] if split_series else output_file,
+             'points': total_points,
+             'segments': result.stats['segments'], 'filtered': result.stats['filtered'],
+             'bounds': dict(ps_bounds)}
+    if result.frame:
+        stats['frame'] = dict(result.frame)
+    for key in ('other_series', 'duplicates', 'simplified'):
+        if key in result.stats:
+            stats[key] = result.stats[key]
+    if series:
+        stats['series'] = series
+    return stats
+
+def page_output_name(output_file, page):
+    """thesis.txt -> thesis_p12.txt"""
+    base, ext = os.path.splitext(output_file)
+    return f"{base}_p{page}{ext}"
+
+def series_output_name(output_file, series):
+    """thesis.txt -> thesis_s2.txt"""
+    base, ext = os.path.splitext(output_file)
+    return f"{base}_s{series}{ext}"
+
+def extract_vector_data(input_file, user_limits=None, output_file=None, jobs=1, fmt='txt',
+                        cache=None, pages=None, decode_limits=None, frame=False,
+                        simplify=None, simplify_units='page', dedup=None, series=None,
+                        split_series=False, run_stats=None):
+    """
+    Command line front end: extracts a plot with extract() and writes the
+    curves to `output_file`. With `pages`, every page gets its own bounds,
+    calibration and output file (see page_output_name); with
+    `split_series`, every series its own file. Returns the statistics of
+    the written output.
+    """
+    # 1. Determine output filename
+    if output_file is None:
+        output_file = output_name(input_file, fmt)
 
-    print(f"Done. Wrote {total_points} points to '{output_file}'")
+    say(f"Reading from: {input_file}")
+
+    results = extract(input_file, user_limits, jobs, cache, pages, decode_limits, verbose=True,
+                      frame=frame, simplify=simplify, simplify_units=simplify_units,
+                      dedup=dedup, series=series, run_stats=run_stats)
+    if not pages:
+        return write_result(results, output_file, fmt, run_stats, split_series)
+
+    written = []
+    for result in results:
+        say(f"Page {result.page}:")
+        if result.segments.total_points() == 0 and result.stats['filtered'] == 0:
+            say("  > No vector data on this page.")
+            continue
+        stats = write_result(result, page_output_name(output_file, result.page), fmt, run_stats,
+                             split_series)
+        stats['page'] = result.page
+        written.append(stats)
+
+    outputs = [r['output'] for r in written]
+    if split_series:
+        outputs = [name for names in outputs for name in names]
+    return {'output': outputs,
+            'points': sum(r['points'] for r in written),
+            'segments': sum(r['segments'] for r in written),
+            'filtered': sum(r['filtered'] for r in written),
+            'pages': written}
+
+# =============================================================================
+# BATCH MODE
+# Many files are processed by one interpreter in a bounded process pool. A
+# failing file is reported in the summary and does not stop the others.
+# =============================================================================
+INPUT_EXTENSIONS = ('.pdf', '.eps', '.ps')
+
+def collect_inputs(names, recursive=False):
+    """
+    Expands files, glob patterns and directories into a sorted list of
+    (path, relative output name) pairs. Directories contribute the files
+    with a known extension (optionally followed by .gz, .bz2 or .xz),
+    descending into subdirectories if `recursive`.
+    """
+    found = {}
+    for name in names:
+        if os.path.isdir(name):
+            for root, dirs, files in os.walk(name):
+                if not recursive:
+                    dirs[:] = []
+                for fn in files:
+                    ext = os.path.splitext(strip_compression(fn))[1].lower()
+                    if ext in INPUT_EXTENSIONS:
+                        path = os.path.join(root, fn)
+                        found.setdefault(path, os.path.relpath(path, name))
+        elif glob.has_magic(name):
+            for path in glob.glob(name, recursive=recursive):
+                if os.path.isfile(path):
+                    found.setdefault(path, os.path.basename(path))
+        else:
+            found.setdefault(name, os.path.basename(name))
+    return sorted(found.items())
+
+def batch_outputs(inputs, outdir=None, fmt='txt'):
+    """
+    Output files of the (path, relative name) pairs from collect_inputs:
+    output_name next to the input, or below `outdir`. Inputs that would
+    share an output keep their full name ('a.eps' and 'a.pdf' give
+    'a.eps.txt' and 'a.pdf.txt'); raises ValueError if they still collide
+    (e.g. 'x/a.pdf' and 'y/a.pdf' flattened into one `outdir`).
+    """
+    names = [os.path.join(outdir, rel) if outdir else path for path, rel in inputs]
+    outs = [output_name(name, fmt) for name in names]
+    shared = {out for out, n in Counter(outs).items() if n > 1}
+    outs = [f"{name}.{fmt}" if out in shared else out for name, out in zip(names, outs)]
+    seen = {}
+    for (path, _), out in zip(inputs, outs):
+        if out in seen:
+            raise ValueError(f"{seen[out]} and {path} would both be written to {out}")
+        seen[out] = path
+    return outs
+
+def _batch_worker(job):
+    """Worker: extracts one file, capturing its messages and errors."""
+    (input_file, output_file, user_limits, fmt, cache, pages, decode_limits, frame,
+     simplify, simplify_units, dedup, series, split_series, with_stats) = job
+    entry = {'file': input_file, 'output': output_file}
+    log = []
+    run_stats = RunStats() if with_stats else None
+    start = time.perf_counter()
+    try:
+        with messages_to(log.append):
+            stats = extract_vector_data(input_file, user_limits, output_file, fmt=fmt,
+                                        cache=cache, pages=pages, decode_limits=decode_limits,
+                                        frame=frame, simplify=simplify,
+                                        simplify_units=simplify_units, dedup=dedup,
+                                        series=series, split_series=split_series,
+                                        run_stats=run_stats)
+        entry.update(status='ok', points=stats['points'], segments=stats['segments'],
+                     filtered=stats['filtered'])
+        if split_series:
+            entry['output'] = stats['output']
+        for key in ('other_series', 'duplicates', 'simplified', 'series'):
+            if key in stats:
+                entry[key] = stats[key]
+    except ExtractionError as e:
+        entry.update(status='error', error=str(e))
+    except Exception as e:
+        entry.update(status='error', error=f"{type(e).__name__}: {e}")
+    entry['seconds'] = round(time.perf_counter() - start, 6)
+    if run_stats is not None:
+        entry['stats'] = run_stats.as_dict()
+    return entry
+
+def run_batch(inputs, user_limits=None, outdir=None, jobs=None, summary=None, fmt='txt',
+              cache=None, pages=None, decode_limits=None, frame=False, simplify=None,
+              simplify_units='page', dedup=None, series=None, split_series=False,
+              with_stats=False):
+    """
+    Extracts every (path, relative name) pair from collect_inputs with a
+    pool of `jobs` processes (default: all cores). Outputs go next to the
+    inputs, or below `outdir` keeping the relative names. Prints one line
+    per file and writes a JSON summary to `summary` ('-' for stdout); with
+    `with_stats` the summary holds the RunStats of every file. A worker
+    that dies (e.g. killed for lack of memory) breaks the pool: the files
+    it did not finish are run again one at a time in fresh pools, so only
+    the file that killed it fails.
+    Returns the number of failed files; raises ValueError, before anything
+    is written, when two inputs would share an output (see batch_outputs).
+    """
+    batch = []
+    for (path, _), out in zip(inputs, batch_outputs(inputs, outdir, fmt)):
+        if outdir:
+            os.makedirs(os.path.dirname(out) or '.', exist_ok=True)
+        batch.append((path, out, user_limits, fmt, cache, pages, decode_limits, frame,
+                      simplify, simplify_units, dedup, series, split_series, with_stats))
+
+    jobs = jobs or os.cpu_count() or 1
+    print(f"Batch: {len(batch)} files, {jobs} workers")
+    start = time.perf_counter()
+    results = [None] * len(batch)
+    pending, workers = list(range(len(batch))), jobs
+    while pending:
+        retry = []
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [(k, pool.submit(_batch_worker, batch[k])) for k in pending]
+            for k, future in futures:
+                try:
+                    entry = future.result()
+                except BrokenProcessPool:
+                    # With one worker the jobs run in order: the first one
+                    # lost is the one that was running when the worker died.
+                    if workers > 1 or retry:
+                        retry.append(k)
+                        continue
+                    entry = {'file': batch[k][0], 'output': batch[k][1], 'status': 'error',
+                             'error': "The worker process died (e.g. out of memory)."}
+                results[k] = entry
+                if entry['status'] == 'ok':
+                    print(f"  ok    {entry['file']}: {entry['points']} points, "
+                          f"{entry['segments']} segments ({entry['seconds']:.3f}s)")
+                else:
+                    print(f"  FAIL  {entry['file']}: {entry['error']}")
+        pending, workers = retry, 1
+    elapsed = time.perf_counter() - start
+
+    failed = sum(1 for e in results if e['status'] != 'ok')
+    totals = {'files': len(results), 'failed': failed,
+              'points': sum(e.get('points', 0) for e in results),
+              'segments': sum(e.get('segments', 0) for e in results),
+              'seconds': round(elapsed, 6)}
+    print(f"Done. {totals['files'] - failed} of {totals['files']} files, "
+          f"{totals['points']} points in {elapsed:.2f}s")
+
+    if summary:
+        report = json.dumps({'totals': totals, 'files': results}, indent=2)
+        if summary == '-':
+            print(report)
+        else:
+            with open(summary, 'w') as f:
+                f.write(report + "\n")
+    return failed
+
+# =============================================================================
+# SERVER MODE
+# A long-running process (--serve SOCKET) takes jobs over a Unix socket, so
+# callers skip the interpreter start-up and reuse warm worker processes and
+# recent results. The protocol is one JSON object per line in each
+# direction; a connection may send many requests, and every response is
+# written as soon as its job is done (match them by "id").
+#
+#   request : {"id": 1, "path": "/data/plot.pdf",
+#              "limits": {"xmin": 0, "xmax": 10, "ymin": 0, "ymax": 1},
+#              "pages": "1-3", "frame": true, "dedup": 0.01,
+#              "simplify": 0.1, "simplify_units": "page", "series": "1,3",
+#              "output": "/data/plot.txt", "format": "txt", "split_series": false}
+#             Only "path" is required; paths are resolved by the server.
+#   response: {"id": 1, "status": "ok", "seconds": ..., "cached": false,
+#              "results": [{"page", "bounds", "frame", "limits", "stats",
+#                           "curves": [[[x, y], ...], ...],
+#                           "series": {"1": "color #1f77b4, width 1.5, solid", ...},
+#                           "curve_series": [1, 1, 2, ...]}, ...]}
+#             or, with "output", the written files ({"output": {...}}) in
+#             place of "results"; on failure {"id": 1, "status": "error",
+#             "error": "..."}.
+# =============================================================================
+class ResultCache:
+    """
+    The responses of recent requests, keyed by the file (path, size and
+    modification time) and the options; the least recently used entries
+    are dropped beyond `max_entries`. Safe to use from several threads.
+    """
+    __slots__ = ('max_entries', 'entries', 'lock')
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(request):
+        """The cache key of a request, or None if it is not cacheable."""
+        if request.get('output'):
+            return None  # writes files: always run it
+        try:
+            info = os.stat(request['path'])
+        except (KeyError, TypeError, OSError):
+            return None
+        options = {k: v for k, v in request.items() if k not in ('id', 'path')}
+        return (os.path.realpath(request['path']), info.st_size, info.st_mtime_ns,
+                json.dumps(options, sort_keys=True))
+
+    def get(self, key):
+        with self.lock:
+            response = self.entries.get(key)
+            if response is not None:
+                self.entries.move_to_end(key)
+            return response
+
+    def put(self, key, response):
+        if key is None or response.get('status') != 'ok' or self.max_entries <= 0:
+            return
+        with self.lock:
+            self.entries[key] = response
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+def _result_json(result):
+    """An ExtractionResult as a JSON-ready dict."""
+    numbers = {key: n for n, key in result.series.items()}
+    return {'page': result.page, 'bounds': result.bounds, 'frame': result.frame,
+            'limits': result.limits, 'stats': result.stats, 'curves': result.polylines(),
+            'series': {n: style_label(key) for n, key in result.series.items()},
+            'curve_series': [numbers[result.segments.style_keys[style]]
+                             for style in result.segments.styles]}
+
+def _serve_job(request, cache, decode_limits):
+    """Worker: runs one server request and returns its response."""
+    response = {'id': request.get('id')}
+    start = time.perf_counter()
+    try:
+        path = request['path']
+        pages = parse_page_spec(request['pages']) if request.get('pages') else None
+        options = {'frame': bool(request.get('frame')),
+                   'simplify': request.get('simplify'),
+                   'simplify_units': request.get('simplify_units', 'page'),
+                   'dedup': request.get('dedup'),
+                   'series': parse_page_spec(request['series'], 'series')
+                             if request.get('series') else None}
+        if request.get('output'):
+            fmt = request.get('format', 'txt')
+            if fmt not in OUTPUT_FORMATS:
+                raise ValueError(f"unknown output format '{fmt}'")
+            with messages_to([].append):
+                written = extract_vector_data(path, request.get('limits'), request['output'],
+                                              fmt=fmt, cache=cache, pages=pages,
+                                              decode_limits=decode_limits,
+                                              split_series=bool(request.get('split_series')),
+                                              **options)
+            response.update(status='ok', output=written)
+        else:
+            results = extract(path, request.get('limits'), 1, cache, pages, decode_limits,
+                              **options)
+            if not pages:
+                results = [results]
+            response.update(status='ok', results=[_result_json(r) for r in results])
+    except ExtractionError as e:
+        response.update(status='error', error=str(e))
+    except (KeyError, TypeError, ValueError) as e:
+        response.update(status='error', error=f"Bad request: {type(e).__name__}: {e}")
+    except Exception as e:
+        response.update(status='error', error=f"{type(e).__name__}: {e}")
+    response['seconds'] = round(time.perf_counter() - start, 6)
+    return response
+
+class _ServeHandler(socketserver.StreamRequestHandler):
+    """One client connection: reads requests, writes responses as jobs finish."""
+
+    def handle(self):
+        server = self.server
+        write_lock = threading.Lock()
+        pending = []
+
+        def send(response):
+            data = (json.dumps(response) + "\n").encode()
+            with write_lock:
+                try:
+                    self.wfile.write(data)
+                    self.wfile.flush()
+                except OSError:
+                    pass  # The client went away
+
+        def finished(future, request, key, sent):
+            try:
+                response = future.result()
+            except Exception as e:
+                response = {'id': request.get('id'), 'status': 'error',
+                            'error': f"{type(e).__name__}: {e}"}
+            server.results.put(key, response)
+            send(dict(response, cached=False))
+            sent.set()
+
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError("a request must be a JSON object")
+            except ValueError as e:
+                send({'id': None, 'status': 'error', 'error': f"Bad request: {e}"})
+                continue
+            key = server.results.key(request)
+            hit = server.results.get(key) if key is not None else None
+            if hit is not None:
+                send(dict(hit, id=request.get('id'), cached=True))
+                continue
+            sent = threading.Event()
+            future = server.pool.submit(_serve_job, request, server.parse_cache,
+                                        server.decode_limits)
+            future.add_done_callback(lambda f, request=request, key=key, sent=sent:
+                                     finished(f, request, key, sent))
+            pending.append(sent)
+        # Answer everything before the connection is closed
+        for sent in pending:
+            sent.wait()
+
+def serve(socket_path, jobs=None, cache=None, decode_limits=None, max_results=256):
+    """
+    Serves extraction jobs on the Unix socket `socket_path` until
+    interrupted (Ctrl-C or SIGTERM), with a pool of `jobs` worker
+    processes (default: all cores) and the last `max_results` responses
+    kept for repeated requests. Returns an exit status.
+    """
+    if not hasattr(socketserver, 'ThreadingUnixStreamServer'):
+        print("Error: Unix sockets are not available on this platform.")
+        return 1
+    if os.path.lexists(socket_path):
+        if not stat.S_ISSOCK(os.lstat(socket_path).st_mode):
+            print(f"Error: {socket_path} exists and is not a socket.")
+            return 1
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(socket_path)
+        except OSError:
+            os.unlink(socket_path)  # Left behind by a server that died
+        else:
+            print(f"Error: {socket_path} is in use by another server.")
+            return 1
+        finally:
+            probe.close()
+
+    jobs = jobs or os.cpu_count() or 1
+    server = socketserver.ThreadingUnixStreamServer(socket_path, _ServeHandler)
+    server.daemon_threads = True
+    server.pool = ProcessPoolExecutor(max_workers=jobs)
+    server.results = ResultCache(max_results)
+    server.parse_cache = cache
+    server.decode_limits = decode_limits
+    # Start the workers now, so the first request finds them ready
+    list(server.pool.map(abs, range(jobs)))
+
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    print(f"Serving on {socket_path} with {jobs} workers (Ctrl-C to stop)")
+    sys.stdout.flush()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.pool.shutdown(cancel_futures=True)
+        try:
+            os.unlink(socket_path)
+        except OSError:
+            pass
+    return 0
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
@@ -318,7 +3793,8 @@ if __name__ == "__main__":
         formatter_class=argparse.RawDescriptionHelpFormatter,
         epilog="Example:\n  python ExtractData.py plot.pdf --xmin 0 --xmax 100 --ymin 0 --ymax 1")
 
-    parser.add_argument("filename", help="The file to parse")
+    parser.add_argument("filename", nargs='*',
+                        help="The file to parse (several files, glob patterns or directories run a batch)")
 
     group = parser.add_argument_group('Calibration (Optional)', 'Map coordinates to real data values')
     group.add_argument("--xmin", type=float, help="Left edge value")
@@ -327,6 +3803,66 @@ if __name__ == "__main__":
     group.add_argument("--ymax", type=float, help="Top edge value")
     group.add_argument("--logx", action="store_true", help="X axis is logarithmic")
     group.add_argument("--logy", action="store_true", help="Y axis is logarithmic")
+    group.add_argument("--frame", action="store_true",
+                       help="The limits are the edges of the detected axis frame, not of all "
+                            "vectors; curves outside the frame are dropped")
+
+    parser.add_argument("--jobs", type=int, metavar="N",
+                        help="Decode and parse PDF content streams, or pieces of a large "
+                             "PostScript file, with N worker processes "
+                             "(in batch mode: files processed in parallel, default all cores)")
+
+    parser.add_argument("--pages", metavar="LIST",
+                        help="PDF only: extract these pages (e.g. '12,40-42'), one output per page")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default='txt',
+                        help="Output format (default: txt)")
+
+    group = parser.add_argument_group('Simplification', 'Decimate dense curves within a tolerance')
+    group.add_argument("--simplify", type=float, metavar="TOL",
+                       help="Drop the points that keep each curve within TOL of the original")
+    group.add_argument("--simplify-units", choices=SIMPLIFY_UNITS, default='page',
+                       help="TOL in page units (points) or in calibrated data units (default: page)")
+    group.add_argument("--dedup", type=float, nargs='?', const=DEDUP_QUANTUM, metavar="Q",
+                       help="Drop curves that repeat an earlier one, coordinates compared "
+                            f"within Q page units (default: {DEDUP_QUANTUM})")
+
+    group = parser.add_argument_group('Series', 'Curves grouped by stroke colour, line width and dash pattern')
+    group.add_argument("--series", metavar="LIST",
+                       help="Keep only these series, numbered as listed in the output (e.g. '1,3-4')")
+    group.add_argument("--split-series", action="store_true",
+                       help="Write every series to its own file (name_s1.txt, name_s2.txt, ...)")
+
+    group = parser.add_argument_group('PDF Decoding Limits', 'Caps on decompressed content (0 = no cap)')
+    group.add_argument("--max-stream-mb", type=float, default=512, metavar="MB",
+                       help="Largest decoded content stream (default: 512)")
+    group.add_argument("--max-total-mb", type=float, default=2048, metavar="MB",
+                       help="Largest decoded content per file (default: 2048)")
+
+    group = parser.add_argument_group('Parse Cache', 'Reuse parsed segments when re-running on the same file')
+    group.add_argument("--cache", action="store_true", help="Enable the on-disk parse cache")
+    group.add_argument("--cache-dir", metavar="DIR",
+                       help="Cache directory (default: $XDG_CACHE_HOME/ExtractData or ~/.cache/ExtractData)")
+    group.add_argument("--cache-size", type=float, default=512, metavar="MB",
+                       help="Maximum cache size before old entries are evicted (default: 512)")
+
+    group = parser.add_argument_group('Diagnostics', 'Where the time goes, and why a plot comes back empty')
+    group.add_argument("--stats", nargs='?', const='text', choices=('text', 'json'),
+                       help="Report time and data per phase, stream, token and operator counts "
+                            "(in batch mode: per file in the --summary report)")
+    group.add_argument("--profile", metavar="FILE",
+                       help="Run under cProfile, save the profile to FILE and print the costliest functions")
+
+    group = parser.add_argument_group('Server Mode', 'Serve extraction jobs to other programs')
+    group.add_argument("--serve", metavar="SOCKET",
+                       help="Take JSON-lines jobs on this Unix socket until interrupted "
+                            "(--jobs workers, default all cores)")
+    group.add_argument("--max-results", type=int, default=256, metavar="N",
+                       help="Responses kept for repeated requests (default: 256)")
+
+    group = parser.add_argument_group('Batch Mode', 'Process many files in one run')
+    group.add_argument("-r", "--recursive", action="store_true", help="Descend into subdirectories")
+    group.add_argument("--outdir", help="Write outputs below this directory instead of next to the inputs")
+    group.add_argument("--summary", metavar="FILE", help="Write a JSON report per file ('-' for stdout)")
 
     args = parser.parse_args()
 
@@ -341,4 +3877,74 @@ if __name__ == "__main__":
             'logx': args.logx, 'logy': args.logy
         }
 
-    extract_vector_data(args.filename, limits)
+    pages = series = None
+    try:
+        if args.pages:
+            pages = parse_page_spec(args.pages)
+        if args.series:
+            series = parse_page_spec(args.series, 'series')
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    decode_limits = DecodeLimits(int(args.max_stream_mb * (1 << 20)) or None,
+                                 int(args.max_total_mb * (1 << 20)) or None)
+
+    cache = None
+    if args.cache or args.cache_dir:
+        cache = ParseCache(args.cache_dir, int(args.cache_size * (1 << 20)))
+
+    if args.serve:
+        if args.filename:
+            print("Error: --serve takes no input files; send them as requests.")
+            sys.exit(1)
+        sys.exit(serve(args.serve, args.jobs, cache, decode_limits, args.max_results))
+
+    names = args.filename
+    if not names:
+        print("Error: No input files given.")
+        sys.exit(1)
+    if len(names) == 1 and not (os.path.isdir(names[0]) or glob.has_magic(names[0])
+                                or args.outdir or args.summary):
+        run_stats = RunStats() if args.stats else None
+        profiler = cProfile.Profile() if args.profile else None
+        failed = False
+        if profiler:
+            profiler.enable()
+        try:
+            extract_vector_data(names[0], limits, jobs=args.jobs or 1, fmt=args.format,
+                                cache=cache, pages=pages, decode_limits=decode_limits,
+                                frame=args.frame, simplify=args.simplify,
+                                simplify_units=args.simplify_units, dedup=args.dedup,
+                                series=series, split_series=args.split_series,
+                                run_stats=run_stats)
+        except ExtractionError as e:
+            print(f"Error: {e}")
+            failed = True
+        if profiler:
+            profiler.disable()
+            save_profile(profiler, args.profile)
+        if run_stats is not None:
+            if args.stats == 'json':
+                print(json.dumps(run_stats.as_dict(), indent=2))
+            else:
+                print("\n".join(run_stats.report()))
+        if failed:
+            sys.exit(1)
+    else:
+        if args.profile:
+            print("Error: --profile needs a single input file.")
+            sys.exit(1)
+        inputs = collect_inputs(names, args.recursive)
+        if not inputs:
+            print("Error: No input files found.")
+            sys.exit(1)
+        try:
+            failed = run_batch(inputs, limits, args.outdir, args.jobs, args.summary, args.format,
+                               cache, pages, decode_limits, args.frame, args.simplify,
+                               args.simplify_units, args.dedup, series, args.split_series,
+                               bool(args.stats))
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        sys.exit(1 if failed else 0)
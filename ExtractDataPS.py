@@ -19,6 +19,8 @@ HOW IT WORKS:
        - 'moveto' (M/m): Starts a new line segment.
        - 'rlineto' (V/R): Adds a point relative to the last point.
        - 'lineto' (L/l): Adds a point at an absolute page coordinate.
+       Other names for them are learnt from the procedure definitions of
+       the prologue ('/V {rlineto} bind def', '/m /moveto load def').
 
     2. BOUNDING BOX DETECTION:
        As it parses, the script tracks the global minimum and maximum
@@ -42,6 +44,9 @@ HOW IT WORKS:
           - Linear: $U = Norm * (UserMax - UserMin) + UserMin$
           - Log10:  $U = 10 ^ { Norm * (log10(UserMax) - log10(UserMin)) + log10(UserMin) }$
 
+       The constants of each axis are computed once and the mapping is
+       applied to all points in bulk (vectorised with NumPy if installed).
+
 USAGE EXAMPLES:
 
     1. Raw Extraction (No Calibration):
@@ -56,16 +61,40 @@ USAGE EXAMPLES:
        Map X linearly [0, 50], Y logarithmically [1e-2, 1e2].
        $ python ExtractDataPS.py plot.eps --xmin 0 --xmax 50 --ymin 0.01 --ymax 100 --logy
 
+    4. Large Files on Several Cores:
+       Parse a multi-gigabyte EPS in pieces on 8 cores. The output is
+       identical to the serial run.
+       $ python ExtractDataPS.py simulation.eps --jobs 8
+
 ARGUMENTS:
-    filename    : The input .ps or .eps file.
+    filename    : The input .ps or .eps file, optionally gzip, bzip2 or xz
+                  compressed (recognised by content, e.g. plot.eps.gz).
     --xmin, max : The physical X-axis limits of the plot.
     --ymin, max : The physical Y-axis limits of the plot.
     --logx, y   : Flags to indicate if an axis uses a logarithmic scale.
+    --simplify  : Tolerance for decimating the curves (Ramer-Douglas-Peucker),
+                  in page units, or data units with --simplify-units data.
+    --low-memory: Read the file in blocks and spool the curves to a temporary
+                  file, so memory use does not grow with the number of points.
+    --jobs N    : Cut a large file at line ends and parse the pieces with N
+                  worker processes; the output is identical to a serial run.
+    --stats     : Report time and data per phase and the operators found
+                  ('--stats json' for a machine-readable report).
+    --profile   : Run under cProfile and save the profile to a file.
 
 OUTPUT:
     A text file (filename.txt) containing two columns (X Y).
     Segments are separated by a blank line. Header contains metadata.
 
+    --format selects other layouts for downstream tools:
+      csv      : 'segment,x,y' rows (filename.csv).
+      npy      : (N, 2) float64 array (filename.npy) plus the segment
+                 offsets in filename.offsets.npy; load with numpy.load.
+      npz      : both arrays, 'points' and 'offsets', in filename.npz.
+      bin      : raw little-endian float64 x/y pairs (filename.bin) plus
+                 int64 offsets (filename.offsets.bin).
+    Segment k spans points offsets[k] to offsets[k+1].
+
 Pau Amaro Seoane, Berlin, 26 December 2025
 
 ISC License
@@ -89,149 +118,1104 @@ PERFORMANCE OF THIS SOFTWARE.
 import sys
 import os
 import argparse
+import contextlib
+import cProfile
+import functools
+import gzip
+import io
+import itertools
+import json
 import math
+import mmap
+import pstats
+import re
+import shutil
+import tempfile
+import time
+import zipfile
+import zlib
+from array import array
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 
-def extract_ps_data(input_file, user_limits=None, output_file=None):
-    # 1. Determine output filename
-    if output_file is None:
-        base, _ = os.path.splitext(input_file)
-        output_file = f"{base}.txt"
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
-    print(f"Reading from: {input_file}")
-    
-    try:
-        with open(input_file, 'r') as f:
-            content = f.readlines()
-    except FileNotFoundError:
-        print(f"Error: The file '{input_file}' was not found.")
-        sys.exit(1)
+# Python may be built without these; only compressed input needs them
+try:
+    import bz2
+except ImportError:
+    bz2 = None
+try:
+    import lzma
+except ImportError:
+    lzma = None
 
-    # 2. Parse PostScript
-    # We collect ALL segments first to determine the plot bounding box.
-    all_segments = []
-    current_segment = []
-    
-    # Track the global min/max of the PostScript coordinates (page layout)
-    # Initialize with None
-    ps_bounds = {'xmin': None, 'xmax': None, 'ymin': None, 'ymax': None}
+class SegmentStore:
+    """
+    Compact storage for polylines.
 
-    def update_bounds(x, y):
-        if ps_bounds['xmin'] is None or x < ps_bounds['xmin']: ps_bounds['xmin'] = x
-        if ps_bounds['xmax'] is None or x > ps_bounds['xmax']: ps_bounds['xmax'] = x
-        if ps_bounds['ymin'] is None or y < ps_bounds['ymin']: ps_bounds['ymin'] = y
-        if ps_bounds['ymax'] is None or y > ps_bounds['ymax']: ps_bounds['ymax'] = y
+    The coordinates of all points are kept interleaved (x0, y0, x1, y1, ...)
+    in a single array('d'), and segment k spans the points offsets[k] up to
+    offsets[k+1]. Points after the last offset form the open segment that is
+    still being drawn. This costs 16 bytes per point, where a tuple inside a
+    list costs more than 70.
+    """
+    __slots__ = ('coords', 'offsets')
 
-    current_x, current_y = 0.0, 0.0
-    
-    for line in content:
-        line = line.strip()
-        tokens = line.split()
-        
-        if not tokens:
+    def __init__(self):
+        self.coords = array('d')
+        self.offsets = array('q', [0])
+
+    def __len__(self):
+        """Number of closed segments."""
+        return len(self.offsets) - 1
+
+    def __iter__(self):
+        """Yields each closed segment as an interleaved array('d')."""
+        coords, offsets = self.coords, self.offsets
+        for k in range(len(offsets) - 1):
+            yield coords[2 * offsets[k]:2 * offsets[k + 1]]
+
+    def open_points(self):
+        """Number of points in the open segment."""
+        return (len(self.coords) >> 1) - self.offsets[-1]
+
+    def total_points(self):
+        """Number of points in closed segments."""
+        return self.offsets[-1]
+
+    def close(self):
+        """Closes the open segment, if it has any points."""
+        n = len(self.coords) >> 1
+        if n > self.offsets[-1]:
+            self.offsets.append(n)
+
+    def extend(self, other):
+        """Appends the segments of `other`, including its open segment."""
+        base = len(self.coords) >> 1
+        self.coords.extend(other.coords)
+        self.offsets.extend(base + o for o in other.offsets[1:])
+
+    def filter(self, min_points):
+        """Returns a new store with the segments of more than `min_points`."""
+        kept = SegmentStore()
+        coords, offsets = self.coords, self.offsets
+        for k in range(len(offsets) - 1):
+            start, end = offsets[k], offsets[k + 1]
+            if end - start > min_points:
+                kept.coords.extend(coords[2 * start:2 * end])
+                kept.offsets.append(len(kept.coords) >> 1)
+        return kept
+
+    def spool(self, f, min_points):
+        """
+        Moves the closed segments out of the store: those of more than
+        `min_points` are appended to the binary file `f` (see read_spool),
+        the others are dropped. The open segment stays. Returns the number
+        of (segments, points) moved out and of segments written.
+        """
+        coords, offsets = self.coords, self.offsets
+        written = 0
+        for k in range(len(offsets) - 1):
+            start, end = offsets[k], offsets[k + 1]
+            if end - start > min_points:
+                array('q', [end - start]).tofile(f)
+                coords[2 * start:2 * end].tofile(f)
+                written += 1
+        moved = (len(offsets) - 1, offsets[-1])
+        self.coords = coords[2 * offsets[-1]:]
+        self.offsets = array('q', [0])
+        return moved + (written,)
+
+def read_spool(f, batch_points):
+    """
+    Reads back the segments written by SegmentStore.spool, as SegmentStores
+    of whole segments holding about `batch_points` points each (a longer
+    segment comes alone).
+    """
+    f.seek(0)
+    store = SegmentStore()
+    while True:
+        count = array('q')
+        try:
+            count.fromfile(f, 1)
+        except EOFError:
+            break
+        store.coords.fromfile(f, 2 * count[0])
+        store.offsets.append(len(store.coords) >> 1)
+        if store.total_points() >= batch_points:
+            yield store
+            store = SegmentStore()
+    if len(store):
+        yield store
+
+# ---------------------------------------------------------------------------
+# The mapping of each axis is built once from the page bounds and the user
+# limits, then applied to whole coordinate arrays: with NumPy if it is
+# installed, otherwise in batches of plain Python floats.
+CALIBRATION_BATCH = 1 << 16
+
+def axis_transform(ps_min, ps_max, user_min, user_max, is_log):
+    """
+    Returns a function that maps a sequence of page coordinates of one axis
+    to data units (linear, or logarithmic interpolation when `is_log`).
+    """
+    if ps_max == ps_min:
+        return lambda values: [user_min] * len(values)
+
+    span = ps_max - ps_min
+    if is_log:
+        try:
+            log_min = math.log10(user_min)
+            log_max = math.log10(user_max)
+        except ValueError:
+            print("Error: User limits must be positive for log scale.")
+            sys.exit(1)
+        log_range = log_max - log_min
+        if numpy is not None:
+            return lambda values: numpy.power(10.0, (values - ps_min) / span * log_range + log_min)
+        return lambda values: [10 ** ((v - ps_min) / span * log_range + log_min) for v in values]
+
+    user_range = user_max - user_min
+    if numpy is not None:
+        return lambda values: (values - ps_min) / span * user_range + user_min
+    return lambda values: [(v - ps_min) / span * user_range + user_min for v in values]
+
+def calibrate(store, ps_bounds, user_limits):
+    """Maps all points of a SegmentStore from page to data units, in place."""
+    coords = store.coords
+    if not coords:
+        return
+    to_x = axis_transform(ps_bounds['xmin'], ps_bounds['xmax'],
+                          user_limits['xmin'], user_limits['xmax'], user_limits['logx'])
+    to_y = axis_transform(ps_bounds['ymin'], ps_bounds['ymax'],
+                          user_limits['ymin'], user_limits['ymax'], user_limits['logy'])
+
+    if numpy is not None:
+        points = numpy.frombuffer(coords, dtype=numpy.float64).reshape(-1, 2)
+        points[:, 0] = to_x(points[:, 0])
+        points[:, 1] = to_y(points[:, 1])
+        del points  # Release the buffer export of the array
+        return
+
+    step = 2 * CALIBRATION_BATCH
+    for start in range(0, len(coords), step):
+        end = min(start + step, len(coords))
+        coords[start:end:2] = array('d', to_x(coords[start:end:2]))
+        coords[start + 1:end:2] = array('d', to_y(coords[start + 1:end:2]))
+
+# ---------------------------------------------------------------------------
+# Dense curves are decimated within a tolerance (--simplify), in page units
+# before the calibration or in data units after it.
+SIMPLIFY_NUMPY_MIN = 256  # ranges at least this long are measured with NumPy
+SIMPLIFY_WINDOW = 1024    # points per independently simplified window
+SIMPLIFY_UNITS = ('page', 'data')
+
+def _rdp_keep(xs, ys, tolerance):
+    """
+    Ramer-Douglas-Peucker on one segment: returns the indices of the points
+    to keep. Ranges wait on an explicit stack, so a segment of any length
+    needs no recursion; each range keeps its farthest point from the chord
+    if that lies more than `tolerance` away, and is split there.
+
+    The segment starts out cut into windows of SIMPLIFY_WINDOW points whose
+    ends are kept. On noisy curves the splits are very uneven, and whole
+    segments would take time quadratic in their length; the windows bound
+    that at the cost of about one extra point per window.
+    """
+    n = len(xs)
+    if n < 3:
+        return range(n)
+    keep = bytearray(n)
+    keep[0:n:SIMPLIFY_WINDOW] = b'\x01' * len(range(0, n, SIMPLIFY_WINDOW))
+    keep[n - 1] = 1
+    if numpy is not None and n >= SIMPLIFY_NUMPY_MIN:
+        xa = numpy.frombuffer(xs, dtype=numpy.float64)
+        ya = numpy.frombuffer(ys, dtype=numpy.float64)
+    stack = [(first, min(first + SIMPLIFY_WINDOW, n - 1))
+             for first in range(0, n - 1, SIMPLIFY_WINDOW)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
             continue
-            
-        cmd = tokens[-1]
+        x0, y0 = xs[first], ys[first]
+        dx, dy = xs[last] - x0, ys[last] - y0
+        chord = math.hypot(dx, dy)
+        if chord == 0:
+            # Closed loop: distance to the end point
+            chord = 1.0
+            if numpy is not None and last - first >= SIMPLIFY_NUMPY_MIN:
+                dists = numpy.hypot(xa[first + 1:last] - x0, ya[first + 1:last] - y0)
+                i = int(dists.argmax())
+            else:
+                dists = [math.hypot(x - x0, y - y0)
+                         for x, y in zip(xs[first + 1:last], ys[first + 1:last])]
+                i = max(range(len(dists)), key=dists.__getitem__)
+        else:
+            # |cross product| = distance to the chord line * chord length
+            c = dy * x0 - dx * y0
+            if numpy is not None and last - first >= SIMPLIFY_NUMPY_MIN:
+                dists = numpy.abs(dy * xa[first + 1:last] - dx * ya[first + 1:last] - c)
+                i = int(dists.argmax())
+            else:
+                dists = [abs(dy * x - dx * y - c)
+                         for x, y in zip(xs[first + 1:last], ys[first + 1:last])]
+                i = max(range(len(dists)), key=dists.__getitem__)
+        if dists[i] > tolerance * chord:
+            split = first + 1 + i
+            keep[split] = 1
+            stack.append((split, last))
+            stack.append((first, split))
+    return list(itertools.compress(range(n), keep))
+
+def simplify(store, tolerance):
+    """
+    Returns a new SegmentStore with every segment decimated to the points
+    that keep it within `tolerance` (in the units of the store) of the
+    original polyline. The end points of each segment are always kept.
+    """
+    kept = SegmentStore()
+    coords, offsets = store.coords, store.offsets
+    out = kept.coords
+    for k in range(len(offsets) - 1):
+        start, end = 2 * offsets[k], 2 * offsets[k + 1]
+        xs, ys = coords[start:end:2], coords[start + 1:end:2]
+        for i in _rdp_keep(xs, ys, tolerance):
+            out.append(xs[i]); out.append(ys[i])
+        kept.offsets.append(len(out) >> 1)
+    return kept
+
+# ---------------------------------------------------------------------------
+# Every format is written straight from the SegmentStore buffers. Text is
+# produced in blocks of TEXT_BATCH points per write; the binary formats
+# dump the float64 coordinates as they are and keep the segment offsets in
+# a companion array.
+OUTPUT_FORMATS = ('txt', 'csv', 'npy', 'npz', 'bin')
+
+TEXT_BATCH = 4096
+
+def output_name(input_file, fmt='txt'):
+    """
+    Default output file: the input name with the format's extension (in
+    place of a compression extension too: 'plot.eps.gz' -> 'plot.txt').
+    """
+    base, ext = os.path.splitext(input_file)
+    if ext.lower() in COMPRESSED_EXTENSIONS:
+        base, _ = os.path.splitext(base)
+    return f"{base}.{fmt}"
+
+# ---------------------------------------------------------------------------
+# Compressed input is recognised by its magic bytes, whatever the extension,
+# and decompressed on the fly while it is read.
+COMPRESSIONS = (
+    (b'\x1f\x8b', 'gzip', gzip),
+    (b'BZh', 'bzip2', bz2),
+    (b'\xfd7zXZ\x00', 'xz', lzma),
+)
+COMPRESSED_EXTENSIONS = ('.gz', '.bz2', '.xz')
+DECOMPRESS_ERRORS = (OSError, EOFError, zlib.error) + ((lzma.LZMAError,) if lzma else ())
+
+def open_input(input_file):
+    """
+    Opens a PostScript file for reading as text. gzip, bzip2 and xz data
+    is decompressed transparently.
+    """
+    with open(input_file, 'rb') as f:
+        head = f.read(6)
+    for magic, name, module in COMPRESSIONS:
+        if head.startswith(magic):
+            if module is None:
+                print(f"Error: {name} compressed input needs Python's "
+                      f"{'bz2' if name == 'bzip2' else 'lzma'} module.")
+                sys.exit(1)
+            print(f"  > {name} compressed input. Decompressing on the fly...")
+            return module.open(input_file, 'rt')
+    return open(input_file, 'r')
+
+def _little_endian(arr):
+    if sys.byteorder == 'little':
+        return arr
+    swapped = array(arr.typecode, arr)
+    swapped.byteswap()
+    return swapped
+
+def _npy_header(descr, shape, size=None):
+    """
+    Header of a version 1.0 .npy file holding a C-ordered array, padded to
+    `size` bytes if given (a multiple of 64).
+    """
+    header = "{'descr': '%s', 'fortran_order': False, 'shape': %r, }" % (descr, shape)
+    pad = -(10 + len(header) + 1) % 64 if size is None else size - 10 - len(header) - 1
+    header = (header + ' ' * pad + '\n').encode('latin-1')
+    return b'\x93NUMPY\x01\x00' + len(header).to_bytes(2, 'little') + header
+
+def _write_npy(f, arr, descr, shape):
+    f.write(_npy_header(descr, shape))
+    f.write(memoryview(_little_endian(arr)).cast('B'))
+
+def _write_text(store, out, fmt, sep, first=0):
+    coords, offsets = store.coords, store.offsets
+    for k in range(len(offsets) - 1):
+        prefix = f"{first + k}," if fmt == 'csv' else ""
+        line = prefix + "%.6f" + sep + "%.6f\n"
+        for start in range(offsets[k], offsets[k + 1], TEXT_BATCH):
+            end = min(start + TEXT_BATCH, offsets[k + 1])
+            out.write((line * (end - start)) % tuple(coords[2 * start:2 * end]))
+        if fmt == 'txt':
+            out.write("\n")
+
+def write_output(store, output_file, fmt='txt', header=()):
+    """
+    Writes the segments of a SegmentStore in one of OUTPUT_FORMATS and
+    returns the number of points written.
+
+      txt : "X Y" lines, a blank line after each segment, '#' header lines.
+      csv : "segment,x,y" rows.
+      npy : (N, 2) float64 points, offsets in '<name>.offsets.npy'.
+      npz : 'points' (N, 2) and 'offsets' arrays in one archive.
+      bin : raw little-endian float64 x/y pairs, int64 offsets in
+            '<name>.offsets.bin'.
+
+    Segment k spans points offsets[k] to offsets[k+1].
+    """
+    points = store.total_points()
+    coords = store.coords[:2 * points]
+    offsets = store.offsets
+    base, _ = os.path.splitext(output_file)
+
+    if fmt in ('txt', 'csv'):
+        with open(output_file, 'w', buffering=1 << 20) as out:
+            if fmt == 'txt':
+                for line in header:
+                    out.write(f"# {line}\n")
+                _write_text(store, out, fmt, " ")
+            else:
+                out.write("segment,x,y\n")
+                _write_text(store, out, fmt, ",")
+    elif fmt == 'npy':
+        with open(output_file, 'wb') as f:
+            _write_npy(f, coords, '<f8', (points, 2))
+        with open(f"{base}.offsets.npy", 'wb') as f:
+            _write_npy(f, offsets, '<i8', (len(offsets),))
+    elif fmt == 'npz':
+        with zipfile.ZipFile(output_file, 'w', zipfile.ZIP_STORED, allowZip64=True) as z:
+            with z.open('points.npy', 'w', force_zip64=True) as f:
+                _write_npy(f, coords, '<f8', (points, 2))
+            with z.open('offsets.npy', 'w', force_zip64=True) as f:
+                _write_npy(f, offsets, '<i8', (len(offsets),))
+    elif fmt == 'bin':
+        with open(output_file, 'wb') as f:
+            f.write(memoryview(_little_endian(coords)).cast('B'))
+        with open(f"{base}.offsets.bin", 'wb') as f:
+            f.write(memoryview(_little_endian(offsets)).cast('B'))
+    else:
+        raise ValueError(f"unknown output format '{fmt}'")
+    return points
+
+class StreamWriter:
+    """
+    Writes segments in one of OUTPUT_FORMATS as they come, batch after
+    batch, with the same layout as write_output. The .npy headers are
+    written with room for any shape and completed by close(); the npz
+    members are assembled in temporary files and stored at the end.
+    """
+    __slots__ = ('output_file', 'fmt', 'out', 'offsets_out', 'points', 'segments')
+
+    # Room for the largest shape: (N, 2) and (M,) with 20-digit numbers
+    NPY_HEADER_SIZE = 128
+
+    def __init__(self, output_file, fmt='txt', header=()):
+        if fmt not in OUTPUT_FORMATS:
+            raise ValueError(f"unknown output format '{fmt}'")
+        self.output_file = output_file
+        self.fmt = fmt
+        self.points = 0
+        self.segments = 0
+        self.offsets_out = None
+        base, _ = os.path.splitext(output_file)
+        if fmt in ('txt', 'csv'):
+            self.out = open(output_file, 'w', buffering=1 << 20)
+            if fmt == 'txt':
+                for line in header:
+                    self.out.write(f"# {line}\n")
+            else:
+                self.out.write("segment,x,y\n")
+            return
+        if fmt == 'npz':
+            self.out = tempfile.TemporaryFile()
+            self.offsets_out = tempfile.TemporaryFile()
+        else:
+            self.out = open(output_file, 'wb')
+            self.offsets_out = open(f"{base}.offsets.{fmt}", 'wb')
+        if fmt != 'bin':
+            self.out.write(b'\0' * self.NPY_HEADER_SIZE)
+            self.offsets_out.write(b'\0' * self.NPY_HEADER_SIZE)
+        self.offsets_out.write(memoryview(_little_endian(array('q', [0]))).cast('B'))
+
+    def write(self, store):
+        """Appends the closed segments of a SegmentStore."""
+        if self.fmt in ('txt', 'csv'):
+            _write_text(store, self.out, self.fmt, " " if self.fmt == 'txt' else ",",
+                        self.segments)
+        else:
+            coords = store.coords[:2 * store.total_points()]
+            self.out.write(memoryview(_little_endian(coords)).cast('B'))
+            offsets = array('q', (self.points + o for o in store.offsets[1:]))
+            self.offsets_out.write(memoryview(_little_endian(offsets)).cast('B'))
+        self.points += store.total_points()
+        self.segments += len(store)
+
+    def close(self):
+        """Completes the file(s) and returns the number of points written."""
+        fmt = self.fmt
+        if fmt in ('npy', 'npz'):
+            self.out.seek(0)
+            self.out.write(_npy_header('<f8', (self.points, 2), self.NPY_HEADER_SIZE))
+            self.offsets_out.seek(0)
+            self.offsets_out.write(_npy_header('<i8', (self.segments + 1,), self.NPY_HEADER_SIZE))
+        if fmt == 'npz':
+            with zipfile.ZipFile(self.output_file, 'w', zipfile.ZIP_STORED, allowZip64=True) as z:
+                for name, member in (('points.npy', self.out), ('offsets.npy', self.offsets_out)):
+                    member.seek(0)
+                    with z.open(name, 'w', force_zip64=True) as f:
+                        shutil.copyfileobj(member, f, 1 << 20)
+        self.out.close()
+        if self.offsets_out is not None:
+            self.offsets_out.close()
+        return self.points
+
+# ---------------------------------------------------------------------------
+# A block of lines is split into one flat token list, with a marker token
+# at each line end. Every token is classified with one lookup in the command
+# table; the codes form a bytes string, in which runs of 'x y L' or
+# 'dx dy V' lines are found with a regular expression and converted with a
+# few calls per run instead of a few per line.
+_MOVETO, _LINETO, _RLINETO, _STROKE, _EOL = range(1, 6)
+_COMMANDS = {
+    'M': _MOVETO, 'm': _MOVETO, 'moveto': _MOVETO,
+    'L': _LINETO, 'l': _LINETO, 'lineto': _LINETO,
+    'V': _RLINETO, 'R': _RLINETO, 'rmoveto': _RLINETO, 'rlineto': _RLINETO,
+    'stroke': _STROKE, 'S': _STROKE,
+}
+_LINE_END = re.compile(rb'[\x01-\x04](?=\x05|$)')
+_RUNS = re.compile(rb'(?<![^\x05])(?:(?:\x00\x00\x02\x05){2,}|(?:\x00\x00\x03\x05){2,})')
+
+def _lower(value, values):
+    """Running minimum as a sequential `if v < value` scan would find it."""
+    return min(values) if value is None else min(itertools.chain((value,), values))
+
+def _upper(value, values):
+    return max(values) if value is None else max(itertools.chain((value,), values))
+
+# ---------------------------------------------------------------------------
+# Producers define their own short names for the path operators in the
+# prologue. The definitions in the first PROLOGUE_SCAN characters of a file
+# that come down to a single command ('/V {rlineto} bind def',
+# '/N {newpath moveto} def', '/m /moveto load def') are added to the
+# command table of that file.
+PROLOGUE_SCAN = 1 << 20
+
+_PS_NAME = r'[^\s/{}()\[\]<>%]+'
+_PROCEDURE = re.compile(r'/(' + _PS_NAME + r')\s*(?:\{\s*(' + _PS_NAME + r'(?:\s+' + _PS_NAME +
+                        r')*)\s*\}\s*(?:bind\s+)?|/(' + _PS_NAME + r')\s+load\s+)def(?!' + _PS_NAME + r')')
+_NO_OPERANDS = frozenset(('newpath',))
+
+def scan_procedures(head):
+    """The procedure definitions in `head`, as (name, body words) pairs."""
+    return tuple((m.group(1), tuple((m.group(2) or m.group(3)).split()))
+                 for m in _PROCEDURE.finditer(head))
+
+@functools.lru_cache(maxsize=64)
+def command_table(definitions):
+    """
+    _COMMANDS plus the procedures of `definitions` that stand for one
+    command (also through another procedure). Memoized, so the files of
+    one producer share a single table.
+    """
+    table = dict(_COMMANDS)
+    for name, body in definitions:
+        cmds = [table.get(word, 0) for word in body if word not in _NO_OPERANDS]
+        if len(cmds) == 1 and cmds[0]:
+            table[name] = cmds[0]
+    return table
+
+class LineParser:
+    """
+    Interprets PostScript path commands, one per line: the last token of
+    a line is the command and the two tokens before it are its operands.
+    The commands are looked up in `commands` (see command_table), by
+    default _COMMANDS.
+
+    Text is fed in blocks of whole lines; the state (open segment, current
+    point, bounds) is kept between blocks.
+    """
+
+    def __init__(self, commands=None):
+        self.commands = _COMMANDS if commands is None else commands
+        # The command table with the line end markers
+        self.marked = {**self.commands, '\0': _EOL}
+        self.marked_none = {**self.commands, None: _EOL}
+        # Points go straight into a compact SegmentStore; the open segment
+        # is the tail of its coordinate array.
+        self.store = SegmentStore()
+        # Track the global min/max of the PostScript coordinates (page layout)
+        # Initialize with None
+        self.bounds = {'xmin': None, 'xmax': None, 'ymin': None, 'ymax': None}
+        self.x, self.y = 0.0, 0.0
+
+    def feed(self, text):
+        """Parses a block of complete lines."""
+        if '\0' in text:
+            # The marker occurs in the text itself: mark the lines with None.
+            tokens = []
+            for line in text.split('\n'):
+                tokens += line.split()
+                tokens.append(None)
+            table = self.marked_none
+        else:
+            tokens = text.replace('\n', ' \0 ').split()
+            table = self.marked
+        codes = bytes(map(table.get, tokens, itertools.repeat(0)))
+
+        store = self.store
+        offsets = store.offsets
+        coords = store.coords
+        push = coords.append
+        npoints = len(coords) >> 1
+        is_open = npoints > offsets[-1]
+        current_x, current_y = self.x, self.y
+        ps_bounds = self.bounds
+        xmin, xmax = ps_bounds['xmin'], ps_bounds['xmax']
+        ymin, ymax = ps_bounds['ymin'], ps_bounds['ymax']
+
+        pieces = []
+        pos = 0
+        for m in _RUNS.finditer(codes):
+            pieces.append((pos, m.start(), 0))
+            pieces.append((m.start(), m.end(), codes[m.start() + 2]))
+            pos = m.end()
+        pieces.append((pos, len(tokens), 0))
+
+        for lo, hi, run in pieces:
+            if run:
+                # --- RUN OF LINETO / RLINETO LINES ---
+                try:
+                    xs = list(map(float, tokens[lo:hi:4]))
+                    ys = list(map(float, tokens[lo+1:hi:4]))
+                except ValueError:
+                    pass  # interpret the lines one by one below
+                else:
+                    if not is_open:
+                        push(current_x); push(current_y)
+                        npoints += 1
+                        is_open = True
+                        if xmin is None or current_x < xmin: xmin = current_x
+                        if xmax is None or current_x > xmax: xmax = current_x
+                        if ymin is None or current_y < ymin: ymin = current_y
+                        if ymax is None or current_y > ymax: ymax = current_y
+                    if run == _RLINETO:
+                        xs = list(itertools.accumulate(xs, initial=current_x))[1:]
+                        ys = list(itertools.accumulate(ys, initial=current_y))[1:]
+                    points = xs + ys
+                    points[0::2] = xs
+                    points[1::2] = ys
+                    coords.fromlist(points)
+                    npoints += len(xs)
+                    current_x, current_y = xs[-1], ys[-1]
+                    xmin, xmax = _lower(xmin, xs), _upper(xmax, xs)
+                    ymin, ymax = _lower(ymin, ys), _upper(ymax, ys)
+                    continue
 
+            for m in _LINE_END.finditer(codes, lo, hi):
+                i = m.start()
+                cmd = codes[i]
+                if cmd == _STROKE:
+                    if is_open:
+                        offsets.append(npoints)
+                        is_open = False
+                    continue
+                # The command needs two operands on its own line
+                if i < 2 or codes[i-1] == _EOL or codes[i-2] == _EOL:
+                    continue
+
+                try:
+                    if cmd == _MOVETO:
+                        if is_open:
+                            offsets.append(npoints)
+                            is_open = False
+                        current_x = float(tokens[i-2])
+                        current_y = float(tokens[i-1])
+                        # Moves also define the plot area boundaries
+                        if xmin is None or current_x < xmin: xmin = current_x
+                        if xmax is None or current_x > xmax: xmax = current_x
+                        if ymin is None or current_y < ymin: ymin = current_y
+                        if ymax is None or current_y > ymax: ymax = current_y
+
+                    elif cmd == _RLINETO:
+                        dx = float(tokens[i-2])
+                        dy = float(tokens[i-1])
+                        if not is_open:
+                            push(current_x); push(current_y)
+                            npoints += 1
+                            is_open = True
+                            if xmin is None or current_x < xmin: xmin = current_x
+                            if xmax is None or current_x > xmax: xmax = current_x
+                            if ymin is None or current_y < ymin: ymin = current_y
+                            if ymax is None or current_y > ymax: ymax = current_y
+
+                        current_x += dx
+                        current_y += dy
+                        push(current_x); push(current_y)
+                        npoints += 1
+                        if xmin is None or current_x < xmin: xmin = current_x
+                        if xmax is None or current_x > xmax: xmax = current_x
+                        if ymin is None or current_y < ymin: ymin = current_y
+                        if ymax is None or current_y > ymax: ymax = current_y
+
+                    else:
+                        if not is_open:
+                            push(current_x); push(current_y)
+                            npoints += 1
+                            is_open = True
+                            if xmin is None or current_x < xmin: xmin = current_x
+                            if xmax is None or current_x > xmax: xmax = current_x
+                            if ymin is None or current_y < ymin: ymin = current_y
+                            if ymax is None or current_y > ymax: ymax = current_y
+
+                        current_x = float(tokens[i-2])
+                        current_y = float(tokens[i-1])
+                        push(current_x); push(current_y)
+                        npoints += 1
+                        if xmin is None or current_x < xmin: xmin = current_x
+                        if xmax is None or current_x > xmax: xmax = current_x
+                        if ymin is None or current_y < ymin: ymin = current_y
+                        if ymax is None or current_y > ymax: ymax = current_y
+
+                except ValueError:
+                    continue
+
+        self.x, self.y = current_x, current_y
+        ps_bounds.update(xmin=xmin, xmax=xmax, ymin=ymin, ymax=ymax)
+
+    def finish(self):
+        """Closes the open segment and returns the SegmentStore."""
+        self.store.close()
+        return self.store
+
+    def adopt(self, other):
+        """
+        Continues with the state of a parser that started at a moveto line
+        of the same text (see parse_detached). The moveto closes the open
+        segment, and from there on `other` holds the exact result.
+        """
+        self.store.close()
+        self.store.extend(other.store)
+        self.x, self.y = other.x, other.y
+        for key, pick in (('xmin', min), ('xmax', max), ('ymin', min), ('ymax', max)):
+            values = [v for v in (self.bounds[key], other.bounds[key]) if v is not None]
+            self.bounds[key] = pick(values) if values else None
+
+# ---------------------------------------------------------------------------
+# With --jobs a large file is cut into pieces at line ends, about
+# PIECES_PER_JOB per worker (so a slow piece does not hold up the others)
+# and at least PIECE_MIN bytes long. Each worker parses its piece from the
+# first moveto line on, where the current point no longer depends on the
+# pieces before; the lines before it are parsed when the pieces are merged
+# in file order, so the result is identical to a serial run.
+PIECE_MIN = 8 << 20
+PIECES_PER_JOB = 4
+
+@functools.lru_cache(maxsize=64)
+def _moveto_line(names):
+    """Pattern of a line ending in 'x y' and one of the moveto `names`."""
+    return re.compile(r'(?:^|[^\S\n])(\S+)[^\S\n]+(\S+)[^\S\n]+(?:' +
+                      '|'.join(map(re.escape, names)) + r')[^\S\n]*$', re.M)
+
+def parse_detached(text, commands=None):
+    """
+    Parses a block of complete lines without knowing the state left behind
+    by the lines before. Returns (prefix, parser or None): the lines up to
+    the first moveto line, untouched, and a LineParser for the rest.
+    """
+    commands = _COMMANDS if commands is None else commands
+    moveto = _moveto_line(tuple(sorted(n for n, c in commands.items() if c == _MOVETO)))
+    for m in moveto.finditer(text):
         try:
-            if cmd in ['M', 'm', 'moveto']:
-                if len(tokens) >= 3:
-                    if current_segment:
-                        all_segments.append(current_segment)
-                        current_segment = []
-                    current_x = float(tokens[-3])
-                    current_y = float(tokens[-2])
-                    # Moves also define the plot area boundaries
-                    update_bounds(current_x, current_y)
-            
-            elif cmd in ['V', 'R', 'rmoveto', 'rlineto']:
-                if len(tokens) >= 3:
-                    dx = float(tokens[-3])
-                    dy = float(tokens[-2])
-                    if not current_segment:
-                        current_segment.append((current_x, current_y))
-                        update_bounds(current_x, current_y)
-                    
-                    current_x += dx
-                    current_y += dy
-                    current_segment.append((current_x, current_y))
-                    update_bounds(current_x, current_y)
-
-            elif cmd in ['L', 'l', 'lineto']:
-                if len(tokens) >= 3:
-                    if not current_segment:
-                        current_segment.append((current_x, current_y))
-                        update_bounds(current_x, current_y)
-                    
-                    current_x = float(tokens[-3])
-                    current_y = float(tokens[-2])
-                    current_segment.append((current_x, current_y))
-                    update_bounds(current_x, current_y)
-            
-            elif cmd in ['stroke', 'S']:
-                if current_segment:
-                    all_segments.append(current_segment)
-                    current_segment = []
-
-        except (ValueError, IndexError):
+            float(m.group(1)), float(m.group(2))
+        except ValueError:
             continue
+        start = text.rfind('\n', 0, m.start()) + 1
+        parser = LineParser(commands)
+        parser.feed(text[start:])
+        return text[:start], parser
+    return text, None
+
+def file_pieces(input_file, jobs):
+    """
+    Returns the (start, end) byte ranges of the pieces of a file for
+    `jobs` workers, each ending after a newline (or at the end of the
+    file). Returns None for compressed input and for files that cannot
+    be mapped; the serial path reads (and reports) those.
+    """
+    try:
+        with open(input_file, 'rb') as f:
+            if any(f.read(6).startswith(magic) for magic, _, _ in COMPRESSIONS):
+                return None
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (ValueError, OSError):
+        return None
+    with buf:
+        size = len(buf)
+        target = max(PIECE_MIN, -(-size // (PIECES_PER_JOB * jobs)))
+        pieces = []
+        start = 0
+        while start < size:
+            eol = buf.find(b'\n', start + target) if start + target < size else -1
+            end = size if eol < 0 else eol + 1
+            pieces.append((start, end))
+            start = end
+    return pieces
+
+def _parse_piece(job):
+    """
+    Worker: decodes one piece of the file as open_input would (locale
+    encoding, universal newlines) and parses it detached. Returns
+    (prefix, parser or None, RunStats or None).
+    """
+    input_file, start, end, commands, with_stats = job
+    with open(input_file, 'rb') as f:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    with buf:
+        text = io.TextIOWrapper(io.BytesIO(buf[start:end])).read()
+    stats = None
+    if with_stats:
+        stats = RunStats()
+        stats.histogram(text, commands)
+    return parse_detached(text, commands) + (stats,)
+
+def parse_parallel(input_file, jobs, run_stats=None):
+    """
+    Parses a PostScript file in pieces with a process pool. Returns the
+    LineParser, or None when the file is too small to split or cannot be
+    split (compressed input).
+    """
+    pieces = file_pieces(input_file, jobs)
+    if pieces is None or len(pieces) < 2:
+        return None
+
+    with open(input_file, 'r') as f:
+        commands = command_table(scan_procedures(f.read(PROLOGUE_SCAN)))
+    print(f"  > Parsing {len(pieces)} pieces of the file with {jobs} workers...")
+    parser = LineParser(commands)
+    with _phase(run_stats, 'workers') as entry:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            tasks = [(input_file, s, e, commands, run_stats is not None) for s, e in pieces]
+            for prefix, detached, stats in pool.map(_parse_piece, tasks):
+                parser.feed(prefix)
+                if detached is not None:
+                    parser.adopt(detached)
+                if stats is not None:
+                    run_stats.merge(stats)
+    if run_stats is not None:
+        entry['bytes'] = entry.get('bytes', 0) + pieces[-1][1]
+        run_stats.count('pieces', len(pieces))
+    return parser
+
+# ---------------------------------------------------------------------------
+# With --stats every phase books its time and the amount of data it handled,
+# and the operators, segments and points are counted. Nothing is measured
+# unless a RunStats is passed in.
+class RunStats:
+    """
+    Diagnostics of one extraction.
+
+    phases    : {name: {'seconds': ...[, 'bytes': ...]}} in pipeline order
+    counts    : {name: number} (lines, tokens, segments_kept, ...)
+    operators : Counter of the path operators that were recognised
+    words     : Counter of the other words (tokens starting with a letter),
+                e.g. to spot unsupported drawing commands
+    """
+    __slots__ = ('phases', 'counts', 'operators', 'words')
+
+    def __init__(self):
+        self.phases = {}
+        self.counts = {}
+        self.operators = Counter()
+        self.words = Counter()
 
-    if current_segment:
-        all_segments.append(current_segment)
+    def count(self, key, n=1):
+        self.counts[key] = self.counts.get(key, 0) + n
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Books the time of a block to `name`."""
+        entry = self.phases.setdefault(name, {'seconds': 0.0})
+        start = time.perf_counter()
+        try:
+            yield entry
+        finally:
+            entry['seconds'] += time.perf_counter() - start
+
+    def histogram(self, text, commands=_COMMANDS):
+        """Counts the lines, tokens and operators (`commands`) of PostScript text."""
+        tokens = text.split()
+        self.count('lines', text.count('\n'))
+        self.count('tokens', len(tokens))
+        words = [t for t in tokens if t[:1].isalpha()]
+        self.operators.update(w for w in words if w in commands)
+        self.words.update(w for w in words if w not in commands)
+
+    def merge(self, other):
+        """Adds the counts and operators of another RunStats."""
+        for key, value in other.counts.items():
+            self.count(key, value)
+        self.operators.update(other.operators)
+        self.words.update(other.words)
+
+    def as_dict(self):
+        phases = {name: dict(entry, seconds=round(entry['seconds'], 6))
+                  for name, entry in self.phases.items()}
+        return {'phases': phases, 'counts': dict(self.counts),
+                'operators': dict(self.operators.most_common()),
+                'other_words': dict(self.words.most_common(20))}
+
+    def report(self):
+        """The statistics as lines of text."""
+        lines = ["Run statistics:"]
+        for name, entry in self.phases.items():
+            size = f"{entry['bytes']} bytes" if 'bytes' in entry else ''
+            lines.append(f"  {name:<10} {entry['seconds']:9.4f} s  {size}".rstrip())
+        lines.append(f"  {'total':<10} {sum(e['seconds'] for e in self.phases.values()):9.4f} s")
+        for key, value in self.counts.items():
+            lines.append(f"  {key}: {value}")
+        if self.operators:
+            lines.append("  operators: " + ', '.join(f"{op} {n}" for op, n in self.operators.most_common()))
+        if self.words:
+            lines.append("  other words: " + ', '.join(f"{w} {n}" for w, n in self.words.most_common(10)))
+        return lines
+
+def _phase(stats, name):
+    """stats.phase(name), or nothing when no statistics are collected."""
+    return contextlib.nullcontext() if stats is None else stats.phase(name)
+
+def save_profile(profiler, path, top=15):
+    """Writes a cProfile result to `path` and prints its costliest functions."""
+    profiler.dump_stats(path)
+    print(f"Profile written to '{path}' (inspect with: python -m pstats {path})")
+    pstats.Stats(profiler, stream=sys.stdout).sort_stats('cumulative').print_stats(top)
+
+# ---------------------------------------------------------------------------
+# With --low-memory the file is read in blocks of READ_BATCH bytes of whole
+# lines, and the segments that pass the filter are spooled to a temporary
+# binary file as soon as they are closed. Only the page bounds are needed
+# from the first pass; the second pass calibrates and writes the spool in
+# batches of SPOOL_BATCH points, so memory use does not grow with the
+# number of points (only with the longest single segment).
+READ_BATCH = 1 << 22
+SPOOL_BATCH = 1 << 18
+MIN_POINTS = 10  # segments of more points are kept as data
+
+def _header(input_file, user_limits):
+    header = [f"Data extracted from {os.path.basename(input_file)}"]
+    if user_limits:
+        header.append(f"Calibrated using limits: X[{user_limits['xmin']}:{user_limits['xmax']}] Y[{user_limits['ymin']}:{user_limits['ymax']}]")
+        if user_limits['logx']: header.append("X-Axis: Logarithmic")
+        if user_limits['logy']: header.append("Y-Axis: Logarithmic")
+        header.append("Column 1: X (calibrated) Column 2: Y (calibrated)")
+    else:
+        header.append("Column 1: X (raw ps) Column 2: Y (raw ps)")
+    return header
+
+def _transform(data_segments, ps_bounds, user_limits, simplify_tol, simplify_units, run_stats):
+    """Simplifies and calibrates a SegmentStore of page coordinates."""
+    if simplify_tol is not None and simplify_units == 'page':
+        with _phase(run_stats, 'simplify'):
+            data_segments = simplify(data_segments, simplify_tol)
+
+    # Calibration (one transform per axis, applied to all points at once)
+    if user_limits:
+        with _phase(run_stats, 'calibrate'):
+            calibrate(data_segments, ps_bounds, user_limits)
+
+    if simplify_tol is not None and simplify_units == 'data':
+        with _phase(run_stats, 'simplify'):
+            data_segments = simplify(data_segments, simplify_tol)
+    return data_segments
+
+def _report_simplified(simplify_tol, points, after):
+    if simplify_tol is not None:
+        print(f"Simplified the curves: {points} -> {after} points "
+              f"({100.0 * (points - after) / (points or 1):.1f}% fewer).")
+
+def _parse_blocks(input_file, run_stats):
+    """
+    Feeds a file to a LineParser in blocks of READ_BATCH bytes of whole
+    lines, so only one block's tokens are alive at a time. The command
+    table comes from the first block.
+    """
+    try:
+        f = open_input(input_file)
+    except FileNotFoundError:
+        print(f"Error: The file '{input_file}' was not found.")
+        sys.exit(1)
+    parser = None
+    with f:
+        while True:
+            try:
+                with _phase(run_stats, 'read') as entry:
+                    content = ''.join(f.readlines(READ_BATCH))
+            except DECOMPRESS_ERRORS as e:
+                print(f"Error: Could not read '{input_file}': {e}")
+                sys.exit(1)
+            if not content:
+                break
+            if parser is None:
+                parser = LineParser(command_table(scan_procedures(content[:PROLOGUE_SCAN])))
+            if run_stats is not None:
+                entry['bytes'] = entry.get('bytes', 0) + len(content)
+                with run_stats.phase('histogram'):
+                    run_stats.histogram(content, parser.commands)
+            with _phase(run_stats, 'parse'):
+                parser.feed(content)
+    return parser or LineParser()
+
+def extract_ps_data(input_file, user_limits=None, output_file=None, fmt='txt',
+                    simplify_tol=None, simplify_units='page', run_stats=None,
+                    low_memory=False, jobs=1):
+    # 1. Determine output filename
+    if output_file is None:
+        output_file = output_name(input_file, fmt)
+
+    print(f"Reading from: {input_file}")
+    if low_memory:
+        return _extract_spooled(input_file, user_limits, output_file, fmt,
+                                simplify_tol, simplify_units, run_stats)
+
+    # 2. Parse PostScript
+    # We collect ALL segments first to determine the plot bounding box.
+    parser = parse_parallel(input_file, jobs, run_stats) if jobs > 1 else None
+    if parser is None:
+        parser = _parse_blocks(input_file, run_stats)
+    with _phase(run_stats, 'parse'):
+        all_segments = parser.finish()
+    ps_bounds = parser.bounds
+    if ps_bounds['xmin'] is None:
+        print("Error: No vector data found.")
+        sys.exit(1)
 
     # 3. Filter Data
     # Keep segments with > 10 points (likely data). Discard axes/ticks/grids.
-    data_segments = [seg for seg in all_segments if len(seg) > 10]
+    with _phase(run_stats, 'filter'):
+        data_segments = all_segments.filter(MIN_POINTS)
+    if run_stats is not None:
+        run_stats.count('segments_parsed', len(all_segments))
+        run_stats.count('points_parsed', all_segments.total_points())
+        run_stats.count('segments_kept', len(data_segments))
     
     print(f"Detected Page Bounds: X[{ps_bounds['xmin']:.1f}:{ps_bounds['xmax']:.1f}] Y[{ps_bounds['ymin']:.1f}:{ps_bounds['ymax']:.1f}]")
     print(f"Filtered out {len(all_segments) - len(data_segments)} short segments (grid/axes).")
 
-    # 4. Conversion Logic
-    def convert_value(val, ps_min, ps_max, user_min, user_max, is_log):
-        # Normalize to 0..1 based on the Page Bounding Box
-        if ps_max == ps_min: return user_min
-        norm = (val - ps_min) / (ps_max - ps_min)
-        
-        if is_log:
-            # Logarithmic Interpolation: value = 10^( norm * log_range + log_min )
+    # 4. Simplification and calibration
+    points = data_segments.total_points()
+    data_segments = _transform(data_segments, ps_bounds, user_limits,
+                               simplify_tol, simplify_units, run_stats)
+    _report_simplified(simplify_tol, points, data_segments.total_points())
+
+    # 5. Write Output
+    with _phase(run_stats, 'write') as entry:
+        total_points = write_output(data_segments, output_file, fmt,
+                                    _header(input_file, user_limits))
+    if run_stats is not None:
+        entry['bytes'] = entry.get('bytes', 0) + os.path.getsize(output_file)
+        run_stats.count('points_written', total_points)
+
+    print(f"Done. Wrote {total_points} points to '{output_file}'")
+
+def _extract_spooled(input_file, user_limits, output_file, fmt,
+                     simplify_tol, simplify_units, run_stats):
+    """extract_ps_data in two passes over a temporary spool (--low-memory)."""
+    parsed = points = kept = 0
+    try:
+        f = open_input(input_file)
+    except FileNotFoundError:
+        print(f"Error: The file '{input_file}' was not found.")
+        sys.exit(1)
+
+    with f, tempfile.TemporaryFile() as spool:
+        # 1st pass: parse, filter and spool; track the page bounds. The
+        # command table comes from the first batch.
+        parser = None
+        while True:
             try:
-                log_min = math.log10(user_min)
-                log_max = math.log10(user_max)
-                return 10 ** (norm * (log_max - log_min) + log_min)
-            except ValueError:
-                print("Error: User limits must be positive for log scale.")
+                with _phase(run_stats, 'read') as entry:
+                    content = ''.join(f.readlines(READ_BATCH))
+            except DECOMPRESS_ERRORS as e:
+                print(f"Error: Could not read '{input_file}': {e}")
                 sys.exit(1)
-        else:
-            # Linear Interpolation
-            return norm * (user_max - user_min) + user_min
+            if not content:
+                break
+            if parser is None:
+                parser = LineParser(command_table(scan_procedures(content[:PROLOGUE_SCAN])))
+                store = parser.store
+            if run_stats is not None:
+                entry['bytes'] = entry.get('bytes', 0) + len(content)
+                with run_stats.phase('histogram'):
+                    run_stats.histogram(content, parser.commands)
+            with _phase(run_stats, 'parse'):
+                parser.feed(content)
+            with _phase(run_stats, 'spool'):
+                segments, n, written = store.spool(spool, MIN_POINTS)
+            parsed += segments; points += n; kept += written
+        del content
+        if parser is None:
+            parser = LineParser()
+        with _phase(run_stats, 'spool') as entry:
+            segments, n, written = parser.finish().spool(spool, MIN_POINTS)
+            parsed += segments; points += n; kept += written
+            spool.flush()
+            if run_stats is not None:
+                entry['bytes'] = spool.tell()
 
-    # 5. Write Output
-    with open(output_file, 'w') as out:
-        out.write(f"# Data extracted from {os.path.basename(input_file)}\n")
-        
-        if user_limits:
-            out.write(f"# Calibrated using limits: X[{user_limits['xmin']}:{user_limits['xmax']}] Y[{user_limits['ymin']}:{user_limits['ymax']}]\n")
-            if user_limits['logx']: out.write("# X-Axis: Logarithmic\n")
-            if user_limits['logy']: out.write("# Y-Axis: Logarithmic\n")
-            out.write("# Column 1: X (calibrated) Column 2: Y (calibrated)\n")
-        else:
-            out.write("# Column 1: X (raw ps) Column 2: Y (raw ps)\n")
-        
-        total_points = 0
-        for segment in data_segments:
-            for x_raw, y_raw in segment:
-                if user_limits:
-                    # Apply calibration
-                    x_out = convert_value(x_raw, ps_bounds['xmin'], ps_bounds['xmax'], 
-                                        user_limits['xmin'], user_limits['xmax'], user_limits['logx'])
-                    y_out = convert_value(y_raw, ps_bounds['ymin'], ps_bounds['ymax'], 
-                                        user_limits['ymin'], user_limits['ymax'], user_limits['logy'])
-                else:
-                    x_out, y_out = x_raw, y_raw
+        ps_bounds = parser.bounds
+        if ps_bounds['xmin'] is None:
+            print("Error: No vector data found.")
+            sys.exit(1)
+        if run_stats is not None:
+            run_stats.count('segments_parsed', parsed)
+            run_stats.count('points_parsed', points)
+            run_stats.count('segments_kept', kept)
+
+        print(f"Detected Page Bounds: X[{ps_bounds['xmin']:.1f}:{ps_bounds['xmax']:.1f}] Y[{ps_bounds['ymin']:.1f}:{ps_bounds['ymax']:.1f}]")
+        print(f"Filtered out {parsed - kept} short segments (grid/axes).")
+
+        # 2nd pass: simplify, calibrate and write the spool batch by batch
+        before = 0
+        with _phase(run_stats, 'write') as entry:
+            writer = StreamWriter(output_file, fmt, _header(input_file, user_limits))
+        try:
+            batches = read_spool(spool, SPOOL_BATCH)
+            while True:
+                with _phase(run_stats, 'unspool'):
+                    batch = next(batches, None)
+                if batch is None:
+                    break
+                before += batch.total_points()
+                batch = _transform(batch, ps_bounds, user_limits,
+                                   simplify_tol, simplify_units, run_stats)
+                with _phase(run_stats, 'write'):
+                    writer.write(batch)
+        finally:
+            with _phase(run_stats, 'write'):
+                total_points = writer.close()
+    _report_simplified(simplify_tol, before, total_points)
+
+    if run_stats is not None:
+        entry['bytes'] = entry.get('bytes', 0) + os.path.getsize(output_file)
+        run_stats.count('points_written', total_points)
 
-                out.write(f"{x_out:.6f} {y_out:.6f}\n")
-                total_points += 1
-            out.write("\n")
-                
     print(f"Done. Wrote {total_points} points to '{output_file}'")
 
 if __name__ == "__main__":
@@ -247,6 +1231,27 @@ if __name__ == "__main__":
     group.add_argument("--logx", action="store_true", help="X axis is logarithmic")
     group.add_argument("--logy", action="store_true", help="Y axis is logarithmic")
 
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default='txt',
+                        help="Output format (default: txt)")
+
+    group = parser.add_argument_group('Simplification', 'Decimate dense curves within a tolerance')
+    group.add_argument("--simplify", type=float, metavar="TOL",
+                       help="Drop the points that keep each curve within TOL of the original")
+    group.add_argument("--simplify-units", choices=SIMPLIFY_UNITS, default='page',
+                       help="TOL in page units (points) or in calibrated data units (default: page)")
+
+    parser.add_argument("--low-memory", action="store_true",
+                        help="Spool the curves to a temporary file instead of keeping them in memory")
+    parser.add_argument("--jobs", type=int, default=1, metavar="N",
+                        help="Parse pieces of a large file with N worker processes "
+                             "(uncompressed input, not with --low-memory)")
+
+    group = parser.add_argument_group('Diagnostics', 'Where the time goes, and why a plot comes back empty')
+    group.add_argument("--stats", nargs='?', const='text', choices=('text', 'json'),
+                       help="Report time and data per phase, token and operator counts")
+    group.add_argument("--profile", metavar="FILE",
+                       help="Run under cProfile, save the profile to FILE and print the costliest functions")
+
     args = parser.parse_args()
     
     # Check if user provided ALL limits (partial limits are ambiguous)
@@ -261,4 +1266,25 @@ if __name__ == "__main__":
             'logx': args.logx, 'logy': args.logy
         }
 
-    extract_ps_data(args.filename, limits)
+    if args.simplify is not None and args.simplify < 0:
+        print("Error: The simplification tolerance must not be negative.")
+        sys.exit(1)
+
+    run_stats = RunStats() if args.stats else None
+    profiler = cProfile.Profile() if args.profile else None
+    if profiler:
+        profiler.enable()
+    try:
+        extract_ps_data(args.filename, limits, fmt=args.format,
+                        simplify_tol=args.simplify, simplify_units=args.simplify_units,
+                        run_stats=run_stats, low_memory=args.low_memory, jobs=args.jobs)
+    finally:
+        # Also after a failure: the statistics tell why a plot came back empty
+        if profiler:
+            profiler.disable()
+            save_profile(profiler, args.profile)
+        if run_stats is not None:
+            if args.stats == 'json':
+                print(json.dumps(run_stats.as_dict(), indent=2))
+            else:
+                print("\n".join(run_stats.report()))
@@ -0,0 +1,570 @@
+"""
+Regression tests for ExtractData.py, run with: python -m pytest tests
+
+The PDFs are written by write_pdf() below: a classic cross-reference
+table, one content stream per page, encoded with a chain of filters.
+"""
+import base64
+import bz2
+import contextlib
+import io
+import mmap
+import gzip
+import json
+import lzma
+import os
+import socket
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+import zlib
+from unittest import mock
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, ROOT)
+
+import ExtractData
+import ExtractDataPS
+
+_ENCODERS = {
+    'FlateDecode': zlib.compress,
+    'ASCII85Decode': lambda data: base64.a85encode(data) + b'~>',
+}
+
+def curve(npoints, x0=100.0, y0=100.0):
+    """A content stream drawing one stroked curve of `npoints` points."""
+    ops = [f"{x0} {y0} m"]
+    ops += [f"{x0 + 10 * k} {y0 + (k * k) % 37} l" for k in range(1, npoints)]
+    return ("\n".join(ops) + "\nS\n").encode()
+
+def write_pdf(path, contents, filters=('FlateDecode',)):
+    """
+    Writes a PDF with one page per content stream of `contents` (None for
+    a page without /Contents). The streams are encoded so that decoding
+    with `filters`, in order, gives them back.
+    """
+    objects = {1: b"<< /Type /Catalog /Pages 2 0 R >>"}
+    kids = []
+    for k, content in enumerate(contents):
+        page, stream = 3 + 2 * k, 4 + 2 * k
+        kids.append(b"%d 0 R" % page)
+        if content is None:
+            objects[page] = b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] >>"
+            objects[stream] = b"null"
+            continue
+        objects[page] = (b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792]"
+                         b" /Contents %d 0 R >>" % stream)
+        for name in reversed(filters):
+            content = _ENCODERS[name](content)
+        names = b" ".join(b"/" + name.encode() for name in filters)
+        objects[stream] = (b"<< /Length %d /Filter [%s] >>\nstream\n" % (len(content), names) +
+                           content + b"\nendstream")
+    objects[2] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(kids), len(kids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for num in sorted(objects):
+        offsets[num] = len(out)
+        out += b"%d 0 obj\n" % num + objects[num] + b"\nendobj\n"
+    xref = len(out)
+    size = max(objects) + 1
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % size
+    for num in range(1, size):
+        out += b"%010d 00000 n \n" % offsets[num]
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (size, xref)
+    with open(path, 'wb') as f:
+        f.write(out)
+
+def write_ps(path, contents):
+    """Writes an EPS file drawing the content streams of `contents` (see curve)."""
+    text = b"".join(contents).replace(b" m\n", b" moveto\n").replace(b" l\n", b" lineto\n")
+    with open(path, 'wb') as f:
+        f.write(b"%!PS-Adobe-3.0 EPSF-3.0\n" + text.replace(b"S\n", b"stroke\n"))
+
+def compressed_copies(path):
+    """Writes gzip, bzip2 and xz copies of a file, and returns their paths."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    base, ext = os.path.splitext(path)
+    copies = {path + '.gz': gzip, path + '.bz2': bz2, path + '.xz': lzma,
+              base + '-gzip' + ext: gzip}  # found by its magic number only
+    for copy, module in copies.items():
+        with open(copy, 'wb') as f:
+            f.write(module.compress(data))
+    return list(copies)
+
+def run_cli(*args):
+    """Runs ExtractData.py with `args`, returning (exit status, output)."""
+    done = subprocess.run([sys.executable, os.path.join(ROOT, 'ExtractData.py'), *args],
+                          stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    return done.returncode, done.stdout
+
+def read_points(path):
+    """The (x, y) rows of a txt output."""
+    with open(path) as f:
+        return [tuple(map(float, line.split())) for line in f
+                if line.strip() and not line.startswith('#')]
+
+def crashing_worker(job, worker=ExtractData._batch_worker):
+    """A batch worker whose process dies on files named 'crash*'."""
+    if os.path.basename(job[0]).startswith('crash'):
+        os._exit(1)
+    return worker(job)
+
+def quiet(function, *args, **kwargs):
+    """Calls `function`, returning (result, printed text)."""
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        result = function(*args, **kwargs)
+    return result, out.getvalue()
+
+class PDFTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def path(self, name):
+        return os.path.join(self.tmp.name, name)
+
+    def assertSameParse(self, first, second):
+        """Compares two lists of ExtractionResults."""
+        for a, b in zip(first, second):
+            self.assertEqual(list(a.segments.coords), list(b.segments.coords))
+            self.assertEqual(list(a.segments.offsets), list(b.segments.offsets))
+            self.assertEqual([a.segments.style_keys[k] for k in a.segments.styles],
+                             [b.segments.style_keys[k] for k in b.segments.styles])
+            self.assertEqual(a.bounds, b.bounds)
+        self.assertEqual(len(first), len(second))
+
+class PDFReaderTest(PDFTestCase):
+
+    def test_reads_the_cross_reference_table(self):
+        path = self.path('plot.pdf')
+        write_pdf(path, [curve(30), curve(40)])
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            reader = ExtractData.PDFReader(buf)
+            self.assertEqual(reader._read_xref()['Root'], ExtractData.PDFRef(1, 0))
+            pages = list(reader.pages())
+            self.assertEqual([number for number, _ in pages], [1, 2])
+            stream, = reader.contents(pages[1][1])
+            self.assertEqual(reader.decode(stream), curve(40))
+
+    def test_extracts_through_the_page_tree(self):
+        path = self.path('plot.pdf')
+        write_pdf(path, [curve(30)])
+        result = ExtractData.extract(path)
+        self.assertNotIn("Unreadable PDF structure", result.messages)
+        self.assertEqual(result.stats['points'], 30)
+
+    def damaged_pdf(self, contents, catalog=True, **options):
+        """
+        A PDF whose startxref offset points past the end of the file, and,
+        unless `catalog`, whose document catalog cannot be found.
+        """
+        path = self.path('damaged.pdf')
+        write_pdf(path, contents, **options)
+        with open(path, 'rb') as f:
+            data = f.read()
+        at = data.rindex(b'startxref\n') + len(b'startxref\n')
+        data = data[:at] + b'9' + data[at:]
+        if not catalog:
+            data = data.replace(b'/Root', b'/Rot').replace(b'/Catalog', b'/Katalog')
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def test_damaged_cross_reference_falls_back(self):
+        result = ExtractData.extract(self.damaged_pdf([curve(30)]))
+        self.assertEqual(result.stats['points'], 30)
+
+    def test_parallel_fallback_is_reported(self):
+        stats = ExtractData.RunStats()
+        path = self.damaged_pdf([curve(30)], catalog=False)
+        result = ExtractData.extract(path, jobs=2, run_stats=stats)
+        self.assertIn("parsing serially instead of with 2 workers", result.messages)
+        self.assertEqual(stats.counts.get('parallel_fallbacks'), 1)
+        self.assertEqual(result.stats['points'], 30)
+
+    def test_parallel_run_cuts_at_the_decoded_data_cap_like_serial(self):
+        path = self.path('plot.pdf')
+        streams = [curve(60, y0=100.0 * k) for k in range(1, 4)]
+        write_pdf(path, streams)
+        cap = len(streams[0]) + len(streams[1]) // 2
+        for pages in (None, {1, 2, 3}):
+            runs = [ExtractData.extract(path, jobs=jobs, pages=pages,
+                                        decode_limits=ExtractData.DecodeLimits(None, cap))
+                    for jobs in (1, 2)]
+            if pages is None:
+                runs = [[run] for run in runs]
+            serial, parallel = [[list(r.segments.coords) for r in run] for run in runs]
+            self.assertEqual(parallel, serial)
+            self.assertGreater(sum(len(coords) for coords in serial) // 2, 60)
+
+    def test_ascii85_and_flate_stream(self):
+        path = self.path('plot.pdf')
+        write_pdf(path, [curve(30)], filters=('ASCII85Decode', 'FlateDecode'))
+        result = ExtractData.extract(path)
+        self.assertNotIn("Unreadable PDF structure", result.messages)
+        self.assertEqual(result.stats['points'], 30)
+
+    def test_ascii85_prefix_split_across_chunks(self):
+        data = curve(30)
+        encoded = b'<~' + base64.a85encode(zlib.compress(data), wrapcol=40) + b'~>'
+        for size in (1, 2, 3, len(encoded)):
+            chunks = [encoded[k:k + size] for k in range(0, len(encoded), size)]
+            decoded = ExtractData.decode_stream(chunks, ['ASCII85Decode', 'FlateDecode'],
+                                                [None, None])
+            self.assertEqual(b''.join(decoded), data)
+
+    def test_heuristic_scan_follows_the_filter_chain(self):
+        path = self.damaged_pdf([curve(30)], catalog=False,
+                                filters=('ASCII85Decode', 'FlateDecode'))
+        result = ExtractData.extract(path)
+        self.assertIn("Scanning raw streams (heuristic)", result.messages)
+        self.assertEqual(result.stats['points'], 30)
+
+class PathParserTest(unittest.TestCase):
+
+    RED = ((1.0, 0.0, 0.0), 1.0, ((), 0.0))
+
+    def styles(self, store):
+        return [store.style_keys[style] for style in store.styles]
+
+    def parse(self, text):
+        parser = ExtractData.PathParser()
+        parser.feed(text.encode().split())
+        return parser.finish()
+
+    def test_paths_get_the_style_of_their_painting_operator(self):
+        store = self.parse("0 0 m 1 1 l 2 2 m 3 3 l 1 0 0 RG S")
+        self.assertEqual(self.styles(store), [self.RED, self.RED])
+        store = self.parse("0 0 m 1 1 l h 1 0 0 RG S 0 G 4 4 m 5 5 l 2 w S")
+        self.assertEqual(self.styles(store), [self.RED, ((0.0,) * 3, 2.0, ((), 0.0))])
+
+    def test_detached_parser_paints_the_adopters_path(self):
+        text = "0 0 m 1 1 l q 2 2 m 3 3 l 1 0 0 RG S Q 4 4 m 5 5 l 0.5 w S"
+        tokens = text.encode().split()
+        parser = ExtractData.PathParser()
+        parser.feed(tokens[:6])
+        prefix, detached = ExtractData.parse_detached(tokens[6:])
+        parser.feed(prefix)
+        parser.adopt(detached)
+        store = parser.finish()
+        self.assertEqual(self.styles(store), self.styles(self.parse(text)))
+        self.assertEqual(self.styles(store),
+                         [self.RED, self.RED, ((0.0,) * 3, 0.5, ((), 0.0))])
+
+    def test_detached_restore_without_save_matches_serial(self):
+        for text in ("0 0 m 1 1 l S 9 9 m 1 0 0 RG Q 2 2 m 3 3 l S",
+                     "q 2 w 0 0 m 1 1 l S 9 9 m 1 0 0 RG Q Q 2 2 m 3 3 l S"):
+            tokens = text.encode().split()
+            cut = tokens.index(b'9')
+            parser = ExtractData.PathParser()
+            parser.feed(tokens[:cut])
+            prefix, detached = ExtractData.parse_detached(tokens[cut:])
+            parser.feed(prefix)
+            parser.adopt(detached)
+            self.assertEqual(self.styles(parser.finish()), self.styles(self.parse(text)))
+
+class ParallelTest(PDFTestCase):
+
+    def test_pdf_streams_in_parallel_match_serial(self):
+        # The path of the first stream is painted by the second one
+        path = self.path('plot.pdf')
+        write_pdf(path, [curve(30)[:-2], b"0 0 1 RG S q 2 w\n" + curve(40, y0=300.0),
+                         b"Q\n" + curve(25, y0=500.0), b"1 0 0 RG\n" + curve(35)])
+        serial = ExtractData.extract(path)
+        parallel = ExtractData.extract(path, jobs=2)
+        self.assertIn("with 2 workers", parallel.messages)
+        self.assertSameParse([serial], [parallel])
+        self.assertEqual(len(serial.series), 3)
+        self.assertSameParse(ExtractData.extract(path, pages={1, 2, 4}),
+                             ExtractData.extract(path, pages={1, 2, 4}, jobs=2))
+
+    def test_ps_pieces_in_parallel_match_serial(self):
+        # Pieces of 64 bytes cut paths, style changes and gsave/grestore pairs
+        path = self.path('plot.eps')
+        procedures = curve(20, y0=700.0).replace(b" m\n", b" M\n").replace(b" l\n", b" L\n")
+        write_ps(path, [b"/M {moveto} bind def /L {lineto} bind def\n",
+                        b"0 0 1 setrgbcolor\n" + curve(30), b"gsave 1 0 0 setrgbcolor 2 setlinewidth\n" +
+                        curve(40, y0=300.0) + b"grestore\n" + curve(25, y0=500.0)[:-2],
+                        b"stroke\n" + procedures, b"1 setlinewidth 0 1 0 setrgbcolor\n" + curve(35)])
+        serial = ExtractData.extract(path)
+        with mock.patch.object(ExtractData, 'PS_PIECE_MIN', 64):
+            parallel = ExtractData.extract(path, jobs=3)
+        self.assertIn("pieces of the file with 3 workers", parallel.messages)
+        self.assertSameParse([serial], [parallel])
+        self.assertEqual(len(serial.series), 3)
+
+class CacheTest(PDFTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.cache = ExtractData.ParseCache(self.path('cache'))
+        self.plot = self.path('plot.pdf')
+        write_pdf(self.plot, [b"1 0 0 RG\n" + curve(30), b"2 w\n" + curve(40, y0=300.0)])
+
+    def extract(self, **options):
+        stats = ExtractData.RunStats()
+        result = ExtractData.extract(self.plot, cache=self.cache, run_stats=stats, **options)
+        return result, stats.counts.get('cache_hits', 0)
+
+    def test_a_hit_gives_the_result_of_a_miss(self):
+        miss, hits = self.extract()
+        self.assertEqual(hits, 0)
+        hit, hits = self.extract()
+        self.assertEqual(hits, 1)
+        self.assertSameParse([miss], [hit])
+        self.assertSameParse([miss], [ExtractData.extract(self.plot)])
+        misses, hits = self.extract(pages={1, 2})
+        cached, hits = self.extract(pages={1, 2})
+        self.assertEqual(hits, 2)
+        self.assertSameParse(misses, cached)
+
+    def test_entries_of_another_parser_version_are_rejected(self):
+        first, _ = self.extract()
+        entry, = (name for name in os.listdir(self.path('cache')) if name.endswith('.seg'))
+        with open(os.path.join(self.path('cache'), entry), 'r+b') as f:
+            f.seek(4)
+            f.write(struct.pack('<I', ExtractData.PARSER_VERSION - 1))
+        self.assertIsNone(self.cache.load(entry[:-4]))
+        again, hits = self.extract()
+        self.assertEqual(hits, 0)
+        self.assertSameParse([first], [again])
+
+class MessagesTest(PDFTestCase):
+
+    def test_threads_keep_their_own_messages(self):
+        paths = [self.path(f'plot{k}.pdf') for k in range(4)]
+        for k, path in enumerate(paths):
+            write_pdf(path, [curve(20 + k)] * (k + 1))
+        results = {}
+
+        def run(path):
+            for _ in range(5):
+                results[path] = ExtractData.extract(self.damaged_pdf_copy(path))
+
+        stdout = sys.stdout
+        threads = [threading.Thread(target=run, args=(path,)) for path in paths]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertIs(sys.stdout, stdout)
+        for k, path in enumerate(paths):
+            self.assertEqual(results[path].messages.count("Scanning raw streams"), 1)
+            self.assertEqual(results[path].stats['points'], (20 + k) * (k + 1))
+
+    def damaged_pdf_copy(self, path):
+        """A copy of `path` without a readable structure, so extract() warns."""
+        with open(path, 'rb') as f:
+            data = f.read().replace(b'/Root', b'/Rot').replace(b'/Catalog', b'/Katalog')
+        copy = path + f'.{threading.get_ident()}.pdf'
+        with open(copy, 'wb') as f:
+            f.write(data)
+        return copy
+
+    def test_messages_callback(self):
+        path = self.path('plot.pdf')
+        write_pdf(path, [curve(30)])
+        seen = []
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            result = ExtractData.extract(path, messages=seen.append)
+        self.assertEqual(out.getvalue(), "")
+        self.assertTrue(seen)
+        self.assertEqual(result.messages, "".join(message + "\n" for message in seen))
+
+class BatchTest(PDFTestCase):
+
+    def test_colliding_outputs_keep_the_input_extension(self):
+        inputs = [('d/a.eps', 'a.eps'), ('d/a.pdf', 'a.pdf'), ('d/b.pdf', 'b.pdf')]
+        self.assertEqual(ExtractData.batch_outputs(inputs),
+                         ['d/a.eps.txt', 'd/a.pdf.txt', 'd/b.txt'])
+        self.assertEqual(ExtractData.batch_outputs(inputs, 'out', 'csv'),
+                         ['out/a.eps.csv', 'out/a.pdf.csv', 'out/b.csv'])
+
+    def test_unresolvable_collision_is_an_error(self):
+        inputs = [('x/a.pdf', 'a.pdf'), ('y/a.pdf', 'a.pdf')]
+        self.assertEqual(ExtractData.batch_outputs(inputs), ['x/a.txt', 'y/a.txt'])
+        with self.assertRaises(ValueError):
+            ExtractData.batch_outputs(inputs, 'out')
+
+    def test_batch_writes_one_output_per_input(self):
+        write_pdf(self.path('a.pdf'), [curve(30)])
+        write_ps(self.path('a.eps'), [curve(20)])
+        inputs = ExtractData.collect_inputs([self.tmp.name])
+        failed, _ = quiet(ExtractData.run_batch, inputs, jobs=1)
+        self.assertEqual(failed, 0)
+        for name, points in (('a.pdf.txt', 30), ('a.eps.txt', 20)):
+            self.assertEqual(len(read_points(self.path(name))), points)
+
+    def test_a_dying_worker_fails_only_its_file(self):
+        for name in ('a.pdf', 'crash.pdf', 'b.pdf', 'c.pdf'):
+            write_pdf(self.path(name), [curve(30)])
+        inputs = ExtractData.collect_inputs([self.tmp.name])
+        with mock.patch.object(ExtractData, '_batch_worker', crashing_worker):
+            failed, output = quiet(ExtractData.run_batch, inputs, jobs=2,
+                                   summary=self.path('summary.json'))
+        self.assertEqual(failed, 1)
+        self.assertIn("FAIL  " + self.path('crash.pdf'), output)
+        with open(self.path('summary.json')) as f:
+            files = json.load(f)['files']
+        self.assertEqual([(os.path.basename(e['file']), e['status']) for e in files],
+                         [('a.pdf', 'ok'), ('b.pdf', 'ok'), ('c.pdf', 'ok'),
+                          ('crash.pdf', 'error')])
+        for name in ('a', 'b', 'c'):
+            self.assertEqual(len(read_points(self.path(name + '.txt'))), 30)
+
+class CompressedInputTest(PDFTestCase):
+
+    def test_compressed_input_equals_plain_input(self):
+        plot = self.path('plot.eps')
+        write_ps(plot, [b"1 0 0 setrgbcolor\n" + curve(30), b"gsave 2 setlinewidth\n" +
+                        curve(40, y0=300.0) + b"grestore\n" + curve(25, y0=500.0)])
+        plain = ExtractData.extract(plot)
+        self.assertEqual(len(plain.series), 2)
+        for copy in compressed_copies(plot):
+            with self.subTest(copy=os.path.basename(copy)):
+                result = ExtractData.extract(copy)
+                self.assertIn("compressed input", result.messages)
+                self.assertSameParse([plain], [result])
+                # The pieces of a parallel run cannot be seeked to
+                self.assertSameParse([plain], [ExtractData.extract(copy, jobs=2)])
+
+class ExtractDataPSTest(PDFTestCase):
+
+    LIMITS = {'xmin': 0.0, 'xmax': 10.0, 'ymin': -1.0, 'ymax': 1.0, 'logx': False, 'logy': False}
+
+    def setUp(self):
+        super().setUp()
+        # Curves, and short segments (ticks) that the filter drops
+        self.plot = self.path('plot.eps')
+        write_ps(self.plot, [curve(30 + 7 * k, y0=100.0 * k) if k % 3 else curve(4, y0=50.0 * k)
+                             for k in range(12)])
+
+    def output(self, name, input_file=None, **options):
+        """Runs extract_ps_data and returns the text written."""
+        quiet(ExtractDataPS.extract_ps_data, input_file or self.plot, self.LIMITS,
+              self.path(name), **options)
+        with open(self.path(name)) as f:
+            return f.read()
+
+    def test_low_memory_output_equals_normal_output(self):
+        normal = self.output('normal.txt')
+        self.assertEqual(len(read_points(self.path('normal.txt'))),
+                         sum(30 + 7 * k for k in range(12) if k % 3))
+        self.assertEqual(self.output('spooled.txt', low_memory=True), normal)
+        # Blocks much smaller than the file, and than some curves
+        with mock.patch.object(ExtractDataPS, 'READ_BATCH', 256), \
+             mock.patch.object(ExtractDataPS, 'SPOOL_BATCH', 16):
+            self.assertEqual(self.output('small.txt', low_memory=True), normal)
+            self.assertEqual(self.output('blocks.txt'), normal)
+
+    def test_pieces_in_parallel_match_serial(self):
+        serial = self.output('serial.txt')
+        with mock.patch.object(ExtractDataPS, 'PIECE_MIN', 64):
+            _, printed = quiet(ExtractDataPS.extract_ps_data, self.plot, self.LIMITS,
+                               self.path('parallel.txt'), jobs=3)
+        self.assertIn("pieces of the file with 3 workers", printed)
+        with open(self.path('parallel.txt')) as f:
+            self.assertEqual(f.read(), serial)
+
+    def test_compressed_input_equals_plain_input(self):
+        # The first header line names the input file
+        plain = self.output('plain.txt').split('\n', 1)[1]
+        for n, copy in enumerate(compressed_copies(self.plot)):
+            with self.subTest(copy=os.path.basename(copy)):
+                self.assertEqual(self.output(f'{n}.txt', copy).split('\n', 1)[1], plain)
+                self.assertEqual(self.output(f'{n}-spooled.txt', copy, low_memory=True)
+                                 .split('\n', 1)[1], plain)
+
+class CommandLineTest(PDFTestCase):
+
+    def test_pages_selects_one_page(self):
+        path = self.path('two.pdf')
+        write_pdf(path, [curve(30), curve(40, y0=300.0)])
+        status, output = run_cli(path, '--pages', '2')
+        self.assertEqual(status, 0, output)
+        self.assertFalse(os.path.exists(self.path('two_p1.txt')))
+        points = read_points(self.path('two_p2.txt'))
+        self.assertEqual(len(points), 40)
+        self.assertEqual(points[0], (100.0, 300.0))
+        self.assertEqual(min(y for _, y in points), 300.0)
+
+    def test_page_without_contents_is_empty(self):
+        path = self.path('two.pdf')
+        write_pdf(path, [curve(30), None])
+        for jobs in ('1', '2'):
+            status, output = run_cli(path, '--pages', '2', '--jobs', jobs)
+            self.assertEqual(status, 0, output)
+            self.assertNotIn("not found", output)
+            self.assertIn("No vector data on this page", output)
+        pages = ExtractData.extract(path, pages={1, 2})
+        self.assertEqual([(r.page, r.stats['points']) for r in pages], [(1, 30), (2, 0)])
+
+    def test_page_out_of_range_is_an_error(self):
+        path = self.path('two.pdf')
+        write_pdf(path, [curve(30), curve(40, y0=300.0)])
+        status, output = run_cli(path, '--pages', '5')
+        self.assertEqual(status, 1)
+        self.assertIn("Page 5 not found", output)
+        self.assertIn("Error:", output)
+        self.assertEqual(sorted(os.listdir(self.tmp.name)), ['two.pdf'])
+
+class ServeTest(PDFTestCase):
+
+    def test_refuses_a_path_that_is_not_a_socket(self):
+        path = self.path('results.txt')
+        with open(path, 'w') as f:
+            f.write("1 2\n")
+        status, output = quiet(ExtractData.serve, path, jobs=1)
+        self.assertEqual(status, 1)
+        self.assertIn("is not a socket", output)
+        self.assertTrue(os.path.isfile(path))
+
+    def test_overlapping_requests_with_outputs(self):
+        plots = [self.path(f'plot{k}.pdf') for k in range(4)]
+        for k, path in enumerate(plots):
+            write_pdf(path, [curve(20 + k)])
+        address = self.path('socket')
+        server = subprocess.Popen([sys.executable, os.path.join(ROOT, 'ExtractData.py'),
+                                   '--serve', address, '--jobs', '2'],
+                                  stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+        self.addCleanup(server.wait)
+        self.addCleanup(server.terminate)
+        deadline = time.monotonic() + 30
+        while not os.path.exists(address) and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+        def ask(requests):
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+                client.connect(address)
+                client.sendall("".join(json.dumps(r) + "\n" for r in requests).encode())
+                client.shutdown(socket.SHUT_WR)
+                with client.makefile() as f:
+                    return {r['id']: r for r in map(json.loads, f)}
+
+        requests = [{'id': k, 'path': path, 'output': path + '.txt'}
+                    for k, path in enumerate(plots)]
+        responses = ask(requests)
+        self.assertEqual([responses[k]['status'] for k in range(4)], ['ok'] * 4)
+        for k, path in enumerate(plots):
+            self.assertEqual(len(read_points(path + '.txt')), 20 + k)
+        answer = ask([{'id': 'last', 'path': plots[0]}])['last']
+        self.assertEqual(answer['status'], 'ok')
+        self.assertEqual(len(answer['results'][0]['curves'][0]), 20)
+
+    def test_rejects_input_files(self):
+        status, output = run_cli(self.path('plot.pdf'), '--serve', self.path('socket'))
+        self.assertEqual(status, 1)
+        self.assertIn("--serve takes no input files", output)
+        self.assertFalse(os.path.exists(self.path('socket')))
+
+if __name__ == '__main__':
+    unittest.main()